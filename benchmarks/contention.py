@@ -0,0 +1,101 @@
+"""Contention benchmark: worker processes hammering Hotel.reserve_room.
+
+Run from the repo root:
+
+    python -m benchmarks.contention --ops 200 --workers 1 4 16
+
+With --hotels N the workers spread over N hotels, which the sharded
+backend stores in separate files.
+"""
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+from src.hotel_management import Hotel, _load, use_backend
+from src.storage import Backend, JsonBackend, ShardedBackend, SqliteBackend
+
+
+def _backend(kind: str, path: str) -> Backend:
+    """Return the backend under test."""
+    if kind == "sqlite":
+        return SqliteBackend(path)
+    if kind == "sharded":
+        return ShardedBackend(path)
+    return JsonBackend(path, wal=kind == "wal")
+
+
+def _worker(
+    kind: str, path: str, hotel_id: str, rooms: list[int], start: float
+) -> None:
+    """Reserve each room with one call, starting at the same instant."""
+    use_backend(_backend(kind, path))
+    time.sleep(max(start - time.time(), 0))
+    for room in rooms:
+        Hotel.reserve_room(hotel_id, room)
+
+
+def run(kind: str, workers: int, ops: int, hotels: int = 1) -> dict:
+    """Time workers processes each reserving ops distinct rooms."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, {"sqlite": "hotel.db",
+                                  "sharded": "shards"}.get(kind, "hotel.json"))
+        use_backend(_backend(kind, path))
+        total = workers * ops
+        for h in range(1, hotels + 1):
+            Hotel(f"H{h}", "Bench", total).create()
+
+        start = time.time() + 0.5
+        procs = [
+            multiprocessing.Process(
+                target=_worker,
+                args=(kind, path, f"H{i % hotels + 1}",
+                      list(range(i + 1, total + 1, workers)), start)
+            )
+            for i in range(workers)
+        ]
+        for proc in procs:
+            proc.start()
+        for proc in procs:
+            proc.join()
+        elapsed = time.time() - start
+
+        reserved = sum(len(hotel["reserved_rooms"])
+                       for hotel in _load()["hotels"].values())
+        use_backend(None)
+    return {
+        "backend": kind,
+        "workers": workers,
+        "ops": total,
+        "seconds": round(elapsed, 3),
+        "ops_per_sec": round(total / elapsed, 1),
+        "lost_updates": total - reserved,
+    }
+
+
+def main() -> None:
+    """Print throughput for each worker count."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ops", type=int, default=200,
+                        help="Reservations per worker (default: 200)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16],
+                        help="Worker counts to run (default: 1 4 16)")
+    parser.add_argument("--backend",
+                        choices=("json", "wal", "sqlite", "sharded"),
+                        default="json", help="Storage backend")
+    parser.add_argument("--hotels", type=int, default=1,
+                        help="Hotels the workers spread over (default: 1)")
+    args = parser.parse_args()
+
+    print(f"{'workers':>8} {'ops':>8} {'seconds':>9} {'ops/sec':>10} "
+          f"{'lost':>6}")
+    for workers in args.workers:
+        result = run(args.backend, workers, args.ops, args.hotels)
+        print(f"{result['workers']:>8} {result['ops']:>8} "
+              f"{result['seconds']:>9} {result['ops_per_sec']:>10} "
+              f"{result['lost_updates']:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Synthetic scenario generator in the format of files/tests/*.json.
+
+Run from the repo root:
+
+    python -m benchmarks.generate --customers 100000 --hotels 1000 \
+        --max-rooms 2000 --reservations 200000 --failure-rate 0.1 \
+        --output scenario.json
+"""
+
+import argparse
+import json
+import random
+from datetime import date, timedelta
+from typing import IO, Iterator
+
+FIRST_DAY = date(2026, 1, 1).toordinal()
+
+
+def customers(count: int) -> Iterator[tuple[str, dict]]:
+    """Yield customer entries."""
+    for i in range(1, count + 1):
+        yield f"C{i}", {"name": f"Customer {i}",
+                        "email": f"customer{i}@example.com"}
+
+
+def hotels(
+    count: int, max_rooms: int, held: float, rng: random.Random
+) -> Iterator[tuple[str, dict]]:
+    """Yield hotel entries with a share of rooms held up front."""
+    for i in range(1, count + 1):
+        total = rng.randint(1, max_rooms)
+        held_rooms = rng.sample(range(1, total + 1), int(total * held))
+        yield f"H{i}", {"name": f"Hotel {i}", "total_rooms": total,
+                        "reserved_rooms": sorted(held_rooms)}
+
+
+def reservations(
+    count: int,
+    customer_count: int,
+    hotel_rooms: list[int],
+    failure_rate: float,
+    rng: random.Random
+) -> Iterator[tuple[str, dict]]:
+    """Yield reservation entries, a failure_rate share of them invalid.
+
+    Invalid entries reference an unknown customer or hotel, or a room
+    past the hotel's last room, in equal shares.
+    """
+    for i in range(1, count + 1):
+        hotel = rng.randrange(len(hotel_rooms))
+        total = hotel_rooms[hotel]
+        entry = {
+            "customer_id": f"C{rng.randint(1, max(customer_count, 1))}",
+            "hotel_id": f"H{hotel + 1}",
+            "rooms": sorted(rng.sample(range(1, total + 1),
+                                       min(total, rng.randint(1, 3)))),
+        }
+        if rng.random() < failure_rate:
+            kind = rng.randrange(3)
+            if kind == 0:
+                entry["customer_id"] = "C0"
+            elif kind == 1:
+                entry["hotel_id"] = "H0"
+            else:
+                entry["rooms"] = [total + 1]
+        check_in = FIRST_DAY + rng.randrange(365)
+        entry["check_in"] = date.fromordinal(check_in).isoformat()
+        entry["check_out"] = (date.fromordinal(check_in) + timedelta(
+            days=rng.randint(1, 14))).isoformat()
+        yield f"R{i}", entry
+
+
+def _write_section(
+    f: IO[str], name: str, entries: Iterator[tuple[str, dict]], last: bool
+) -> None:
+    """Stream one top-level section without building it in memory."""
+    f.write(f'    "{name}": {{')
+    sep = "\n"
+    for key, value in entries:
+        f.write(f"{sep}        {json.dumps(key)}: {json.dumps(value)}")
+        sep = ",\n"
+    f.write("\n    }" + ("\n" if last else ",\n"))
+
+
+def generate(
+    f: IO[str],
+    customer_count: int,
+    hotel_count: int,
+    max_rooms: int,
+    reservation_count: int,
+    failure_rate: float = 0.0,
+    held: float = 0.01,
+    seed: int = 0
+) -> None:
+    """Write a scenario to an open text file."""
+    rng = random.Random(seed)
+    hotel_rooms: list[int] = []
+
+    def tracked() -> Iterator[tuple[str, dict]]:
+        """Yield hotels, remembering their room counts."""
+        for key, value in hotels(hotel_count, max_rooms, held, rng):
+            hotel_rooms.append(value["total_rooms"])
+            yield key, value
+
+    f.write("{\n")
+    _write_section(f, "customers", customers(customer_count), False)
+    _write_section(f, "hotels", tracked(), False)
+    _write_section(f, "reservations", reservations(
+        reservation_count if hotel_rooms else 0, customer_count,
+        hotel_rooms, failure_rate, rng
+    ), True)
+    f.write("}\n")
+
+
+def main() -> None:
+    """Parse arguments and write the scenario."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--customers", type=int, default=1000)
+    parser.add_argument("--hotels", type=int, default=100)
+    parser.add_argument("--max-rooms", type=int, default=500,
+                        help="Upper bound of rooms per hotel")
+    parser.add_argument("--reservations", type=int, default=2000)
+    parser.add_argument("--failure-rate", type=float, default=0.1,
+                        help="Share of reservations that must fail")
+    parser.add_argument("--held", type=float, default=0.01,
+                        help="Share of each hotel's rooms held up front")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="scenario.json")
+    args = parser.parse_args()
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        generate(f, args.customers, args.hotels, args.max_rooms,
+                 args.reservations, args.failure_rate, args.held, args.seed)
+
+
+if __name__ == "__main__":
+    main()
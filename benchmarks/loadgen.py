@@ -0,0 +1,182 @@
+"""Load generator for the main.py --serve daemon.
+
+Run from the repo root:
+
+    python -m benchmarks.loadgen --clients 4 --ops 20000 --pipeline 1 64
+    python -m benchmarks.loadgen --backend wal --pipeline 1 16 256
+    python -m benchmarks.loadgen --address /tmp/hotel.sock
+
+Without --address a server is started on a temporary Unix socket over
+temporary data and stopped at the end. Every client creates its own
+hotel, then customers with one reservation each, keeping up to
+--pipeline requests in flight on its connection. Each pipeline depth
+is reported with its requests/sec and p50/p99 latency, measured from
+sending a request to reading its result.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import deque
+from typing import Iterator
+from benchmarks.run import percentile
+from main import parse_address
+
+
+def workload(prefix: str, ops: int) -> Iterator[dict]:
+    """Yield ops operations on records whose IDs start with prefix."""
+    yield {"op": "create_hotel", "hotel_id": f"{prefix}H",
+           "name": "Load", "total_rooms": 100}
+    cycle = ("create_customer", "display_customer", "create_reservation",
+             "cancel_reservation")
+    for i in range(ops - 1):
+        name = cycle[i % len(cycle)]
+        n = i // len(cycle)
+        op = {"op": name, "customer_id": f"{prefix}C{n}",
+              "reservation_id": f"{prefix}R{n}"}
+        if name == "create_customer":
+            op.update(name=f"Load {n}", email=f"{prefix}{n}@example.com")
+        elif name == "create_reservation":
+            op.update(hotel_id=f"{prefix}H", rooms=[], auto_assign=1,
+                      check_in="2026-06-01", check_out="2026-06-03")
+        yield op
+
+
+def is_result(line: bytes) -> bool:
+    """Return True for a result line, in the text or jsonl format."""
+    return line.startswith((b"  [", b'{"event": "result"'))
+
+
+async def client(
+    address: str, lines: list[bytes], pipeline: int
+) -> tuple[list[int], int]:
+    """Send lines with up to pipeline in flight.
+
+    Returns the latency of every request in nanoseconds and the number
+    of failed operations.
+    """
+    host, port = parse_address(address)
+    if port is None:
+        reader, writer = await asyncio.open_unix_connection(host)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    window = asyncio.Semaphore(pipeline)
+    sent: deque[int] = deque()
+
+    async def send() -> None:
+        for line in lines:
+            await window.acquire()
+            sent.append(time.perf_counter_ns())
+            writer.write(line)
+            await writer.drain()
+
+    sender = asyncio.create_task(send())
+    latencies = []
+    failures = 0
+    for _ in lines:
+        line = await reader.readline()
+        while not is_result(line):
+            if not line:
+                raise ConnectionError("Server closed the connection.")
+            line = await reader.readline()
+        latencies.append(time.perf_counter_ns() - sent.popleft())
+        window.release()
+        if line.startswith(b"  [FAIL]") or b'"ok": false' in line:
+            failures += 1
+    await sender
+    writer.close()
+    await writer.wait_closed()
+    return latencies, failures
+
+
+async def run(
+    address: str, clients: int, ops: int, pipeline: int, tag: str
+) -> dict:
+    """Run clients concurrently, each sending ops requests."""
+    batches = [
+        [(json.dumps(op) + "\n").encode()
+         for op in workload(f"{tag}_{c}_", ops)]
+        for c in range(clients)
+    ]
+    start = time.perf_counter()
+    done = await asyncio.gather(
+        *(client(address, lines, pipeline) for lines in batches)
+    )
+    elapsed = time.perf_counter() - start
+    samples = [latency for latencies, _ in done for latency in latencies]
+    return {
+        "pipeline": pipeline,
+        "requests": len(samples),
+        "failures": sum(failures for _, failures in done),
+        "seconds": round(elapsed, 3),
+        "requests_per_sec": round(len(samples) / elapsed, 1),
+        "p50_us": round(percentile(samples, 0.50) / 1e3, 1),
+        "p99_us": round(percentile(samples, 0.99) / 1e3, 1),
+    }
+
+
+def start_server(tmp: str, backend: str) -> tuple[subprocess.Popen, str]:
+    """Start main.py --serve on a socket in tmp; return it when ready."""
+    address = os.path.join(tmp, "hotel.sock")
+    server = subprocess.Popen(
+        [sys.executable, os.path.abspath("main.py"), "--serve", address,
+         "--results", "jsonl", "--backend", backend],
+        cwd=tmp, stderr=subprocess.PIPE, text=True
+    )
+    assert server.stderr is not None
+    line = server.stderr.readline()
+    if not line.startswith("Serving on"):
+        server.kill()
+        raise RuntimeError(f"Server did not start: {line.strip()}")
+    return server, address
+
+
+def main() -> None:
+    """Print throughput and latency for each pipeline depth."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--address",
+                        help="Unix socket path or HOST:PORT of a running "
+                             "server (default: start one)")
+    parser.add_argument("--clients", type=int, default=4,
+                        help="Concurrent connections (default: 4)")
+    parser.add_argument("--ops", type=int, default=20000,
+                        help="Requests per client (default: 20000)")
+    parser.add_argument("--pipeline", type=int, nargs="+", default=[1, 64],
+                        help="Requests in flight per client to run "
+                             "(default: 1 64)")
+    parser.add_argument("--backend",
+                        choices=("json", "wal", "sqlite", "sharded"),
+                        default="json",
+                        help="Storage backend of the started server")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        server = None
+        address = args.address
+        if address is None:
+            server, address = start_server(tmp, args.backend)
+        try:
+            print(f"{'pipeline':>8} {'requests':>9} {'failed':>7} "
+                  f"{'req/sec':>10} {'p50 us':>9} {'p99 us':>9}")
+            for depth in args.pipeline:
+                tag = f"L{os.getpid()}_{depth}"
+                result = asyncio.run(run(
+                    address, args.clients, args.ops, depth, tag
+                ))
+                print(f"{result['pipeline']:>8} {result['requests']:>9} "
+                      f"{result['failures']:>7} "
+                      f"{result['requests_per_sec']:>10} "
+                      f"{result['p50_us']:>9} {result['p99_us']:>9}")
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+
+if __name__ == "__main__":
+    main()
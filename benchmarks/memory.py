@@ -0,0 +1,120 @@
+"""Memory benchmark: dict records against columnar Tables.
+
+Run from the repo root:
+
+    python -m benchmarks.memory --customers 1000000
+
+Builds the same customers, hotels and reservations as a dict of dicts
+per section (the layout backends load) and as columnar Tables, and
+prints the memory each layout holds (measured with tracemalloc), the
+bytes per record and the time to build and to read every record once.
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+from typing import Callable
+from src.columnar import SCHEMAS, Table
+from src.rooms import RoomSet
+
+
+def records(customers: int, hotels: int, reservations: int) -> dict:
+    """Return generators of the records of every section."""
+    return {
+        "hotels": lambda: (
+            (f"H{i}", {"name": f"Hotel {i}", "total_rooms": 200,
+                       "reserved_rooms": RoomSet.from_rooms([1, 2], 200)})
+            for i in range(hotels)
+        ),
+        "customers": lambda: (
+            (f"C{i}", {"name": f"Customer {i}",
+                       "email": f"customer{i}@example.com"})
+            for i in range(customers)
+        ),
+        "reservations": lambda: (
+            (f"R{i}", {"customer_id": f"C{i % customers}",
+                       "hotel_id": f"H{i % hotels}",
+                       "rooms": [i % 200 + 1],
+                       "check_in": f"2026-{i % 12 + 1:02d}-01",
+                       "check_out": f"2026-{i % 12 + 1:02d}-08"})
+            for i in range(reservations)
+        ),
+    }
+
+
+def measure(build: Callable[[], dict]) -> tuple[dict, int, float]:
+    """Return what build returns, the memory it holds and its time.
+
+    The memory is measured on a first build under tracemalloc, so it
+    includes the growth of the interpreter's table of interned
+    strings; the build is then timed again without tracemalloc, which
+    slows allocations down too much to time them.
+    """
+    gc.collect()
+    tracemalloc.start()
+    data = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del data
+    gc.collect()
+    start = time.perf_counter()
+    data = build()
+    return data, size, time.perf_counter() - start
+
+
+def read_all(data: dict) -> float:
+    """Return the time to read every field of every record once."""
+    start = time.perf_counter()
+    for section in data.values():
+        for key in section:
+            for _ in section[key].values():
+                pass
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    """Print the memory and timings of both layouts."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--customers", type=int, default=200000,
+                        help="Customers (default: 200000)")
+    parser.add_argument("--hotels", type=int, default=2000,
+                        help="Hotels (default: 2000)")
+    parser.add_argument("--reservations", type=int, default=None,
+                        help="Reservations (default: 2 per customer)")
+    args = parser.parse_args()
+    reservations = args.reservations
+    if reservations is None:
+        reservations = 2 * args.customers
+    sources = records(args.customers, args.hotels, reservations)
+    total = args.customers + args.hotels + reservations
+
+    layouts = {
+        "dict": lambda: {
+            name: {key: record for key, record in make()}
+            for name, make in sources.items()
+        },
+        "columnar": lambda: {
+            name: _table(name, make) for name, make in sources.items()
+        },
+    }
+    print(f"{'layout':<10} {'MiB':>9} {'bytes/rec':>10} {'build s':>9} "
+          f"{'read s':>8}")
+    for name, build in layouts.items():
+        data, size, elapsed = measure(build)
+        print(f"{name:<10} {size / 2 ** 20:>9.1f} {size / total:>10.1f} "
+              f"{elapsed:>9.2f} {read_all(data):>8.2f}")
+        del data
+
+
+def _table(name: str, make: Callable) -> Table:
+    """Build a Table from a record generator without a dict in between."""
+    table = Table(SCHEMAS[name])
+    for key, record in make():
+        table[key] = record
+    return table
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Occupancy report benchmark over generated reservations.
+
+Run from the repo root (needs numpy):
+
+    python -m benchmarks.occupancy --reservations 1000000 --hotels 1000
+
+Reservations are generated in memory over 2026, then folded into the
+hotel x night matrix and queried; the build time and the peak RSS are
+printed.
+"""
+
+import argparse
+import random
+import resource
+import time
+from benchmarks.generate import hotels, reservations
+from src.occupancy import Occupancy
+
+
+def main() -> None:
+    """Print the build and query times of an occupancy report."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reservations", type=int, default=1_000_000)
+    parser.add_argument("--hotels", type=int, default=1000)
+    parser.add_argument("--max-rooms", type=int, default=500)
+    parser.add_argument("--chunk", type=int, default=100_000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    data = {"hotels": dict(hotels(args.hotels, args.max_rooms, 0.0, rng))}
+    rooms = [record["total_rooms"] for record in data["hotels"].values()]
+    data["reservations"] = dict(reservations(
+        args.reservations, 1000, rooms, 0.0, rng
+    ))
+
+    start = time.perf_counter()
+    occupancy = Occupancy.build(data, "2026-01-01", "2027-01-15",
+                                args.chunk)
+    built = time.perf_counter()
+    occupancy.occupancy_rates()
+    occupancy.peak_nights(10)
+    occupancy.hotels_with_free(5, "2026-07-01", "2026-07-08")
+    queried = time.perf_counter()
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"build {built - start:.2f}s  queries {queried - built:.3f}s  "
+          f"peak RSS {peak // 1024} MiB")
+
+
+if __name__ == "__main__":
+    main()
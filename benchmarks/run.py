@@ -0,0 +1,217 @@
+"""Timed benchmarks for every public operation and for main.py runs.
+
+Run from the repo root:
+
+    python -m benchmarks.run --customers 10000 --hotels 100 \
+        --output results.json
+    python -m benchmarks.run --baseline results.json --tolerance 0.2
+
+Results are JSON: ops/sec and p50/p99 latency per operation, wall time
+and peak RSS per main.py run, and the peak RSS of the benchmark process.
+Operations run as callers outside a HotelStore run them: each call in
+its own one-shot store that writes its change to --ops-backend.
+With --baseline, an operation more than --tolerance slower (ops/sec)
+than in the baseline is reported and the exit status is 1.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Iterable
+from benchmarks.generate import generate
+from main import make_backend
+from src.hotel_management import Customer, Hotel, Reservation, use_backend
+
+
+def percentile(samples: list[int], fraction: float) -> int:
+    """Return the sample at the given fraction of the sorted samples."""
+    ordered = sorted(samples) or [0]
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def timed(name: str, calls: Iterable[Callable[[], None]]) -> dict:
+    """Run each call once and summarise the latencies."""
+    samples = []
+    failures = 0
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        for call in calls:
+            start = time.perf_counter_ns()
+            try:
+                call()
+            except ValueError:
+                failures += 1
+            samples.append(time.perf_counter_ns() - start)
+            out.seek(0)
+            out.truncate()
+    total = sum(samples) or 1
+    return {
+        "op": name,
+        "count": len(samples),
+        "failures": failures,
+        "ops_per_sec": round(len(samples) / (total / 1e9), 1),
+        "p50_us": round(percentile(samples, 0.50) / 1e3, 2),
+        "p99_us": round(percentile(samples, 0.99) / 1e3, 2),
+    }
+
+
+def bench_operations(scenario: dict, ops: int) -> list[dict]:
+    """Time each public operation, written by the backend in use."""
+    customers = list(scenario["customers"].items())[:ops]
+    hotels = list(scenario["hotels"].items())[:ops]
+    reservations = list(scenario["reservations"].items())[:ops]
+    rooms = [(hotel_id, room) for hotel_id, info in hotels
+             for room in range(1, info["total_rooms"] + 1)][:ops]
+
+    results = [
+        timed("create_customer", (
+            Customer(cid, info["name"], info["email"]).create
+            for cid, info in customers)),
+        timed("display_customer", (
+            lambda cid=cid: Customer.display_customer_info(cid)
+            for cid, _ in customers)),
+        timed("modify_customer", (
+            lambda cid=cid: Customer.modify(cid, name="Renamed")
+            for cid, _ in customers)),
+        timed("create_hotel", (
+            Hotel(hid, info["name"], info["total_rooms"]).create
+            for hid, info in hotels)),
+        timed("display_hotel", (
+            lambda hid=hid: Hotel.display_hotel_info(hid)
+            for hid, _ in hotels)),
+        timed("modify_hotel", (
+            lambda hid=hid: Hotel.modify(hid, name="Renamed")
+            for hid, _ in hotels)),
+        timed("reserve_room", (
+            lambda hid=hid, room=room: Hotel.reserve_room(hid, room)
+            for hid, room in rooms)),
+        timed("create_reservation", (
+            Reservation(rid, info["customer_id"], info["hotel_id"],
+                        info["rooms"], info["check_in"],
+                        info["check_out"]).create
+            for rid, info in reservations)),
+        timed("cancel_reservation", (
+            lambda rid=rid: Reservation.cancel(rid)
+            for rid, _ in reservations)),
+        timed("cancel_room", (
+            lambda hid=hid, room=room: Hotel.cancel_room(hid, room)
+            for hid, room in rooms)),
+        timed("delete_customer", (
+            lambda cid=cid: Customer.delete(cid) for cid, _ in customers)),
+        timed("delete_hotel", (
+            lambda hid=hid: Hotel.delete(hid) for hid, _ in hotels)),
+    ]
+    return results
+
+
+def bench_main(path: str, backend: str, tmp: str) -> dict:
+    """Time a full main.py run in a child process.
+
+    The peak RSS is that child's own, read by os.wait4: RUSAGE_CHILDREN
+    would give the largest of every child waited for so far.
+    """
+    args = [sys.executable, os.path.abspath("main.py"), path,
+            "--backend", backend, "--db", os.path.join(tmp, "bench.db"),
+            "--output", os.path.join(tmp, "output.json")]
+    start = time.perf_counter()
+    with subprocess.Popen(args, stdout=subprocess.DEVNULL, cwd=tmp) as child:
+        _, status, usage = os.wait4(child.pid, 0)
+        child.returncode = os.waitstatus_to_exitcode(status)
+    elapsed = time.perf_counter() - start
+    if child.returncode:
+        raise subprocess.CalledProcessError(child.returncode, args)
+    return {
+        "op": f"main.py --backend {backend}",
+        "seconds": round(elapsed, 3),
+        "peak_rss_kb": usage.ru_maxrss,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Return a line per operation that regressed against the baseline."""
+    before = {r["op"]: r for r in baseline["operations"]}
+    regressions = []
+    for result in results["operations"]:
+        old = before.get(result["op"])
+        if old and result["ops_per_sec"] < old["ops_per_sec"] * (
+                1 - tolerance):
+            regressions.append(
+                f"{result['op']}: {old['ops_per_sec']} -> "
+                f"{result['ops_per_sec']} ops/sec"
+            )
+    return regressions
+
+
+def main() -> None:
+    """Generate a scenario, run the benchmarks and print JSON results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--customers", type=int, default=10000)
+    parser.add_argument("--hotels", type=int, default=100)
+    parser.add_argument("--max-rooms", type=int, default=2000)
+    parser.add_argument("--reservations", type=int, default=10000)
+    parser.add_argument("--failure-rate", type=float, default=0.1)
+    parser.add_argument("--ops", type=int, default=10000,
+                        help="Maximum calls timed per operation")
+    parser.add_argument("--ops-backend", default="wal",
+                        choices=("json", "wal", "sqlite", "sharded"),
+                        help="Backend the timed operations write to")
+    parser.add_argument("--backends", nargs="*", default=["json"],
+                        choices=("json", "wal", "sqlite", "sharded"),
+                        help="Backends for full main.py runs")
+    parser.add_argument("--output", help="Write results to this file")
+    parser.add_argument("--baseline", help="Results file to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "scenario.json")
+        with open(path, "w", encoding="utf-8") as f:
+            generate(f, args.customers, args.hotels, args.max_rooms,
+                     args.reservations, args.failure_rate)
+        with open(path, "r", encoding="utf-8") as f:
+            scenario = json.load(f)
+
+        use_backend(make_backend(args.ops_backend,
+                                 os.path.join(tmp, "hotel.db"),
+                                 path=os.path.join(tmp, "hotel.json")))
+        operations = bench_operations(scenario, args.ops)
+        use_backend(None)
+
+        runs = [bench_main(path, backend, tmp) for backend in args.backends]
+
+    results = {
+        "scenario": {
+            "customers": args.customers,
+            "hotels": args.hotels,
+            "max_rooms": args.max_rooms,
+            "reservations": args.reservations,
+            "failure_rate": args.failure_rate,
+        },
+        "ops_backend": args.ops_backend,
+        "operations": operations,
+        "runs": runs,
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+    text = json.dumps(results, indent=4)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"[REGRESSION] {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
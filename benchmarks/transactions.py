@@ -0,0 +1,139 @@
+"""Transaction benchmark: per-call operations against transaction().
+
+Run from the repo root:
+
+    python -m benchmarks.transactions --copies 100
+    python -m benchmarks.transactions --copies 1000 --backend wal
+
+Runs files/tests/test_mixed.json scaled up: each copy renames its
+customers, hotels and reservations (C1 becomes C1_7, ...) and runs as
+one workflow of what main.py runs for them, without the final deletes,
+so the data grows with the copies. 'per-call' runs every operation in
+its own one-shot store, 'transaction' runs each workflow in one
+transaction() and 'rollback' runs it in one that is rolled back at the
+end. Prints the time, operations/sec and backend writes of each mode,
+and checks that per-call and transaction leave the same results and
+data.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from main import (
+    load_input, make_backend, run_customers, run_hotels, run_reservations
+)
+from src import instrumentation
+from src.formats import dumps
+from src.hotel_management import _load, transaction, use_backend
+from src.results import ResultLog
+
+MIXED = os.path.join("files", "tests", "test_mixed.json")
+MODES = ("per-call", "transaction", "rollback")
+
+
+def scaled(scenario: dict, copy: int) -> dict:
+    """Return the scenario with IDs and emails made unique to copy."""
+    def rename(key: str) -> str:
+        return f"{key}_{copy}"
+
+    customers = {
+        rename(key): dict(info, email=f"{copy}.{info['email']}")
+        if info.get("email") else info
+        for key, info in scenario.get("customers", {}).items()
+    }
+    reservations = {}
+    for key, info in scenario.get("reservations", {}).items():
+        info = dict(info)
+        for field in ("customer_id", "hotel_id"):
+            if info.get(field):
+                info[field] = rename(info[field])
+        reservations[rename(key)] = info
+    return {
+        "customers": customers,
+        "hotels": {rename(key): info
+                   for key, info in scenario.get("hotels", {}).items()},
+        "reservations": reservations,
+    }
+
+
+def workflow(data: dict, log: ResultLog) -> None:
+    """Run the customer, hotel and reservation operations of a copy."""
+    run_customers(data["customers"], log)
+    run_hotels(data["hotels"], log)
+    run_reservations(data["reservations"], log)
+
+
+def run(mode: str, copies: list[dict], backend: str, tmp: str) -> dict:
+    """Run every copy in one mode on fresh data and time it."""
+    storage = make_backend(backend, os.path.join(tmp, f"{mode}.db"),
+                           path=os.path.join(tmp, f"{mode}.json"))
+    storage.clear()
+    use_backend(storage)
+    log = ResultLog()
+    instrumentation.reset()
+    instrumentation.enable()
+    start = time.perf_counter()
+    for data in copies:
+        if mode == "per-call":
+            workflow(data, log)
+            continue
+        try:
+            with transaction():
+                workflow(data, log)
+                if mode == "rollback":
+                    raise ValueError("Rolled back.")
+        except ValueError:
+            pass
+    elapsed = time.perf_counter() - start
+    instrumentation.enable(False)
+    writes = instrumentation.stats()["timings"].get("storage.save", {})
+    result = {
+        "mode": mode,
+        "operations": log.ok + log.failed,
+        "failed": log.failed,
+        "seconds": round(elapsed, 3),
+        "ops_per_sec": round((log.ok + log.failed) / elapsed, 1),
+        "writes": writes.get("count", 0),
+        "data": dumps(_load(), "compact"),
+    }
+    use_backend(None)
+    storage.clear()
+    return result
+
+
+def main() -> None:
+    """Print the time and writes of each mode."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--copies", type=int, default=100,
+                        help="Copies of the mixed scenario (default: 100)")
+    parser.add_argument("--backend",
+                        choices=("json", "wal", "sqlite", "sharded"),
+                        default="json", help="Storage backend")
+    parser.add_argument("--modes", nargs="+", choices=MODES,
+                        default=list(MODES),
+                        help="Modes to run (default: all)")
+    args = parser.parse_args()
+    scenario = load_input(MIXED)
+    copies = [scaled(scenario, copy) for copy in range(args.copies)]
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'mode':<12} {'ops':>8} {'failed':>7} {'seconds':>9} "
+              f"{'ops/sec':>10} {'writes':>7}")
+        for mode in args.modes:
+            result = results[mode] = run(mode, copies, args.backend, tmp)
+            print(f"{mode:<12} {result['operations']:>8} "
+                  f"{result['failed']:>7} {result['seconds']:>9} "
+                  f"{result['ops_per_sec']:>10} {result['writes']:>7}")
+    if "per-call" in results and "transaction" in results:
+        same = all(
+            results["per-call"][key] == results["transaction"][key]
+            for key in ("operations", "failed", "data")
+        )
+        print("per-call and transaction results and data "
+              f"{'match' if same else 'DIFFER'}")
+
+
+if __name__ == "__main__":
+    main()
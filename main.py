@@ -1,10 +1,37 @@
 """Script to load a JSON test file, run all hotel operations, and save."""
 
 import argparse
+import asyncio
 import json
 import os
-import shutil
-from src.hotel_management import Customer, Hotel, Reservation, JSON_FILE
+import signal
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass
+from itertools import repeat
+from multiprocessing import get_context
+from typing import Awaitable, Callable, Iterable, Iterator, Optional
+from src import instrumentation
+from src.feed import ChangeFeed
+from src.formats import FORMATS, dumps
+from src.results import BUFFER_SIZE, RESULT_FORMATS, ResultLog
+from src.hotel_management import (
+    Customer, Hotel, Reservation, HotelStore, JSON_FILE, export,
+    transaction, use_backend, use_feed, waitlist
+)
+from src.storage import Backend, JsonBackend, ShardedBackend, SqliteBackend
+
+READ_SIZE = 1 << 16
+# what a failed write raises: file and database errors, and
+# ConflictError (a ValueError) when another writer got there first
+BACKEND_ERRORS = (OSError, ValueError, sqlite3.Error)
+STREAM_FLUSH_EVERY = 10000
+SERVE_FLUSH_INTERVAL = 1.0
 
 
 def load_input(path: str) -> dict:
@@ -13,147 +40,991 @@ def load_input(path: str) -> dict:
         return json.load(f)
 
 
-def run_customers(customers: dict) -> None:
+def run_customers(customers: dict, log: ResultLog) -> None:
     """Create, display, modify, and delete each customer in the input."""
     for customer_id, info in customers.items():
         name = str(info.get("name", ""))
         email = str(info.get("email", ""))
 
-        try:
-            Customer(customer_id, name, email).create()
-            print(f"  [OK] Created customer {customer_id}")
-        except ValueError as e:
-            print(f"  [FAIL] Create customer {customer_id}: {e}")
+        if not log.attempt(
+            f"Created customer {customer_id}",
+            f"Create customer {customer_id}",
+            Customer(customer_id, name, email).create
+        ):
             continue
+        log.attempt(
+            f"Displayed customer {customer_id}",
+            f"Display customer {customer_id}",
+            Customer.info, customer_id
+        )
+        log.attempt(
+            f"Modified customer {customer_id}",
+            f"Modify customer {customer_id}",
+            Customer.modify, customer_id, name=name + " (modified)"
+        )
 
-        try:
-            Customer.display_customer_info(customer_id)
-            print(f"  [OK] Displayed customer {customer_id}")
-        except ValueError as e:
-            print(f"  [FAIL] Display customer {customer_id}: {e}")
 
-        try:
-            Customer.modify(customer_id, name=name + " (modified)")
-            print(f"  [OK] Modified customer {customer_id}")
-        except ValueError as e:
-            print(f"  [FAIL] Modify customer {customer_id}: {e}")
-
-
-def run_hotels(hotels: dict) -> None:
+def run_hotels(hotels: dict, log: ResultLog) -> None:
     """Create, display, modify, and reserve rooms for each hotel in input."""
     for hotel_id, info in hotels.items():
         name = info.get("name", "")
         total_rooms = info.get("total_rooms", 0)
 
-        try:
-            Hotel(hotel_id, name, total_rooms).create()
-            print(f"  [OK] Created hotel {hotel_id}")
-        except ValueError as e:
-            print(f"  [FAIL] Create hotel {hotel_id}: {e}")
+        if not log.attempt(
+            f"Created hotel {hotel_id}", f"Create hotel {hotel_id}",
+            Hotel(hotel_id, name, total_rooms).create
+        ):
             continue
-
-        try:
-            Hotel.display_hotel_info(hotel_id)
-            print(f"  [OK] Displayed hotel {hotel_id}")
-        except ValueError as e:
-            print(f"  [FAIL] Display hotel {hotel_id}: {e}")
-
-        try:
-            Hotel.modify(hotel_id, name=name + " (modified)")
-            print(f"  [OK] Modified hotel {hotel_id}")
-        except ValueError as e:
-            print(f"  [FAIL] Modify hotel {hotel_id}: {e}")
+        log.attempt(
+            f"Displayed hotel {hotel_id}", f"Display hotel {hotel_id}",
+            Hotel.info, hotel_id
+        )
+        log.attempt(
+            f"Modified hotel {hotel_id}", f"Modify hotel {hotel_id}",
+            Hotel.modify, hotel_id, name=name + " (modified)"
+        )
 
         for room in info.get("reserved_rooms", []):
-            try:
-                Hotel.reserve_room(hotel_id, room)
-                print(f"  [OK] Reserved room {room} in hotel {hotel_id}")
-            except ValueError as e:
-                print(f"  [FAIL] Reserve room {room} in hotel {hotel_id}: {e}")
+            log.attempt(
+                f"Reserved room {room} in hotel {hotel_id}",
+                f"Reserve room {room} in hotel {hotel_id}",
+                Hotel.reserve_room, hotel_id, room
+            )
 
 
-def run_reservations(reservations: dict) -> None:
+def run_reservations(reservations: dict, log: ResultLog) -> None:
     """Create and cancel each reservation in the input."""
     for reservation_id, info in reservations.items():
-        customer_id = info.get("customer_id", "")
-        hotel_id = info.get("hotel_id", "")
-        rooms = info.get("rooms", [])
-        check_in = info.get("check_in", "")
-        check_out = info.get("check_out", "")
+        reservation = Reservation(
+            reservation_id, info.get("customer_id", ""),
+            info.get("hotel_id", ""), info.get("rooms", []),
+            info.get("check_in", ""), info.get("check_out", "")
+        )
+
+        if not log.attempt(
+            f"Created reservation {reservation_id}",
+            f"Create reservation {reservation_id}",
+            reservation.create, info.get("auto_assign", 0)
+        ):
+            continue
+        log.attempt(
+            f"Cancelled reservation {reservation_id}",
+            f"Cancel reservation {reservation_id}",
+            Reservation.cancel, reservation_id
+        )
+
+
+def run_deletes(data: dict, log: ResultLog) -> None:
+    """Delete all customers and hotels that were successfully created."""
+    for customer_id in data.get("customers", {}):
+        log.attempt(
+            f"Deleted customer {customer_id}",
+            f"Delete customer {customer_id}",
+            Customer.delete, customer_id
+        )
+
+    for hotel_id in data.get("hotels", {}):
+        log.attempt(
+            f"Deleted hotel {hotel_id}", f"Delete hotel {hotel_id}",
+            Hotel.delete, hotel_id
+        )
+
+
+def _create_customer(op: dict) -> None:
+    """Create a customer from an operation."""
+    Customer(
+        op.get("customer_id", ""),
+        str(op.get("name", "")),
+        str(op.get("email", ""))
+    ).create()
+
+
+def _create_hotel(op: dict) -> None:
+    """Create a hotel from an operation."""
+    Hotel(
+        op.get("hotel_id", ""), op.get("name", ""), op.get("total_rooms", 0)
+    ).create()
+
+
+def _reservation(op: dict) -> Reservation:
+    """Return the reservation described by an operation."""
+    return Reservation(
+        op.get("reservation_id", ""), op.get("customer_id", ""),
+        op.get("hotel_id", ""), op.get("rooms", []),
+        op.get("check_in", ""), op.get("check_out", "")
+    )
+
+
+def _create_reservation(op: dict) -> None:
+    """Create a reservation from an operation."""
+    _reservation(op).create(op.get("auto_assign", 0))
+
+
+def _export(op: dict) -> dict:
+    """Export the data, or its changes after "since"; return the seq."""
+    try:
+        return {"seq": export(op["path"], op.get("since"))}
+    except OSError as e:
+        raise ValueError(
+            f"Cannot write {op['path']}: {e.strerror}."
+        ) from e
+
+
+def _transaction(op: dict) -> Optional[list]:
+    """Run the operations listed in "ops" as one transaction.
+
+    Returns the values they display, if any. The first one that fails
+    rolls back all of them, with an error giving its position.
+    """
+    values = []
+    with transaction():
+        for number, step in enumerate(op["ops"], 1):
+            name = step.get("op") if isinstance(step, dict) else None
+            if name not in OPERATIONS:
+                raise ValueError(
+                    f"Operation {number}: unknown operation {name}."
+                )
+            try:
+                value = OPERATIONS[name][0](step)
+            except KeyError as e:
+                raise ValueError(
+                    f"Operation {number} ({name}): missing field {e}."
+                ) from e
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"Operation {number} ({name}): {e}") from e
+            if value is not None:
+                values.append(value)
+    return values or None
+
+
+def _request_reservation(op: dict) -> Optional[dict]:
+    """Create a reservation or queue it; return its waitlist if queued."""
+    reservation = _reservation(op)
+    if reservation.request(op.get("auto_assign", 0), op.get("priority", 0)):
+        return None
+    return {"waiting": reservation.reservation_id,
+            "depth": waitlist().depth(reservation.hotel_id)}
 
+
+def _find_rooms(op: dict) -> list[int]:
+    """Return the free rooms found by an operation."""
+    return Hotel.find_available_rooms(
+        op.get("hotel_id", ""), op["count"],
+        op.get("check_in", ""), op.get("check_out", "")
+    )
+
+
+def _find_hotels(op: dict) -> dict[str, int]:
+    """Return the hotels with enough free rooms found by an operation."""
+    return Hotel.find_hotels(
+        op["count"], op.get("check_in", ""), op.get("check_out", "")
+    )
+
+
+# op name -> (handler, failure label, success message); a value returned
+# by the handler is displayed before the result
+OPERATIONS: dict[str, tuple[Callable[[dict], object], str, str]] = {
+    "create_customer": (
+        _create_customer,
+        "Create customer {customer_id}", "Created customer {customer_id}"
+    ),
+    "display_customer": (
+        lambda op: Customer.info(op.get("customer_id", "")),
+        "Display customer {customer_id}", "Displayed customer {customer_id}"
+    ),
+    "modify_customer": (
+        lambda op: Customer.modify(
+            op.get("customer_id", ""), op.get("name"), op.get("email")
+        ),
+        "Modify customer {customer_id}", "Modified customer {customer_id}"
+    ),
+    "delete_customer": (
+        lambda op: Customer.delete(
+            op.get("customer_id", ""), op.get("cascade", False)
+        ),
+        "Delete customer {customer_id}", "Deleted customer {customer_id}"
+    ),
+    "create_hotel": (
+        _create_hotel,
+        "Create hotel {hotel_id}", "Created hotel {hotel_id}"
+    ),
+    "display_hotel": (
+        lambda op: Hotel.info(op.get("hotel_id", "")),
+        "Display hotel {hotel_id}", "Displayed hotel {hotel_id}"
+    ),
+    "modify_hotel": (
+        lambda op: Hotel.modify(
+            op.get("hotel_id", ""), op.get("name"), op.get("total_rooms")
+        ),
+        "Modify hotel {hotel_id}", "Modified hotel {hotel_id}"
+    ),
+    "delete_hotel": (
+        lambda op: Hotel.delete(
+            op.get("hotel_id", ""), op.get("cascade", False)
+        ),
+        "Delete hotel {hotel_id}", "Deleted hotel {hotel_id}"
+    ),
+    "reserve_room": (
+        lambda op: Hotel.reserve_room(op.get("hotel_id", ""), op["room"]),
+        "Reserve room {room} in hotel {hotel_id}",
+        "Reserved room {room} in hotel {hotel_id}"
+    ),
+    "cancel_room": (
+        lambda op: Hotel.cancel_room(op.get("hotel_id", ""), op["room"]),
+        "Cancel room {room} in hotel {hotel_id}",
+        "Cancelled room {room} in hotel {hotel_id}"
+    ),
+    "find_rooms": (
+        _find_rooms,
+        "Find {count} rooms in hotel {hotel_id}",
+        "Found {count} rooms in hotel {hotel_id}"
+    ),
+    "find_hotels": (
+        _find_hotels,
+        "Find hotels with {count} rooms", "Found hotels with {count} rooms"
+    ),
+    "create_reservation": (
+        _create_reservation,
+        "Create reservation {reservation_id}",
+        "Created reservation {reservation_id}"
+    ),
+    "cancel_reservation": (
+        lambda op: Reservation.cancel(op.get("reservation_id", "")),
+        "Cancel reservation {reservation_id}",
+        "Cancelled reservation {reservation_id}"
+    ),
+    "request_reservation": (
+        _request_reservation,
+        "Request reservation {reservation_id}",
+        "Requested reservation {reservation_id}"
+    ),
+    "withdraw_request": (
+        lambda op: Reservation.withdraw(op.get("reservation_id", "")),
+        "Withdraw request {reservation_id}",
+        "Withdrew request {reservation_id}"
+    ),
+    "waitlist_stats": (
+        lambda op: waitlist().stats(),
+        "Get waitlist stats", "Got waitlist stats"
+    ),
+    "export": (
+        _export, "Export {path}", "Exported {path}"
+    ),
+    "transaction": (
+        _transaction, "Run transaction", "Committed transaction"
+    ),
+}
+
+
+def run_op(op: dict, log: ResultLog) -> bool:
+    """Run one operation, report it to the log and return its success."""
+    if "error" in op:
+        log.result(f"Line {op.get('line')}", op["error"])
+        return False
+    name = op.get("op")
+    if name not in OPERATIONS:
+        log.result(f"Unknown operation {name}", "")
+        return False
+    handler, label, done = OPERATIONS[name]
+    fields = defaultdict(str, op)
+    start = time.perf_counter()
+    try:
+        value = handler(op)
+    except KeyError as e:
+        error = f"Missing field {e}."
+    except (TypeError, *BACKEND_ERRORS) as e:
+        error = str(e)
+    else:
+        seconds = time.perf_counter() - start
+        if value is not None:
+            log.display(value)
+        log.result(done.format_map(fields), seconds=seconds)
+        return True
+    log.result(label.format_map(fields), error, time.perf_counter() - start)
+    return False
+
+
+def read_ops(lines: Iterable[str], first: int = 1) -> Iterator[dict]:
+    """Parse newline-delimited JSON operations, one per line.
+
+    Lines are numbered from first in the errors of invalid lines.
+    """
+    for number, line in enumerate(lines, first):
+        if not line.strip():
+            continue
         try:
-            Reservation(
-                reservation_id, customer_id, hotel_id,
-                rooms, check_in, check_out
-            ).create()
-            print(f"  [OK] Created reservation {reservation_id}")
+            op = json.loads(line)
         except ValueError as e:
-            print(f"  [FAIL] Create reservation {reservation_id}: {e}")
+            yield {"line": number, "error": str(e)}
+            continue
+        if not isinstance(op, dict):
+            yield {"line": number, "error": "Operation is not an object."}
             continue
+        yield op
+
+
+def run_stream(lines: Iterable[str], log: ResultLog) -> Iterator[bool]:
+    """Run an operation stream lazily, yielding the success of each op."""
+    return (run_op(op, log) for op in read_ops(lines))
+
 
+def is_stream(path: str) -> bool:
+    """Return True if the input is a newline-delimited operation stream."""
+    return path == "-" or path.endswith((".ndjson", ".jsonl"))
+
+
+class Profile:
+    """Instrumentation stats collected per section of a run."""
+
+    def __init__(self) -> None:
+        """Turn instrumentation on with no sections recorded."""
+        self.sections: dict[str, dict] = {}
+        instrumentation.enable()
+
+    @contextmanager
+    def section(self, name: str) -> Iterator[None]:
+        """Record the stats of the body as one section."""
+        instrumentation.reset()
         try:
-            Reservation.cancel(reservation_id)
-            print(f"  [OK] Cancelled reservation {reservation_id}")
-        except ValueError as e:
-            print(f"  [FAIL] Cancel reservation {reservation_id}: {e}")
+            yield
+        finally:
+            self.sections[name] = instrumentation.stats()
 
+    def report(self, out=sys.stderr) -> None:
+        """Print a summary table per section."""
+        for name, stats in self.sections.items():
+            print(f"\n--- Profile: {name} ---", file=out)
+            print(f"{'operation':<32}{'calls':>8}{'total ms':>11}"
+                  f"{'mean us':>10}{'p50 us':>9}{'p99 us':>9}", file=out)
+            for op, timing in stats["timings"].items():
+                print(f"{op:<32}{timing['count']:>8}"
+                      f"{timing['total'] * 1e3:>11.2f}"
+                      f"{timing['mean'] * 1e6:>10.1f}"
+                      f"{timing['p50'] * 1e6:>9.0f}"
+                      f"{timing['p99'] * 1e6:>9.0f}", file=out)
+            for counter, value in stats["counters"].items():
+                print(f"{counter:<32}{value:>8}", file=out)
 
-def run_deletes(data: dict) -> None:
-    """Delete all customers and hotels that were successfully created."""
-    for customer_id in data.get("customers", {}):
+    def dump(self, path: str) -> None:
+        """Write the raw stats of every section as JSON."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.sections, f, indent=4)
+
+
+@contextmanager
+def profiled(profile: Optional[Profile], name: str) -> Iterator[None]:
+    """Record a section if profiling, else run the body as is."""
+    if profile is None:
+        yield
+    else:
+        with profile.section(name):
+            yield
+
+
+def make_backend(
+    kind: str, db_path: str, fmt: str = "json", path: str = JSON_FILE
+) -> Backend:
+    """Return the storage backend selected on the command line.
+
+    The file backends keep their data next to path (the data file of
+    the json and wal backends, with a .bin extension in binary format).
+    """
+    base = os.path.splitext(path)[0]
+    if kind == "sqlite":
+        return SqliteBackend(db_path)
+    if kind == "sharded":
+        return ShardedBackend(base + "_shards", fmt=fmt)
+    if fmt == "binary":
+        path = base + ".bin"
+    return JsonBackend(path, wal=kind == "wal", fmt=fmt)
+
+
+def write_output(path: str, data: dict) -> None:
+    """Write the final data as indented JSON."""
+    with open(path, "wb") as f:
+        f.write(dumps(data))
+
+
+def run_input(
+    input_file: str,
+    log: ResultLog,
+    flush_every: Optional[int] = None,
+    profile: Optional[Profile] = None,
+    columnar: bool = False
+) -> HotelStore:
+    """Run the operations of one input on the backend in use.
+
+    Results go to the log as the operations run; the store is returned
+    with its changes written. With columnar, the store keeps its data
+    in columnar Tables. Streams are written every STREAM_FLUSH_EVERY
+    mutations unless flush_every is given, so pending changes do not
+    grow with the stream.
+    """
+    if is_stream(input_file):
+        if flush_every is None:
+            flush_every = STREAM_FLUSH_EVERY
+        with profiled(profile, "stream"):
+            with HotelStore(flush_every=flush_every,
+                            columnar=columnar) as store:
+                if input_file == "-":
+                    for _ in run_stream(sys.stdin, log):
+                        pass
+                else:
+                    with open(input_file, "r", encoding="utf-8") as f:
+                        for _ in run_stream(f, log):
+                            pass
+        return store
+
+    data = load_input(input_file)
+
+    with profiled(profile, "load"):
+        store = HotelStore(flush_every=flush_every, columnar=columnar)
+    with store:
+        log.section("Customers")
+        with profiled(profile, "customers"):
+            run_customers(data.get("customers", {}), log)
+
+        log.section("Hotels")
+        with profiled(profile, "hotels"):
+            run_hotels(data.get("hotels", {}), log)
+
+        log.section("Reservations")
+        with profiled(profile, "reservations"):
+            run_reservations(data.get("reservations", {}), log)
+
+        log.section("Deletes")
+        with profiled(profile, "deletes"):
+            run_deletes(data, log)
+        with profiled(profile, "flush"):
+            store.flush()
+    return store
+
+
+def scenario_name(input_file: str) -> str:
+    """Return the name of a scenario: its file name without extension."""
+    return os.path.splitext(os.path.basename(input_file))[0]
+
+
+def expand_inputs(paths: list[str]) -> list[str]:
+    """Replace directories by the JSON and NDJSON inputs they hold."""
+    inputs: list[str] = []
+    for path in paths:
+        if os.path.isdir(path):
+            inputs += sorted(
+                os.path.join(path, name) for name in os.listdir(path)
+                if name.endswith((".json", ".ndjson", ".jsonl"))
+            )
+        else:
+            inputs.append(path)
+    return inputs
+
+
+@dataclass(slots=True, frozen=True)
+class ScenarioOptions:
+    """How each scenario of run_scenarios() is stored and reported.
+
+    ``kind`` and ``fmt`` select the backend (see make_backend),
+    ``results`` the results format and ``expect_dir`` the directory of
+    expected results to compare with.
+    """
+    kind: str = "json"
+    fmt: str = "json"
+    flush_every: Optional[int] = None
+    results: str = "text"
+    expect_dir: Optional[str] = None
+    columnar: bool = False
+
+
+def run_scenario(input_file: str, output_dir: str,
+                 options: ScenarioOptions = ScenarioOptions()) -> dict:
+    """Run one input in its own temporary data directory.
+
+    The results go to ``<name>_results.txt`` (``.jsonl`` in jsonl
+    format, none when quiet) and the final data to ``<name>_output.json``
+    in output_dir. With expect_dir the results are compared with
+    ``<name>_results.txt`` there as they are produced. Returns the
+    scenario summary; runs in a worker process of run_scenarios().
+    """
+    name = scenario_name(input_file)
+    start = time.perf_counter()
+    with ExitStack() as stack:
+        out = None
+        if options.results != "quiet":
+            extension = "txt" if options.results == "text" else "jsonl"
+            out = stack.enter_context(open(
+                os.path.join(output_dir, f"{name}_results.{extension}"),
+                "w", encoding="utf-8"
+            ))
+        expected = None
+        if options.expect_dir is not None:
+            expected = stack.enter_context(open(
+                os.path.join(options.expect_dir, f"{name}_results.txt"),
+                "r", encoding="utf-8"
+            ))
+        log = ResultLog(out, options.results, expected)
+        tmp = stack.enter_context(
+            tempfile.TemporaryDirectory(prefix=f"{name}_")
+        )
+        backend = make_backend(options.kind, os.path.join(tmp, "hotel.db"),
+                               options.fmt, os.path.join(tmp, "hotel.json"))
+        use_backend(backend)
         try:
-            Customer.delete(customer_id)
-            print(f"  [OK] Deleted customer {customer_id}")
-        except ValueError as e:
-            print(f"  [FAIL] Delete customer {customer_id}: {e}")
+            store = run_input(input_file, log, options.flush_every,
+                              columnar=options.columnar)
+            write_output(os.path.join(output_dir, f"{name}_output.json"),
+                         store.data)
+        finally:
+            use_backend(None)
+            if isinstance(backend, SqliteBackend):
+                backend.close()
+        matched = log.close()
+    summary = {
+        "scenario": name,
+        "input": input_file,
+        "ok": log.ok,
+        "failed": log.failed,
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+    if log.comparator is not None:
+        summary["matches"] = matched
+        summary["mismatches"] = list(log.comparator.report())
+    return summary
 
-    for hotel_id in data.get("hotels", {}):
+
+def run_scenarios(
+    inputs: list[str], output_dir: str, jobs: Optional[int] = None,
+    options: ScenarioOptions = ScenarioOptions()
+) -> list[dict]:
+    """Run inputs concurrently in a process pool, one scenario each.
+
+    Every scenario has its own data files, so they never share a lock.
+    Writes ``summary.json`` to output_dir and returns the summaries in
+    input order.
+    """
+    names = [scenario_name(path) for path in inputs]
+    if len(set(names)) != len(names):
+        raise ValueError("Scenario file names must be unique.")
+    os.makedirs(output_dir, exist_ok=True)
+    # spawn: the workers must not inherit locks held by threads here
+    with ProcessPoolExecutor(max_workers=jobs,
+                             mp_context=get_context("spawn")) as pool:
+        summaries = list(pool.map(
+            run_scenario, inputs, repeat(output_dir), repeat(options)
+        ))
+    with open(os.path.join(output_dir, "summary.json"), "w",
+              encoding="utf-8") as f:
+        json.dump(summaries, f, indent=4)
+    return summaries
+
+
+def print_summary(summaries: list[dict], wall: float) -> None:
+    """Print one line per scenario and the totals.
+
+    Scenarios compared with expected results are marked "differs" when
+    they did not match, followed by their first mismatches.
+    """
+    print(f"{'scenario':<32}{'ok':>8}{'failed':>8}{'seconds':>10}")
+    for summary in summaries:
+        status = "" if summary.get("matches", True) else "  differs"
+        print(f"{summary['scenario']:<32}{summary['ok']:>8}"
+              f"{summary['failed']:>8}{summary['seconds']:>10.3f}{status}")
+        for mismatch in summary.get("mismatches", []):
+            print(f"    {mismatch}")
+    print(f"{'total':<32}{sum(s['ok'] for s in summaries):>8}"
+          f"{sum(s['failed'] for s in summaries):>8}{wall:>10.3f}")
+
+
+class _SocketOut:
+    """Text writer over an asyncio stream, for a ResultLog."""
+
+    def __init__(self, writer: asyncio.StreamWriter) -> None:
+        """Write to the given stream."""
+        self.writer = writer
+
+    def write(self, text: str) -> int:
+        """Queue text on the stream; drained by the connection handler."""
+        self.writer.write(text.encode("utf-8"))
+        return len(text)
+
+    def flush(self) -> None:
+        """Nothing to do: the handler drains the stream."""
+
+
+class Unflushed:
+    """Connections whose acknowledged changes are not written yet.
+
+    The serve loop writes the store's changes; a failed write is
+    reported to every connection that made one of them, and the changes
+    stay pending for the next write.
+    """
+
+    def __init__(self, store: HotelStore, flush_every: Optional[int]) -> None:
+        """Track the connections changing store."""
+        self.store = store
+        self.flush_every = flush_every
+        self.logs: dict[ResultLog, None] = {}
+        self.due = asyncio.Event()
+
+    def ran(self, log: ResultLog) -> None:
+        """Note that a connection ran operations, waking the loop if due."""
+        if not self.store.dirty:
+            return
+        self.logs[log] = None
+        if self.flush_every and len(self.store.changes) >= self.flush_every:
+            self.due.set()
+
+    def flush(self) -> None:
+        """Write the pending changes, reporting a failure to their clients."""
         try:
-            Hotel.delete(hotel_id)
-            print(f"  [OK] Deleted hotel {hotel_id}")
-        except ValueError as e:
-            print(f"  [FAIL] Delete hotel {hotel_id}: {e}")
+            self.store.flush()
+        except BACKEND_ERRORS as e:
+            print(f"[ERROR] Flush failed: {e}", file=sys.stderr)
+            for log in self.logs:
+                log.result("Write changes", str(e))
+                log.flush()
+        else:
+            self.logs = {}
 
 
-def main() -> None:
-    """Run all operations."""
+def parse_address(address: str) -> tuple[str, Optional[int]]:
+    """Split a server address into a host and TCP port.
+
+    ``HOST:PORT`` (or ``:PORT`` for localhost) is a TCP address;
+    anything else is the path of a Unix socket, returned with no port.
+    """
+    host, colon, port = address.rpartition(":")
+    if colon and port.isdigit():
+        return host or "127.0.0.1", int(port)
+    return address, None
+
+
+async def handle_client(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+    results: str = "jsonl", unflushed: Optional[Unflushed] = None
+) -> None:
+    """Run the operations sent on one connection.
+
+    Requests are operation stream lines and are answered in order with
+    the result events of run_op. The handler runs every complete line
+    of a read at once and sends their results in one write, so clients
+    can pipeline requests without waiting for each answer. With
+    unflushed, a failed write of the connection's changes is sent as
+    one more result, labelled "Write changes".
+    """
+    log = ResultLog(_SocketOut(writer), results)
+    pending = b""
+    first = 1
+    try:
+        while True:
+            chunk = await reader.read(READ_SIZE)
+            lines = (pending + chunk).split(b"\n")
+            pending = lines.pop() if chunk else b""
+            for op in read_ops(
+                (line.decode("utf-8", "replace") for line in lines), first
+            ):
+                run_op(op, log)
+            if unflushed is not None:
+                unflushed.ran(log)
+            first += len(lines)
+            log.flush()
+            await writer.drain()
+            if not chunk:
+                break
+    except ConnectionError:
+        pass
+    finally:
+        if unflushed is not None:
+            unflushed.logs.pop(log, None)
+        writer.close()
+
+
+async def start_server(
+    address: str, results: str = "jsonl",
+    unflushed: Optional[Unflushed] = None
+) -> asyncio.AbstractServer:
+    """Listen on a Unix socket path or HOST:PORT for operations.
 
+    Operations run on the active HotelStore, one at a time on the event
+    loop, so connections never see each other's partial changes.
+    """
+    def handler(
+        reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> Awaitable[None]:
+        return handle_client(reader, writer, results, unflushed)
+
+    host, port = parse_address(address)
+    if port is None:
+        return await asyncio.start_unix_server(handler, host)
+    return await asyncio.start_server(handler, host, port)
+
+
+async def serve(
+    address: str, results: str = "jsonl",
+    flush_every: Optional[int] = None,
+    flush_interval: float = SERVE_FLUSH_INTERVAL,
+    columnar: bool = False
+) -> None:
+    """Serve operations over the stored data until SIGINT or SIGTERM.
+
+    The data stays in one HotelStore for the life of the server; its
+    changes are written every flush_every mutations and at least every
+    flush_interval seconds, and once more on shutdown. Only this loop
+    writes them, so a failed write reaches the clients that made the
+    changes (see Unflushed) instead of whichever operation was running.
+    """
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    with HotelStore(columnar=columnar) as store:
+        unflushed = Unflushed(store, flush_every)
+
+        def shut_down() -> None:
+            stop.set()
+            unflushed.due.set()
+
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, shut_down)
+        server = await start_server(address, results, unflushed)
+        print(f"Serving on {address}", file=sys.stderr)
+        try:
+            while not stop.is_set():
+                try:
+                    await asyncio.wait_for(unflushed.due.wait(),
+                                           flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                unflushed.due.clear()
+                unflushed.flush()
+        finally:
+            server.close()
+            await server.wait_closed()
+            if parse_address(address)[1] is None and os.path.exists(address):
+                os.unlink(address)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Return the command line parser of main()."""
     parser = argparse.ArgumentParser(
-        description="Run hotel management operations from a JSON input file."
+        description="Run hotel management operations from JSON input files."
     )
     parser.add_argument(
-        "input_file",
-        help="Path to the input JSON file (e.g. test_valid.json)"
+        "inputs",
+        nargs="*",
+        metavar="input_file",
+        help="Path to the input JSON file (e.g. test_valid.json), or an "
+             ".ndjson/.jsonl operation stream ('-' reads it from stdin); "
+             "several files or a directory run as parallel scenarios"
     )
     parser.add_argument(
         "--output",
         default="output.json",
         help="Path to the output JSON file (default: output.json)"
     )
-    args = parser.parse_args()
+    parser.add_argument(
+        "--output-dir",
+        default="outputs",
+        help="Directory of the per-scenario results and outputs and of "
+             "summary.json when running several scenarios "
+             "(default: outputs)"
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Worker processes for several scenarios (default: CPU count)"
+    )
+    parser.add_argument(
+        "--backend",
+        choices=("json", "wal", "sqlite", "sharded"),
+        default="json",
+        help="Storage backend (default: json); sharded keeps customers, "
+             "reservations and hotel buckets in separate files under "
+             "hotel_shards/"
+    )
+    parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        default="json",
+        help="Data file format of the file backends (default: json); "
+             "--output is always indented JSON"
+    )
+    parser.add_argument(
+        "--db",
+        default="hotel.db",
+        help="Path to the SQLite database (default: hotel.db)"
+    )
+    parser.add_argument(
+        "--flush-every",
+        type=int,
+        default=None,
+        help="Write pending changes every N mutations, 0 for only at the "
+             f"end (default: {STREAM_FLUSH_EVERY} for streams, at the "
+             "end otherwise)"
+    )
+    parser.add_argument(
+        "--columnar",
+        action="store_true",
+        help="Keep the data in memory as columnar tables, which take "
+             "less memory per record than dicts"
+    )
+    parser.add_argument(
+        "--results",
+        choices=RESULT_FORMATS,
+        default="text",
+        help="Results format: the [OK]/[FAIL] text lines (default), "
+             "jsonl events with timings, or quiet for the counts only"
+    )
+    parser.add_argument(
+        "--expect",
+        metavar="PATH",
+        help="Compare the results with an expected results file, or for "
+             "several scenarios with <name>_results.txt in a directory; "
+             "exit with status 1 if they differ"
+    )
+    parser.add_argument(
+        "--serve",
+        metavar="ADDRESS",
+        help="Keep the stored data in memory and answer operation stream "
+             "lines sent to a Unix socket path or HOST:PORT, until "
+             "SIGINT/SIGTERM"
+    )
+    parser.add_argument(
+        "--feed",
+        metavar="PATH",
+        help="Append a sequenced before/after record of every change to "
+             "PATH, an NDJSON change feed (emptied with the data unless "
+             "serving); python -m src.feed reads it"
+    )
+    parser.add_argument(
+        "--export",
+        metavar="PATH",
+        help="After the run, write the data and the feed sequence number "
+             "it includes to PATH, or with --since only the records "
+             "changed after that number (needs --feed)"
+    )
+    parser.add_argument(
+        "--since",
+        metavar="SEQ",
+        type=int,
+        help="Make --export an incremental delta of the changes after SEQ"
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print call counts, timings and I/O per section to stderr"
+    )
+    parser.add_argument(
+        "--profile-json",
+        metavar="PATH",
+        help="Also write the raw profile stats to PATH as JSON"
+    )
+    return parser
 
-    if not os.path.exists(args.input_file):
-        print(f"[ERROR] File not found: {args.input_file}")
-        return
 
-    if os.path.exists(JSON_FILE):
-        os.remove(JSON_FILE)
+def serve_mode(parser: argparse.ArgumentParser,
+               args: argparse.Namespace) -> None:
+    """Answer operation streams on args.serve until stopped."""
+    if args.inputs or args.results == "quiet" or args.export:
+        parser.error("--serve takes no inputs and answers in text or "
+                     "jsonl results; it exports with the export "
+                     "operation")
+    use_backend(make_backend(args.backend, args.db, args.format))
+    if args.feed:
+        use_feed(ChangeFeed(args.feed))
+    asyncio.run(serve(args.serve, args.results, args.flush_every,
+                      columnar=args.columnar))
 
-    data = load_input(args.input_file)
 
-    print("--- Customers ---")
-    run_customers(data.get("customers", {}))
+def scenarios_mode(parser: argparse.ArgumentParser,
+                   args: argparse.Namespace, inputs: list[str]) -> None:
+    """Run several inputs as parallel scenarios and print a summary."""
+    if "-" in inputs or args.profile or args.profile_json or args.feed:
+        parser.error("stdin, --profile and --feed need a single input "
+                     "file")
+    start = time.perf_counter()
+    try:
+        summaries = run_scenarios(
+            inputs, args.output_dir, args.jobs, ScenarioOptions(
+                args.backend, args.format, args.flush_every,
+                args.results, args.expect, args.columnar
+            )
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    print_summary(summaries, time.perf_counter() - start)
+    if not all(summary.get("matches", True) for summary in summaries):
+        sys.exit(1)
 
-    print("\n--- Hotels ---")
-    run_hotels(data.get("hotels", {}))
 
-    print("\n--- Reservations ---")
-    run_reservations(data.get("reservations", {}))
+def single_mode(parser: argparse.ArgumentParser,
+                args: argparse.Namespace, input_file: str) -> None:
+    """Run one input against the configured data file and save it."""
+    profile = Profile() if args.profile or args.profile_json else None
+    backend = make_backend(args.backend, args.db, args.format)
+    backend.clear()
+    use_backend(backend)
+    feed = None
+    if args.feed:
+        feed = ChangeFeed(args.feed)
+        feed.clear()
+        use_feed(feed)
+
+    with ExitStack() as stack:
+        expected = None
+        if args.expect:
+            expected = stack.enter_context(
+                open(args.expect, "r", encoding="utf-8")
+            )
+        # stdin may be interactive: write each result as it comes
+        log = ResultLog(sys.stdout, args.results, expected,
+                        buffer_size=0 if input_file == "-" else BUFFER_SIZE)
+        try:
+            store = run_input(input_file, log, args.flush_every, profile,
+                              args.columnar)
+        finally:
+            matched = log.close()
+    write_output(args.output, store.data)
+    if feed is not None and args.export:
+        try:
+            feed.export(args.export, store.data, args.since)
+        except ValueError as e:
+            parser.error(str(e))
+
+    if profile is not None:
+        if args.profile:
+            profile.report()
+        if args.profile_json:
+            profile.dump(args.profile_json)
+    if not matched:
+        for mismatch in log.comparator.report():
+            print(mismatch, file=sys.stderr)
+        sys.exit(1)
+
+
+def main() -> None:
+    """Run all operations."""
+    parser = build_parser()
+    args = parser.parse_args()
+    if args.export and not args.feed:
+        parser.error("--export needs --feed")
+    if args.since is not None and not args.export:
+        parser.error("--since needs --export")
+
+    if args.serve:
+        serve_mode(parser, args)
+        return
+    if not args.inputs:
+        parser.error("an input file or --serve is required")
 
-    print("\n--- Deletes ---")
-    run_deletes(data)
+    for path in args.inputs:
+        if path != "-" and not os.path.exists(path):
+            print(f"[ERROR] File not found: {path}")
+            return
 
-    shutil.copy(JSON_FILE, args.output)
+    inputs = expand_inputs(args.inputs)
+    if len(inputs) != 1 or os.path.isdir(args.inputs[0]):
+        scenarios_mode(parser, args, inputs)
+    else:
+        single_mode(parser, args, inputs[0])
 
 
 if __name__ == "__main__":
@@ -0,0 +1,157 @@
+"""Date-range availability index for hotel rooms."""
+
+from bisect import bisect_left, insort
+from datetime import date
+from typing import Iterable, Optional
+
+# Missing dates leave a reservation open-ended on that side.
+BEGINNING = 0
+FOREVER = date.max.toordinal() + 1
+
+
+def parse_day(value: str) -> Optional[int]:
+    """Return the day ordinal of an ISO date, or None if it is empty."""
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value).toordinal()
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid date {value}.") from None
+
+
+def stay(check_in: str, check_out: str) -> tuple[int, int]:
+    """Return the half-open [start, end) day interval of a stay."""
+    start = parse_day(check_in)
+    end = parse_day(check_out)
+    return (BEGINNING if start is None else start,
+            FOREVER if end is None else end)
+
+
+class AvailabilityIndex:
+    """Per-room sorted interval lists of the reservations in the data.
+
+    Intervals booked on the same room never overlap, so a room's list is
+    ordered by both start and end and a free check only has to look at
+    the neighbours of the bisection point. A stay whose check-out is not
+    after its check-in occupies no nights and is not indexed.
+    """
+
+    def __init__(self) -> None:
+        """Create an empty index."""
+        self.starts: dict[tuple[str, int], list[int]] = {}
+        self.bookings: dict[tuple[str, int], list[tuple[int, int, str]]]
+        self.bookings = {}
+        self.rooms: dict[str, set[int]] = {}
+
+    @classmethod
+    def build(cls, reservations: dict) -> "AvailabilityIndex":
+        """Index every reservation of the data."""
+        index = cls()
+        for reservation_id, record in reservations.items():
+            index.add(reservation_id, record)
+        return index
+
+    def add(self, reservation_id: str, record: dict) -> None:
+        """Index the rooms of a reservation."""
+        start, end = stay(record["check_in"], record["check_out"])
+        if end <= start:
+            return
+        for room in record["rooms"]:
+            key = (record["hotel_id"], room)
+            starts = self.starts.setdefault(key, [])
+            i = bisect_left(starts, start)
+            starts.insert(i, start)
+            self.bookings.setdefault(key, []).insert(
+                i, (start, end, reservation_id)
+            )
+            self.rooms.setdefault(record["hotel_id"], set()).add(room)
+
+    def remove(self, reservation_id: str, record: dict) -> None:
+        """Drop the rooms of a reservation from the index."""
+        start, end = stay(record["check_in"], record["check_out"])
+        if end <= start:
+            return
+        for room in record["rooms"]:
+            key = (record["hotel_id"], room)
+            starts = self.starts.get(key, [])
+            i = bisect_left(starts, start)
+            while i < len(starts) and starts[i] == start:
+                if self.bookings[key][i][2] == reservation_id:
+                    del starts[i]
+                    del self.bookings[key][i]
+                    break
+                i += 1
+            if not starts:
+                self.rooms.get(record["hotel_id"], set()).discard(room)
+
+    def conflict(
+        self, hotel_id: str, room: int, start: int, end: int
+    ) -> Optional[str]:
+        """Return the reservation holding the room in [start, end)."""
+        if end <= start:
+            return None
+        key = (hotel_id, room)
+        starts = self.starts.get(key)
+        if not starts:
+            return None
+        bookings = self.bookings[key]
+        i = bisect_left(starts, end)
+        if i > 0 and bookings[i - 1][1] > start:
+            return bookings[i - 1][2]
+        return None
+
+    def free_rooms(
+        self, hotel_id: str, rooms: Iterable[int], start: int, end: int
+    ) -> list[int]:
+        """Return the rooms with no reservation in [start, end)."""
+        return [room for room in rooms
+                if self.conflict(hotel_id, room, start, end) is None]
+
+    def booked(self, hotel_id: str, start: int, end: int) -> set[int]:
+        """Return the rooms of a hotel with a reservation in [start, end).
+
+        Only the rooms that have reservations at all are looked at.
+        """
+        return {room for room in self.rooms.get(hotel_id, ())
+                if self.conflict(hotel_id, room, start, end) is not None}
+
+
+class FreeCountIndex:
+    """Hotels ordered by their number of rooms not held by reserve_room.
+
+    ``order`` holds (-free rooms, hotel id) pairs sorted, so the hotels
+    with at least n free rooms are a prefix found by bisection. Stays
+    booked through reservations are not counted: the count is an upper
+    bound that callers refine with an AvailabilityIndex.
+    """
+
+    def __init__(self) -> None:
+        """Create an empty index."""
+        self.free: dict[str, int] = {}
+        self.order: list[tuple[int, str]] = []
+
+    @classmethod
+    def build(cls, hotels: dict) -> "FreeCountIndex":
+        """Index every hotel of the data."""
+        index = cls()
+        index.free = {
+            hotel_id: hotel["reserved_rooms"].free_count()
+            for hotel_id, hotel in hotels.items()
+        }
+        index.order = sorted((-free, hotel_id)
+                             for hotel_id, free in index.free.items())
+        return index
+
+    def update(self, hotel_id: str, free: Optional[int]) -> None:
+        """Set the free room count of a hotel, or drop it if None."""
+        old = self.free.pop(hotel_id, None)
+        if old is not None:
+            del self.order[bisect_left(self.order, (-old, hotel_id))]
+        if free is not None:
+            self.free[hotel_id] = free
+            insort(self.order, (-free, hotel_id))
+
+    def at_least(self, count: int) -> list[str]:
+        """Return the hotels with count or more free rooms, most first."""
+        end = bisect_left(self.order, (1 - count,))
+        return [hotel_id for _, hotel_id in self.order[:end]]
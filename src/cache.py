@@ -0,0 +1,101 @@
+"""Read cache for hotel operations run outside a HotelStore.
+
+Such an operation loads the data, uses it and writes its changes back.
+The cache keeps the data of the last one together with the backend's
+stamp (see ``Backend.stamp``) and hands it to the next operation if the
+stamp still matches, so repeated reads and the existence checks before
+mutations skip the reload. The data is taken out of the cache while an
+operation uses it and only put back once its changes are written, so a
+failed write or a concurrent operation never sees it half-changed.
+
+Display lookups also go through a bounded LRU of record copies, each
+kept with the stamp of the part of the storage holding it; on a sharded
+backend, a customer stays cached while hotels are written.
+"""
+
+import threading
+from collections import OrderedDict
+from collections.abc import Hashable
+from typing import Optional
+from src.instrumentation import count
+
+
+class ReadCache:
+    """Stored data and records, valid while their stamps are unchanged."""
+
+    def __init__(self, size: int = 1024) -> None:
+        """Create an empty cache holding at most size records."""
+        self.size = size
+        self.records: OrderedDict[Hashable, tuple[dict, Optional[dict]]] = (
+            OrderedDict()
+        )
+        self.hits = 0
+        self.misses = 0
+        self.record_hits = 0
+        self.record_misses = 0
+        self._stamp: Optional[dict] = None
+        self._value: object = None
+        self._lock = threading.Lock()
+
+    def take(self, stamp: dict) -> object:
+        """Remove and return the cached data if it was cached at stamp."""
+        with self._lock:
+            cached, value = self._stamp, self._value
+            self._stamp = self._value = None
+            if stamp and cached == stamp:
+                self.hits += 1
+                count("cache_hits")
+                return value
+            self.misses += 1
+            count("cache_misses")
+            return None
+
+    def put(self, stamp: dict, value: object) -> None:
+        """Cache the data, as stored at stamp."""
+        if not stamp:
+            return
+        with self._lock:
+            self._stamp, self._value = stamp, value
+
+    def lookup(
+        self, key: Hashable, stamp: dict
+    ) -> tuple[bool, Optional[dict]]:
+        """Return (True, record) if key was remembered at stamp."""
+        with self._lock:
+            entry = self.records.get(key)
+            if stamp and entry is not None and entry[0] == stamp:
+                self.records.move_to_end(key)
+                self.record_hits += 1
+                count("record_cache_hits")
+                return True, entry[1]
+            self.record_misses += 1
+            count("record_cache_misses")
+            return False, None
+
+    def remember(
+        self, key: Hashable, stamp: dict, record: Optional[dict]
+    ) -> None:
+        """Remember a record (None if missing), evicting the oldest."""
+        if not stamp:
+            return
+        with self._lock:
+            self.records[key] = (stamp, record)
+            self.records.move_to_end(key)
+            while len(self.records) > self.size:
+                self.records.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop everything cached."""
+        with self._lock:
+            self._stamp = self._value = None
+            self.records.clear()
+
+    def stats(self) -> dict:
+        """Return the hit and miss counts and the number of records."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "record_hits": self.record_hits,
+            "record_misses": self.record_misses,
+            "records": len(self.records),
+        }
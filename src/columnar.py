@@ -0,0 +1,256 @@
+"""Columnar tables: a compact in-memory layout for large sections.
+
+A Table holds one section as parallel columns instead of one dict per
+record. Keys are interned and mapped to row numbers, integer fields
+are ``array('q')``, the rooms of every reservation share one
+``array('i')`` and the strings reservations repeat (customer and hotel
+IDs, dates) are interned, so a row costs a few pointers instead of a
+dict with its own copy of every field name.
+
+Records are read and written through Row views, slotted mappings over
+one row, so code written for dict records works on either layout:
+``table[key]["name"]``, ``table[key].update(...)``, ``dict(record)``
+and JSON serialisation behave as they do for a dict of dicts. A view
+is only valid while its key is in the table; a deleted row is reused
+by the next insert.
+"""
+
+import copy
+import sys
+from array import array
+from collections.abc import Mapping, MutableMapping
+from typing import Iterator, Optional
+
+SCHEMAS = {
+    "hotels": ("name", "total_rooms", "reserved_rooms"),
+    "customers": ("name", "email"),
+    "reservations": (
+        "customer_id", "hotel_id", "rooms", "check_in", "check_out"
+    ),
+}
+INT_FIELDS = frozenset({"total_rooms"})
+INTERNED_FIELDS = frozenset({"customer_id", "hotel_id", "check_in",
+                             "check_out"})
+ROOMS_FIELD = "rooms"
+
+
+class Row(MutableMapping):
+    """View of one row of a Table as a record mapping."""
+
+    __slots__ = ("table", "row")
+
+    def __init__(self, table: "Table", row: int) -> None:
+        """View row of table."""
+        self.table = table
+        self.row = row
+
+    def __getitem__(self, name: str) -> object:
+        """Return the value of a field."""
+        return self.table.get_field(self.row, name)
+
+    def __setitem__(self, name: str, value: object) -> None:
+        """Assign the value of a field."""
+        self.table.set_field(self.row, name, value)
+
+    def __delitem__(self, name: str) -> None:
+        """Refuse to drop a field: every row has all of them."""
+        raise ValueError(f"Field {name} cannot be deleted.")
+
+    def __iter__(self) -> Iterator[str]:
+        """Yield the field names."""
+        return iter(self.table.fields)
+
+    def __len__(self) -> int:
+        """Return the number of fields."""
+        return len(self.table.fields)
+
+    def __copy__(self) -> dict:
+        """Return the record as a dict."""
+        return dict(self)
+
+    def __deepcopy__(self, memo: dict) -> dict:
+        """Return the record as a dict of copied values."""
+        return copy.deepcopy(dict(self), memo)
+
+    def __repr__(self) -> str:
+        """Return the record as a dict would show it."""
+        return repr(dict(self))
+
+
+class Table(MutableMapping):
+    """One section stored as columns, keyed by interned record IDs.
+
+    ``rows`` maps keys to row numbers in insertion order, as a dict of
+    records would iterate. Freed rows are reused; the room pool keeps
+    each reservation's rooms as one slice and is compacted once more
+    than half of it belongs to deleted or replaced rows.
+    """
+
+    def __init__(self, fields: tuple[str, ...]) -> None:
+        """Create an empty table with the given record fields."""
+        self.fields = fields
+        self.names = frozenset(fields)
+        self.rows: dict[str, int] = {}
+        self.keys_of: list[Optional[str]] = []
+        self.free: list[int] = []
+        self.columns: dict[str, "array | list"] = {
+            name: array("q") if name in INT_FIELDS else []
+            for name in fields if name != ROOMS_FIELD
+        }
+        self.pool: Optional[array] = None
+        if ROOMS_FIELD in fields:
+            self.pool = array("i")
+            self.starts = array("q")
+            self.counts = array("i")
+            self.garbage = 0
+
+    @classmethod
+    def build(
+        cls, fields: tuple[str, ...], records: Mapping
+    ) -> "Table":
+        """Return a table holding the given records."""
+        table = cls(fields)
+        for key, record in records.items():
+            table[key] = record
+        return table
+
+    def get_field(self, row: int, name: str) -> object:
+        """Return the value of a field of a row."""
+        if name == ROOMS_FIELD and self.pool is not None:
+            start = self.starts[row]
+            return self.pool[start:start + self.counts[row]]
+        return self.columns[name][row]
+
+    def set_field(self, row: int, name: str, value: object) -> None:
+        """Assign the value of a field of a row."""
+        if name not in self.names:
+            raise ValueError(f"Unknown field {name}.")
+        if name == ROOMS_FIELD and self.pool is not None:
+            self._set_rooms(row, value)
+            return
+        if name in INTERNED_FIELDS and isinstance(value, str):
+            value = sys.intern(str(value))
+        column = self.columns[name]
+        try:
+            column[row] = value
+        except (TypeError, OverflowError):
+            # a value that does not fit the array: keep a plain list
+            column = self.columns[name] = list(column)
+            column[row] = value
+
+    def _set_rooms(self, row: int, rooms: object) -> None:
+        """Store the rooms of a row at the end of the pool."""
+        assert self.pool is not None
+        try:
+            packed = array("i", rooms)  # type: ignore[arg-type]
+        except (TypeError, OverflowError):
+            self.columns[ROOMS_FIELD] = [
+                list(self.get_field(i, ROOMS_FIELD))  # type: ignore
+                for i in range(len(self.keys_of))
+            ]
+            self.pool = None
+            self.columns[ROOMS_FIELD][row] = list(rooms)  # type: ignore
+            return
+        self.garbage += self.counts[row]
+        self.starts[row] = len(self.pool)
+        self.counts[row] = len(packed)
+        self.pool += packed
+        if self.garbage > max(len(self.pool) // 2, 1024):
+            self._compact_pool()
+
+    def _compact_pool(self) -> None:
+        """Rewrite the pool with only the rooms of live rows."""
+        assert self.pool is not None
+        pool = array("i")
+        for row in range(len(self.keys_of)):
+            start = self.starts[row]
+            self.starts[row] = len(pool)
+            pool += self.pool[start:start + self.counts[row]]
+        self.pool = pool
+        self.garbage = 0
+
+    def _allocate(self, key: str) -> int:
+        """Return a free row for key, growing the columns if needed."""
+        if self.free:
+            row = self.free.pop()
+            self.keys_of[row] = key
+            return row
+        row = len(self.keys_of)
+        self.keys_of.append(key)
+        for column in self.columns.values():
+            column.append(0 if isinstance(column, array) else None)
+        if self.pool is not None:
+            self.starts.append(len(self.pool))
+            self.counts.append(0)
+        return row
+
+    def __getitem__(self, key: str) -> Row:
+        """Return a view of a record."""
+        return Row(self, self.rows[key])
+
+    def get(self, key: str, default: object = None) -> object:
+        """Return a view of a record, or default if missing."""
+        row = self.rows.get(key)
+        return default if row is None else Row(self, row)
+
+    def __contains__(self, key: object) -> bool:
+        """Return True if the table holds key."""
+        return key in self.rows
+
+    def __setitem__(self, key: str, record: Mapping) -> None:
+        """Store a record, replacing the row of an existing key."""
+        if (isinstance(record, Row) and record.table is self and
+                self.rows.get(key) == record.row):
+            return
+        try:
+            values = [record[name] for name in self.fields]
+        except KeyError:
+            values = []
+        if len(values) != len(self.fields) or len(record) != len(values):
+            raise ValueError(
+                f"Record {key} does not have the fields {self.fields}."
+            )
+        row = self.rows.get(key)
+        if row is None:
+            if isinstance(key, str):
+                key = sys.intern(str(key))
+            row = self.rows[key] = self._allocate(key)
+        for name, value in zip(self.fields, values):
+            self.set_field(row, name, value)
+
+    def __delitem__(self, key: str) -> None:
+        """Delete a record and free its row."""
+        row = self.rows.pop(key)
+        self.keys_of[row] = None
+        for column in self.columns.values():
+            if not isinstance(column, array):
+                column[row] = None
+        if self.pool is not None:
+            self.garbage += self.counts[row]
+            self.counts[row] = 0
+        self.free.append(row)
+
+    def __iter__(self) -> Iterator[str]:
+        """Yield the keys in insertion order."""
+        return iter(self.rows)
+
+    def __len__(self) -> int:
+        """Return the number of records."""
+        return len(self.rows)
+
+    def __repr__(self) -> str:
+        """Return a short description."""
+        return f"Table({self.fields!r}, {len(self)} records)"
+
+
+def to_columnar(data: dict) -> dict:
+    """Return data with every known section as a Table.
+
+    Sections that already are Tables are kept; the records of lazy
+    sections are all decoded.
+    """
+    return {
+        name: Table.build(SCHEMAS[name], section)
+        if name in SCHEMAS and not isinstance(section, Table) else section
+        for name, section in data.items()
+    }
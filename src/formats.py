@@ -0,0 +1,292 @@
+"""On-disk formats for hotel data snapshots.
+
+``json`` is the original indented JSON, ``compact`` the same without
+whitespace and ``binary`` a packed, column-wise format:
+
+    magic  b"HTLB" + format version byte
+    then, for hotels, customers and reservations in that order:
+        section header  <QI  byte length of the columns, record count
+        columns         keys, each field in FIELDS order, then rooms
+
+A column of strings is an array of their UTF-8 byte lengths followed by
+the concatenated text, so it decodes with one ``decode()`` and slicing,
+or, when values repeat, a column of the distinct strings followed by an
+array of indexes into it; integers are a packed ``<q`` array and any
+other values a JSON list, each behind a one-byte tag. Reserved rooms
+are the RoomSet bitmaps as a bytes column and reservation rooms an array
+of per-reservation counts followed by all the room numbers as one packed
+``<i`` array.
+
+Run ``python -m src.formats SRC DST`` to convert between formats; each
+format is inferred from the extension (``.bin`` is binary, anything
+else JSON) unless ``--from``/``--to`` is given.
+"""
+
+import argparse
+import gc
+import json
+import struct
+import sys
+from array import array
+from itertools import accumulate
+from collections.abc import Mapping
+from typing import Iterator, Optional
+from src.rooms import RoomSet
+
+FORMATS = ("json", "compact", "binary")
+MAGIC = b"HTLB\x01"
+SECTIONS = ("hotels", "customers", "reservations")
+FIELDS = {
+    "hotels": ("name", "total_rooms"),
+    "customers": ("name", "email"),
+    "reservations": ("customer_id", "hotel_id", "check_in", "check_out"),
+}
+
+_U64 = struct.Struct("<Q")
+_SECTION = struct.Struct("<QI")
+_INT_MIN, _INT_MAX = -(1 << 63), (1 << 63) - 1
+_BIG_ENDIAN = sys.byteorder == "big"
+
+
+def pack(typecode: str, values: list) -> bytes:
+    """Pack integers little-endian with an array typecode."""
+    packed = array(typecode, values)
+    if _BIG_ENDIAN:
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def unpack(typecode: str, raw: bytes) -> list:
+    """Unpack the output of pack()."""
+    values = array(typecode)
+    values.frombytes(raw)
+    if _BIG_ENDIAN:
+        values.byteswap()
+    return values.tolist()
+
+
+def _spans(lengths: list[int]) -> Iterator[tuple[int, int]]:
+    """Yield the (start, end) offsets of consecutive lengths."""
+    offsets = [0, *accumulate(lengths)]
+    return zip(offsets, offsets[1:])
+
+
+def _bytes_column(out: bytearray, values: list[bytes]) -> None:
+    """Append byte strings as their lengths followed by their bytes."""
+    blob = b"".join(values)
+    out += pack("I", [len(value) for value in values])
+    out += _U64.pack(len(blob))
+    out += blob
+
+
+def _column(out: bytearray, values: list) -> None:
+    """Append one column of values with its type tag."""
+    if all(isinstance(value, str) for value in values):
+        unique = dict.fromkeys(values)
+        if values and len(unique) * 2 <= len(values):
+            positions = {value: i for i, value in enumerate(unique)}
+            out += b"d"
+            out += _U64.pack(len(unique))
+            _column(out, list(unique))
+            out += pack("I", [positions[value] for value in values])
+        else:
+            out += b"s"
+            _bytes_column(out, [value.encode("utf-8") for value in values])
+    elif all(isinstance(value, int) and not isinstance(value, bool)
+             and _INT_MIN <= value <= _INT_MAX for value in values):
+        out += b"i"
+        out += pack("q", values)
+    else:
+        raw = json.dumps(values).encode("utf-8")
+        out += b"j"
+        out += _U64.pack(len(raw))
+        out += raw
+
+
+def encode_binary(data: dict) -> bytes:
+    """Return the data in the binary format."""
+    out = bytearray(MAGIC)
+    for section in SECTIONS:
+        records = data[section]
+        columns = bytearray()
+        _column(columns, list(records))
+        for name in FIELDS[section]:
+            _column(columns, [record[name] for record in records.values()])
+        if section == "hotels":
+            _bytes_column(columns, [
+                record["reserved_rooms"].to_bytes()
+                if isinstance(record["reserved_rooms"], RoomSet)
+                else RoomSet.from_rooms(record["reserved_rooms"],
+                                        record["total_rooms"]).to_bytes()
+                for record in records.values()
+            ])
+        elif section == "reservations":
+            rooms = [record["rooms"] for record in records.values()]
+            columns += pack("I", [len(room_list) for room_list in rooms])
+            flat = [room for room_list in rooms for room in room_list]
+            columns += _U64.pack(len(flat))
+            columns += pack("i", flat)
+        out += _SECTION.pack(len(columns), len(records))
+        out += columns
+    return bytes(out)
+
+
+class _Reader:
+    """Cursor over a binary snapshot."""
+
+    def __init__(self, raw: bytes, pos: int = 0) -> None:
+        """Start reading raw at pos."""
+        self.raw = raw
+        self.pos = pos
+
+    def take(self, size: int) -> bytes:
+        """Return the next size bytes."""
+        chunk = self.raw[self.pos:self.pos + size]
+        self.pos += size
+        return chunk
+
+    def u64(self) -> int:
+        """Return the next unsigned 64-bit integer."""
+        return _U64.unpack(self.take(8))[0]
+
+    def bytes_column(self, count: int) -> tuple[list[int], bytes]:
+        """Return the lengths and concatenated bytes of a bytes column."""
+        lengths = unpack("I", self.take(4 * count))
+        return lengths, self.take(self.u64())
+
+    def column(self, count: int) -> list:
+        """Return the values of one tagged column."""
+        tag = self.take(1)
+        if tag == b"i":
+            return unpack("q", self.take(8 * count))
+        if tag == b"j":
+            return json.loads(self.take(self.u64()))
+        if tag == b"d":
+            unique = self.column(self.u64())
+            return [unique[i] for i in unpack("I", self.take(4 * count))]
+        if tag != b"s":
+            raise ValueError(f"Invalid binary column tag {tag!r}.")
+        lengths, blob = self.bytes_column(count)
+        text = blob.decode("utf-8")
+        if len(text) == len(blob):  # ASCII: byte offsets are char offsets
+            return [text[start:end] for start, end in _spans(lengths)]
+        return [blob[start:end].decode("utf-8")
+                for start, end in _spans(lengths)]
+
+
+def decode_binary(raw: bytes) -> dict:
+    """Return the data of a binary snapshot, with RoomSets."""
+    if raw[:len(MAGIC)] != MAGIC:
+        raise ValueError("Not a binary hotel data file.")
+    reader = _Reader(raw, len(MAGIC))
+    data: dict = {}
+    for section in SECTIONS:
+        count = _SECTION.unpack(reader.take(_SECTION.size))[1]
+        keys = reader.column(count)
+        columns = [reader.column(count) for _ in FIELDS[section]]
+        if section == "customers":
+            data[section] = {
+                key: {"name": name, "email": email}
+                for key, name, email in zip(keys, *columns)
+            }
+        elif section == "hotels":
+            lengths, blob = reader.bytes_column(count)
+            data[section] = {
+                key: {
+                    "name": name,
+                    "total_rooms": total,
+                    "reserved_rooms": RoomSet.from_bytes(
+                        blob[start:end], total
+                    )
+                }
+                for key, name, total, (start, end)
+                in zip(keys, *columns, _spans(lengths))
+            }
+        else:
+            counts = unpack("I", reader.take(4 * count))
+            flat = unpack("i", reader.take(4 * reader.u64()))
+            data[section] = {
+                key: {
+                    "customer_id": customer_id,
+                    "hotel_id": hotel_id,
+                    "rooms": flat[start:end],
+                    "check_in": check_in,
+                    "check_out": check_out
+                }
+                for key, customer_id, hotel_id, check_in, check_out,
+                (start, end) in zip(keys, *columns, _spans(counts))
+            }
+    return data
+
+
+def dumps(data: dict, fmt: str = "json") -> bytes:
+    """Serialise the data, lazy sections included, in one of FORMATS."""
+    if fmt == "binary":
+        return encode_binary(data)
+    if fmt == "compact":
+        text = json.dumps(data, separators=(",", ":"), default=plain)
+    elif fmt == "json":
+        text = json.dumps(data, indent=4, default=plain)
+    else:
+        raise ValueError(f"Unknown format {fmt}.")
+    return text.encode("utf-8")
+
+
+def plain(value: object) -> object:
+    """Return lazy sections as dicts and room sets as lists for json."""
+    return dict(value) if isinstance(value, Mapping) else list(value)
+
+
+def loads(raw: bytes, fmt: str = "json") -> dict:
+    """Parse data serialised by dumps().
+
+    Hotels of binary data come with RoomSets; JSON gives room lists.
+    The records are acyclic, so the garbage collector is paused while
+    they are built instead of rescanning them over and over.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt}.")
+    collect = gc.isenabled()
+    gc.disable()
+    try:
+        if fmt == "binary":
+            return decode_binary(raw)
+        return json.loads(raw)
+    finally:
+        if collect:
+            gc.enable()
+
+
+def detect(path: str) -> str:
+    """Guess the format of a file from its extension."""
+    return "binary" if path.endswith(".bin") else "json"
+
+
+def convert(
+    source: str,
+    target: str,
+    source_fmt: Optional[str] = None,
+    target_fmt: Optional[str] = None
+) -> None:
+    """Rewrite a data file in another format."""
+    with open(source, "rb") as f:
+        data = loads(f.read(), source_fmt or detect(source))
+    with open(target, "wb") as f:
+        f.write(dumps(data, target_fmt or detect(target)))
+
+
+def main() -> None:
+    """Convert a data file given on the command line."""
+    parser = argparse.ArgumentParser(
+        description="Convert hotel data between json, compact and binary."
+    )
+    parser.add_argument("source")
+    parser.add_argument("target")
+    parser.add_argument("--from", dest="source_fmt", choices=FORMATS)
+    parser.add_argument("--to", dest="target_fmt", choices=FORMATS)
+    args = parser.parse_args()
+    convert(args.source, args.target, args.source_fmt, args.target_fmt)
+
+
+if __name__ == "__main__":
+    main()
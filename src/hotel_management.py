@@ -1,83 +1,845 @@
 """Hotel management system."""
 
-import json
-import os
-from typing import Optional
-from dataclasses import dataclass, field
+import time
+from array import array
+from collections.abc import Mapping
+from contextlib import contextmanager
+from functools import partial
+from typing import Callable, Iterable, Iterator, Optional
+from dataclasses import dataclass, field, replace
+from src.availability import AvailabilityIndex, FreeCountIndex, stay
+from src.cache import ReadCache
+from src.columnar import to_columnar
+from src.feed import ChangeFeed
+from src.instrumentation import instrumented
+from src.references import ReferenceIndex
+from src.rooms import RoomSet
+from src.storage import (
+    Backend, ConflictError, JsonBackend, Scope, apply_change
+)
+from src.waitlist import Request, Waitlist
 
 JSON_FILE = "hotel.json"
+WAL = False
+FLUSH_RETRIES = 5
+
+
+class RoomTakenError(ValueError):
+    """Raised when the rooms a reservation asks for are taken."""
+
+
+class _Registry:
+    """The backend, feed and store the module's operations run against."""
+
+    def __init__(self) -> None:
+        """Start with the default backend, no feed and no store."""
+        self.backend: Optional[Backend] = None
+        self.feed: Optional[ChangeFeed] = None
+        # the innermost store entered, see HotelStore.__enter__
+        self.active: Optional["HotelStore"] = None
+        self._previous: list[Optional["HotelStore"]] = []
+
+    def enter(self, store: "HotelStore") -> None:
+        """Make store the active store until the matching leave()."""
+        self._previous.append(self.active)
+        self.active = store
+
+    def leave(self) -> None:
+        """Restore the store that was active before the last enter()."""
+        self.active = self._previous.pop()
+
+
+_registry = _Registry()
+_cache = ReadCache()
+_waitlist = Waitlist()
+
+
+def use_backend(backend: Optional[Backend]) -> None:
+    """Select the storage backend, or None for the default JSON file.
+
+    The waitlist is emptied: its requests were for the previous data.
+    """
+    _registry.backend = backend
+    _cache.clear()
+    _waitlist.clear()
+
+
+def read_cache() -> ReadCache:
+    """Return the cache used by operations run outside a HotelStore."""
+    return _cache
+
+
+def waitlist() -> Waitlist:
+    """Return the requests waiting for rooms (see Reservation.request)."""
+    return _waitlist
+
+
+def use_feed(feed: Optional[ChangeFeed]) -> None:
+    """Record the changes of the stores created from now on in feed."""
+    _registry.feed = feed
+
+
+def get_feed() -> Optional[ChangeFeed]:
+    """Return the change feed in use, None if changes are not recorded."""
+    return _registry.feed
+
+
+def get_backend() -> Backend:
+    """Return the configured storage backend."""
+    if _registry.backend is not None:
+        return _registry.backend
+    return JsonBackend(JSON_FILE, wal=WAL)
 
 
 def _load() -> dict:
-    """Load data from JSON file."""
-    if not os.path.exists(JSON_FILE):
-        return {"hotels": {}, "customers": {}, "reservations": {}}
-    with open(JSON_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
+    """Load data from the storage backend."""
+    return get_backend().load()
 
 
 def _save(data: dict) -> None:
-    """Write data to JSON file."""
-    with open(JSON_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4)
+    """Write data to the storage backend."""
+    get_backend().save(data)
+
+
+class HotelStore:
+    """In-memory session over the storage backend with write-back flushing.
+
+    The data is loaded once and every Customer, Hotel and Reservation
+    operation run while the store is active works on ``data`` in memory.
+    Pending change records are handed to the backend on ``flush()``, on
+    context-manager exit, or automatically once ``flush_every`` mutations
+    or ``flush_interval`` seconds have accumulated since the last write.
+
+    Flushes are optimistic: if another writer bumped the backend version
+    since the store loaded, the pending changes are re-validated and
+    replayed on the latest data and the write is retried. A change that
+    no longer applies raises ConflictError and the whole batch is
+    dropped in favour of the latest data.
+
+    With a ``cache``, the store starts from the cached data if the
+    backend's stamp still matches it, and puts its data back into the
+    cache when it exits after writing its changes.
+
+    With ``columnar``, the loaded sections are converted to columnar
+    Tables (see src.columnar), which take far less memory per record
+    than dicts; records are then Row views with the same interface.
+
+    With a ``feed`` (by default the one given to use_feed), every change
+    also records the changed record before and after it, and the
+    records of the changes a flush writes are appended to the feed once
+    the backend has them.
+
+    Inside ``transaction()`` every change also records the change that
+    undoes it, so the changes of a failed transaction can be rolled back
+    in memory; they are written by one flush when it ends.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[Backend] = None,
+        flush_every: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        cache: Optional[ReadCache] = None,
+        columnar: bool = False,
+        feed: Optional[ChangeFeed] = None
+    ) -> None:
+        """Load the data from the backend into memory."""
+        self.backend = backend or get_backend()
+        self.feed = feed or _registry.feed
+        self.feed_records: list[dict] = []
+        self._undo: Optional[list[dict]] = None
+        self._rollbacks: list[Callable[[], None]] = []
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.cache = cache
+        self.columnar = columnar
+        self.changes: list[dict] = []
+        self._last_flush = time.monotonic()
+        self.stamp: dict = {}
+        cached = None
+        if cache is not None:
+            self.stamp = self.backend.stamp()
+            cached = cache.take(self.stamp)
+        if cached is None:
+            self.version = self.backend.version()
+            self.data = self._loaded()
+            self._availability: Optional[AvailabilityIndex] = None
+            self._free_counts: Optional[FreeCountIndex] = None
+            self._references: Optional[ReferenceIndex] = None
+        else:
+            (self.version, self.data, self._availability,
+             self._free_counts, self._references) = cached
+            if columnar:
+                self.data = to_columnar(self.data)
+
+    def _loaded(self) -> dict:
+        """Load the stored data, as Tables if the store is columnar."""
+        data = self.backend.load()
+        return to_columnar(data) if self.columnar else data
+
+    @property
+    def dirty(self) -> bool:
+        """Return True if there are mutations not yet written."""
+        return bool(self.changes)
+
+    @property
+    def availability(self) -> AvailabilityIndex:
+        """Return the room interval index, building it on first use."""
+        if self._availability is None:
+            self._availability = AvailabilityIndex.build(
+                self.data["reservations"]
+            )
+        return self._availability
+
+    @property
+    def free_counts(self) -> FreeCountIndex:
+        """Return the free room count index, building it on first use."""
+        if self._free_counts is None:
+            self._free_counts = FreeCountIndex.build(self.data["hotels"])
+        return self._free_counts
+
+    @property
+    def references(self) -> ReferenceIndex:
+        """Return the reservation and email index, building it on first use."""
+        if self._references is None:
+            self._references = ReferenceIndex.build(self.data)
+        return self._references
+
+    def highest_room(self, hotel_id: str) -> int:
+        """Return the highest room of a hotel in use, or 0 if none is.
+
+        Rooms are in use when held by reserve_room or by a reservation,
+        whatever its stay.
+        """
+        highest = self.data["hotels"][hotel_id]["reserved_rooms"].highest()
+        reservations = self.data["reservations"]
+        for reservation_id in self.references.hotel_reservations(hotel_id):
+            highest = max([highest, *reservations[reservation_id]["rooms"]])
+        return highest
+
+    def verify(self) -> list[str]:
+        """Return the inconsistencies between the indexes and the data.
+
+        Every index built so far is compared with one rebuilt from the
+        data, and the references between records are checked.
+        """
+        problems = self.references.verify(self.data)
+        if self._availability is not None:
+            rebuilt = AvailabilityIndex.build(self.data["reservations"])
+            if ({key: value for key, value in
+                 self._availability.bookings.items() if value} !=
+                    {key: value for key, value in rebuilt.bookings.items()
+                     if value}):
+                problems.append("Index availability is stale.")
+        if self._free_counts is not None:
+            rebuilt_counts = FreeCountIndex.build(self.data["hotels"])
+            if self._free_counts.free != rebuilt_counts.free:
+                problems.append("Index free_counts is stale.")
+        return problems
+
+    def apply(self, change: dict) -> None:
+        """Apply a change record and flush if a threshold is reached."""
+        self.apply_many([change])
+
+    def apply_many(self, changes: list[dict], flush: bool = True) -> None:
+        """Apply change records, checking flush thresholds once at the end.
+
+        The indexes built so far follow the changes: a customer's or
+        reservation's entries are dropped before the change and added
+        back from the changed record.
+        """
+        free_counts = self._free_counts
+        for change in changes:
+            section = change.get("s", "hotels")
+            if self._undo is not None:
+                self._undo.append(self._inverse(section, change))
+            if self.feed is not None:
+                before = _copy(self.data[section].get(change["k"]))
+            indexed = section != "hotels" and (
+                self._availability is not None or
+                self._references is not None
+            )
+            if indexed:
+                old = self.data[section].get(change["k"])
+                if old is not None:
+                    self._index(section, change["k"], old, add=False)
+            apply_change(self.data, change)
+            if indexed:
+                new = self.data[section].get(change["k"])
+                if new is not None:
+                    self._index(section, change["k"], new)
+            if free_counts is not None and section == "hotels":
+                hotel = self.data["hotels"].get(change["k"])
+                free_counts.update(change["k"], None if hotel is None
+                                   else hotel["reserved_rooms"].free_count())
+            if self.feed is not None:
+                self.feed_records.append({
+                    "time": time.time(), "op": change["op"],
+                    "entity": section, "id": change["k"],
+                    "before": before,
+                    "after": _copy(self.data[section].get(change["k"]))
+                })
+        self.changes.extend(changes)
+        if flush:
+            self.flush_due()
+
+    def _inverse(self, section: str, change: dict) -> dict:
+        """Return the change record undoing change, before it is applied."""
+        key = change["k"]
+        record = self.data[section].get(key)
+        if change["op"] in ("reserve", "release"):
+            reserved = (record is not None and
+                        change["room"] in record["reserved_rooms"])
+            return {"op": "reserve" if reserved else "release", "k": key,
+                    "room": change["room"]}
+        if record is None:
+            return {"op": "del", "s": section, "k": key}
+        return {"op": "put", "s": section, "k": key, "v": _copy(record)}
+
+    @property
+    def in_transaction(self) -> bool:
+        """Return True inside transaction()."""
+        return self._undo is not None
+
+    def on_rollback(self, callback: Callable[[], None]) -> None:
+        """Call callback if the current transaction is rolled back.
+
+        Outside a transaction the callback is dropped. Used for state
+        kept outside the data, like the waitlist.
+        """
+        if self._undo is not None:
+            self._rollbacks.append(callback)
+
+    @contextmanager
+    def transaction(self) -> Iterator["HotelStore"]:
+        """Make the changes of the body one unit: all written or none.
+
+        Operations in the body see the changes before them, and nothing
+        is flushed until the outermost transaction ends, which flushes
+        all its changes in one write. If the body raises, its changes
+        are undone in memory, indexes included, before the exception
+        propagates; a nested transaction undoes only its own. A record
+        restored by a rollback moves to the end of its section's order.
+        """
+        outermost = self._undo is None
+        if outermost:
+            self._undo = []
+        assert self._undo is not None
+        marks = (len(self.changes), len(self.feed_records),
+                 len(self._undo), len(self._rollbacks))
+        try:
+            yield self
+        except BaseException:
+            self._rollback(*marks)
+            raise
+        finally:
+            if outermost:
+                self._undo = None
+                self._rollbacks = []
+        if outermost:
+            self.flush()
+
+    def _rollback(
+        self, changes: int, feed_records: int, undo: int, rollbacks: int
+    ) -> None:
+        """Undo the changes made since the given list lengths."""
+        assert self._undo is not None
+        inverses = self._undo[undo:][::-1]
+        callbacks = self._rollbacks[rollbacks:][::-1]
+        del self._undo[undo:], self._rollbacks[rollbacks:]
+        saved, self._undo = self._undo, None
+        try:
+            self.apply_many(inverses, flush=False)
+        finally:
+            self._undo = saved
+        del self.changes[changes:], self.feed_records[feed_records:]
+        for callback in callbacks:
+            callback()
+
+    def flush_due(self) -> None:
+        """Flush if the flush_every or flush_interval threshold is reached."""
+        if self.flush_every and len(self.changes) >= self.flush_every:
+            self.flush()
+        elif (self.flush_interval is not None and
+              time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def _index(
+        self, section: str, key: str, record: dict, add: bool = True
+    ) -> None:
+        """Add a customer or reservation to the built indexes, or drop it."""
+        if self._references is not None:
+            if add:
+                self._references.add(section, key, record)
+            else:
+                self._references.remove(section, key, record)
+        if self._availability is not None and section == "reservations":
+            if add:
+                self._availability.add(key, record)
+            else:
+                self._availability.remove(key, record)
+
+    @instrumented("HotelStore.flush")
+    def flush(self) -> None:
+        """Hand pending changes to the backend if the store is dirty.
+
+        Inside a transaction nothing is written until it ends.
+        """
+        if self._undo is not None:
+            return
+        if self.dirty:
+            for attempt in range(FLUSH_RETRIES):
+                try:
+                    self.version = self.backend.save(
+                        self.data, self.changes, self.version
+                    )
+                    break
+                except ConflictError:
+                    if attempt == FLUSH_RETRIES - 1:
+                        raise
+                    self._rebase()
+            if self.cache is not None:
+                self.stamp.update(self.backend.stamp(
+                    (change.get("s", "hotels"), change["k"])
+                    for change in self.changes
+                ))
+            self.changes = []
+            if self.feed_records:
+                assert self.feed is not None
+                self.feed.append(self.feed_records)
+                self.feed_records = []
+        self._last_flush = time.monotonic()
+
+    def discard(self) -> None:
+        """Drop the pending changes without writing them.
+
+        The data in memory still holds them: reload() the store, or stop
+        using it.
+        """
+        self.changes = []
+        self.feed_records = []
+
+    @instrumented("HotelStore.reload")
+    def reload(self) -> None:
+        """Discard pending changes and reload the stored data."""
+        if self.cache is not None:
+            self.stamp = self.backend.stamp()
+        self.version = self.backend.version()
+        self.data = self._loaded()
+        self.changes = []
+        self.feed_records = []
+        self._availability = None
+        self._free_counts = None
+        self._references = None
+
+    def _rebase(self) -> None:
+        """Replay the pending changes on top of the latest stored data."""
+        changes = self.changes
+        self.reload()
+        for change in changes:
+            try:
+                self._check(change)
+            except ConflictError:
+                self.reload()
+                raise
+            self.apply_many([change], flush=False)
+
+    def _check(self, change: dict) -> None:
+        """Raise ConflictError if a change no longer applies cleanly."""
+        op = change["op"]
+        if op in ("reserve", "release"):
+            hotel = self.data["hotels"].get(change["k"])
+            room = change["room"]
+            if hotel is None:
+                raise ConflictError(f"Hotel {change['k']} not found.")
+            if op == "reserve" and room in hotel["reserved_rooms"]:
+                raise ConflictError(f"Room {room} is already reserved.")
+            if op == "release" and room not in hotel["reserved_rooms"]:
+                raise ConflictError(f"Room {room} is not reserved.")
+            return
+
+        section, key = change["s"], change["k"]
+        if op == "put" and key in self.data[section]:
+            raise ConflictError(f"{section} {key} already exists.")
+        if op in ("set", "del") and key not in self.data[section]:
+            raise ConflictError(f"{section} {key} not found.")
+        if op in ("put", "set") and section == "customers":
+            owner = self.references.customer_with_email(
+                change["v"].get("email", "")
+            )
+            if owner not in (None, key):
+                raise ConflictError(f"Email {change['v']['email']} is used.")
+        if op == "del" and (
+            section == "customers" and
+            self.references.customer_reservations(key) or
+            section == "hotels" and self.references.hotel_reservations(key)
+        ):
+            raise ConflictError(f"{section} {key} has reservations.")
+        if op == "set" and section == "hotels":
+            highest = self.highest_room(key)
+            if change["v"].get("total_rooms", highest) < highest:
+                raise ConflictError(f"Room {highest} is reserved.")
+        if op == "put" and section == "reservations":
+            record = change["v"]
+            hotel = self.data["hotels"].get(record["hotel_id"])
+            if (hotel is None or
+                    record["customer_id"] not in self.data["customers"]):
+                raise ConflictError(f"reservations {key} lost its target.")
+            start, end = stay(record["check_in"], record["check_out"])
+            for room in record["rooms"]:
+                if (room in hotel["reserved_rooms"] or
+                        self.availability.conflict(
+                            record["hotel_id"], room, start, end
+                        ) is not None):
+                    raise ConflictError(
+                        f"Room {room} is already reserved."
+                    )
+
+    @instrumented("HotelStore.compact")
+    def compact(self) -> None:
+        """Flush, then fold the backend's incremental writes."""
+        self.flush()
+        self.backend.compact(self.data)
+
+    def __enter__(self) -> "HotelStore":
+        """Make this store the target of all hotel operations."""
+        _registry.enter(self)
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        """Flush pending changes and restore the previous store."""
+        try:
+            self.flush()
+            if self.cache is not None:
+                self.cache.put(self.stamp, (
+                    self.version, self.data, self._availability,
+                    self._free_counts, self._references
+                ))
+        finally:
+            _registry.leave()
+
+
+@contextmanager
+def _session(scope: Scope = None) -> Iterator[HotelStore]:
+    """Yield the active store, or a one-shot store over the data file.
+
+    The one-shot store holds the backend lock for the entities in scope
+    (every entity if None) until its changes are written, and reuses the
+    data of the previous one-shot store while the read cache is valid.
+    """
+    if _registry.active is not None:
+        yield _registry.active
+        return
+    backend = get_backend()
+    with backend.locked(scope):
+        with HotelStore(backend, cache=_cache) as store:
+            yield store
+
+
+@contextmanager
+def transaction() -> Iterator[HotelStore]:
+    """Run the operations of the body as one unit.
+
+    Any mix of Customer, Hotel and Reservation operations may run in
+    the body; each is validated against the changes of those before it
+    and they are written together in one write when the body ends. If
+    the body raises, none of them is written and the data is as it was
+    (see HotelStore.transaction). Inside an active store the transaction
+    uses it; otherwise it holds the backend lock and a one-shot store
+    for its whole body.
+
+        with transaction():
+            Customer("C1", "Alice", "a@example.com").create()
+            Reservation("R1", "C1", "H1", [1], "2026-03-01",
+                        "2026-03-03").create()
+    """
+    if _registry.active is not None:
+        with _registry.active.transaction():
+            yield _registry.active
+        return
+    backend = get_backend()
+    with backend.locked(), HotelStore(backend, cache=_cache) as store:
+        with store.transaction():
+            yield store
+
+
+def _pick_rooms(
+    store: HotelStore,
+    hotel_id: str,
+    count: int,
+    check_in: str,
+    check_out: str
+) -> list[int]:
+    """Return the count lowest rooms of a hotel free for the stay."""
+    hotel = store.data["hotels"].get(hotel_id)
+    if hotel is None:
+        raise ValueError(f"Hotel {hotel_id} not found.")
+    if count < 1:
+        raise ValueError(f"Invalid room count {count}.")
+    start, end = stay(check_in, check_out)
+    booked = store.availability.booked(hotel_id, start, end)
+    reserved = hotel["reserved_rooms"]
+    rooms: list[int] = []
+    room = reserved.next_free()
+    while room is not None and len(rooms) < count:
+        if room not in booked:
+            rooms.append(room)
+        room = reserved.next_free(room + 1)
+    if len(rooms) < count:
+        raise RoomTakenError(
+            f"Hotel {hotel_id} has only {len(rooms)} free rooms."
+        )
+    return rooms
+
+
+def _check_email(store: HotelStore, customer_id: str, email: str) -> None:
+    """Raise ValueError if another customer already uses the email."""
+    owner = store.references.customer_with_email(email)
+    if owner not in (None, customer_id):
+        raise ValueError(f"Email {email} is used by customer {owner}.")
+
+
+def _cascade(store: HotelStore, reservation_ids: list[str]) -> list[dict]:
+    """Return the change records cancelling reservations.
+
+    Data written before reservations held their rooms only for their
+    stay also has those rooms in the hotel's reserved_rooms; the rooms
+    of a reservation still held there are released with it.
+    """
+    data = store.data
+    changes = []
+    released: set[tuple[str, int]] = set()
+    for reservation_id in reservation_ids:
+        record = data["reservations"][reservation_id]
+        hotel_id = record["hotel_id"]
+        held = data["hotels"][hotel_id]["reserved_rooms"]
+        for room in record["rooms"]:
+            if room in held and (hotel_id, room) not in released:
+                released.add((hotel_id, room))
+                changes.append({"op": "release", "k": hotel_id,
+                                "room": room})
+        changes.append({"op": "del", "s": "reservations",
+                        "k": reservation_id})
+    return changes
+
+
+def _free_rooms(
+    store: HotelStore, changes: list[dict], hotel_ids: Iterable[str]
+) -> None:
+    """Apply changes that free rooms, then book the requests waiting.
+
+    Requests waiting for the hotels are booked in the same write as the
+    changes, in waitlist order, when the rooms they need are now free.
+    """
+    store.apply_many(changes, flush=False)
+    for hotel_id in hotel_ids:
+        if _waitlist.depth(hotel_id):
+            _book_waiting(store, hotel_id)
+    store.flush_due()
+
+
+def _book_waiting(store: HotelStore, hotel_id: str) -> None:
+    """Book the next waiting requests of a hotel that fit.
+
+    Requests that became invalid, e.g. for a deleted customer or a
+    room no longer in the hotel, are dropped; those whose rooms are
+    still taken keep their place.
+    """
+    data = store.data
+    kept = []
+    for request in _waitlist.take(hotel_id):
+        if (request.reservation_id in data["reservations"] or
+                request.customer_id not in data["customers"] or
+                hotel_id not in data["hotels"] or
+                max([request.count, *request.rooms]) >
+                data["hotels"][hotel_id]["total_rooms"]):
+            _waitlist.done(request, booked=False)
+            store.on_rollback(partial(_waitlist.restore, request, False))
+            continue
+        reservation = Reservation(
+            request.reservation_id, request.customer_id, hotel_id,
+            list(request.rooms), request.check_in, request.check_out
+        )
+        try:
+            if request.count:
+                reservation.rooms = _pick_rooms(
+                    store, hotel_id, request.count, request.check_in,
+                    request.check_out
+                )
+            record = reservation.validate(store, {}, AvailabilityIndex())
+        except RoomTakenError:
+            kept.append(request)
+            continue
+        store.apply_many([{"op": "put", "s": "reservations",
+                           "k": request.reservation_id, "v": record}],
+                         flush=False)
+        _waitlist.done(request)
+        store.on_rollback(partial(_waitlist.restore, request))
+    _waitlist.requeue(kept)
+
+
+def _lookup(section: str, key: str) -> Optional[dict]:
+    """Return a copy of a stored record for display, None if missing.
+
+    Outside a store the copy comes from the read cache while the part
+    of the storage holding the record is unchanged.
+    """
+    if _registry.active is not None:
+        return _copy(_registry.active.data[section].get(key))
+    backend = get_backend()
+    scope = [(section, key)]
+    found, record = _cache.lookup((section, key), backend.stamp(scope))
+    if not found:
+        with _session(scope) as store:
+            record = _copy(store.data[section].get(key))
+            stamp = backend.stamp(scope)
+        _cache.remember((section, key), stamp, record)
+    # the cached record is shared with later lookups
+    return _copy(record)
+
+
+def _copy(record: Optional[Mapping]) -> Optional[dict]:
+    """Return a deep copy of a record, room collections as plain lists."""
+    if record is None:
+        return None
+    return {name: _copy_value(value) for name, value in record.items()}
+
+
+def _copy_value(value: object) -> object:
+    """Return a deep copy of a record value for _copy."""
+    if isinstance(value, Mapping):
+        return {name: _copy_value(item) for name, item in value.items()}
+    if isinstance(value, (RoomSet, list, array)):
+        return [_copy_value(item) for item in value]
+    return value
+
+
+@instrumented("export")
+def export(path: str, since: Optional[int] = None) -> int:
+    """Write the data, or its changes after since, for downstream copies.
+
+    Pending changes are written first, so the export includes exactly
+    the changes of the feed up to the sequence number it returns (see
+    ChangeFeed.export).
+    """
+    with _session() as store:
+        if store.in_transaction:
+            raise ValueError("Cannot export inside a transaction.")
+        store.flush()
+        if store.feed is None:
+            raise ValueError("No change feed is in use.")
+        return store.feed.export(path, store.data, since)
 
 
 class Customer:
     """Custormer for hotel."""
 
+    __slots__ = ("customer_id", "name", "email")
+
     def __init__(self, customer_id: str, name: str, email: str) -> None:
         """Create customer entity."""
         self.customer_id = customer_id
         self.name = name
         self.email = email
 
+    @instrumented("Customer.create")
     def create(self) -> None:
         """Create customer and save on JSON."""
-        data = _load()
-        if self.customer_id in data["customers"]:
-            raise ValueError(f"Customer {self.customer_id} already exists.")
+        with _session([("customers", self.customer_id)]) as store:
+            data = store.data
+            if self.customer_id in data["customers"]:
+                raise ValueError(
+                    f"Customer {self.customer_id} already exists."
+                )
+            _check_email(store, self.customer_id, self.email)
 
-        data["customers"][self.customer_id] = {
-            "name": self.name,
-            "email": self.email
-        }
+            store.apply({
+                "op": "put", "s": "customers", "k": self.customer_id,
+                "v": {"name": self.name, "email": self.email}
+            })
+
+    @staticmethod
+    @instrumented("Customer.delete")
+    def delete(customer_id: str, cascade: bool = False) -> None:
+        """Delete customer using ID.
+
+        A customer with reservations is only deleted with ``cascade``,
+        which cancels the reservations in the same write.
+        """
+        scope = [("customers", customer_id), ("reservations", customer_id)]
+        with _session(scope) as store:
+            data = store.data
+            if customer_id not in data["customers"]:
+                raise ValueError(f"Customer {customer_id} not found.")
+            reservations = store.references.customer_reservations(
+                customer_id
+            )
+            if reservations and not cascade:
+                raise ValueError(
+                    f"Customer {customer_id} has "
+                    f"{len(reservations)} reservations."
+                )
 
-        _save(data)
+            hotels = {data["reservations"][key]["hotel_id"]
+                      for key in reservations}
+            _free_rooms(store, _cascade(store, reservations) + [
+                {"op": "del", "s": "customers", "k": customer_id}
+            ], hotels)
 
     @staticmethod
-    def delete(customer_id: str) -> None:
-        """Delete customer using ID."""
-        data = _load()
-        if customer_id not in data["customers"]:
-            raise ValueError(f"Customer {customer_id} not found.")
+    @instrumented("Customer.reservations")
+    def reservations(customer_id: str) -> list[str]:
+        """Return the IDs of a customer's reservations."""
+        with _session([("customers", customer_id),
+                       ("reservations", customer_id)]) as store:
+            if customer_id not in store.data["customers"]:
+                raise ValueError(f"Customer {customer_id} not found.")
+            return store.references.customer_reservations(customer_id)
 
-        del data["customers"][customer_id]
-        _save(data)
+    @staticmethod
+    @instrumented("Customer.find_by_email")
+    def find_by_email(email: str) -> Optional[str]:
+        """Return the ID of the customer with an email, None if none."""
+        with _session([("customers", email)]) as store:
+            return store.references.customer_with_email(email)
 
     @staticmethod
-    def display_customer_info(customer_id: str) -> None:
-        """Print customer info using ID."""
-        data = _load()
-        if customer_id not in data["customers"]:
+    @instrumented("Customer.info")
+    def info(customer_id: str) -> dict:
+        """Return a copy of customer info using ID."""
+        customer = _lookup("customers", customer_id)
+        if customer is None:
             raise ValueError(f"Customer {customer_id} not found.")
+        return customer
 
-        print(data["customers"][customer_id])
+    @staticmethod
+    @instrumented("Customer.display_customer_info")
+    def display_customer_info(customer_id: str) -> None:
+        """Print customer info using ID."""
+        print(Customer.info(customer_id))
 
     @staticmethod
+    @instrumented("Customer.modify")
     def modify(
         customer_id: str,
         name: Optional[str] = None,
         email: Optional[str] = None
     ) -> None:
         """Update the name, or email of a customer by ID."""
-        data = _load()
-        if customer_id not in data["customers"]:
-            raise ValueError(f"Customer {customer_id} not found.")
-        if name:
-            data["customers"][customer_id]["name"] = name
-        if email:
-            data["customers"][customer_id]["email"] = email
-        _save(data)
+        with _session([("customers", customer_id)]) as store:
+            data = store.data
+            if customer_id not in data["customers"]:
+                raise ValueError(f"Customer {customer_id} not found.")
+            fields: dict = {}
+            if name:
+                fields["name"] = name
+            if email:
+                _check_email(store, customer_id, email)
+                fields["email"] = email
+            store.apply({
+                "op": "set", "s": "customers", "k": customer_id,
+                "v": fields
+            })
 
 
 @dataclass(slots=True)
@@ -90,10 +852,123 @@ class Reservation:
     check_in: str = ""
     check_out: str = ""
 
-    def create(self) -> None:
-        """Create reservation and save on JSON."""
-        data = _load()
-        if self.reservation_id in data["reservations"]:
+    @instrumented("Reservation.create")
+    def create(self, auto_assign: int = 0) -> None:
+        """Create reservation and save on JSON.
+
+        The rooms are held only from check-in to check-out; an empty date
+        leaves the stay open-ended on that side. With ``auto_assign`` set,
+        that many free rooms are picked for the stay, lowest numbers
+        first, and stored in ``rooms``.
+        """
+        if not auto_assign:
+            Reservation.bulk_create([self])
+            return
+        scope = [("reservations", self.reservation_id),
+                 ("customers", self.customer_id), ("hotels", self.hotel_id)]
+        with _session(scope) as store:
+            rooms = self.rooms
+            if (self.customer_id in store.data["customers"] and
+                    self.hotel_id in store.data["hotels"]):
+                rooms = _pick_rooms(store, self.hotel_id, auto_assign,
+                                    self.check_in, self.check_out)
+            Reservation.bulk_create([replace(self, rooms=rooms)])
+            self.rooms = rooms
+
+    @instrumented("Reservation.request")
+    def request(self, auto_assign: int = 0, priority: int = 0) -> bool:
+        """Create the reservation, or put it on its hotel's waitlist.
+
+        Returns True if the reservation was created. If its rooms, or
+        ``auto_assign`` free rooms, are taken for the stay, the request
+        waits and False is returned: it is created in the write of the
+        first cancellation that frees them, higher ``priority`` first,
+        then in request order. A request that could never be booked,
+        for a missing customer or room or with an invalid date, raises
+        ValueError like create().
+        """
+        scope = [("reservations", self.reservation_id),
+                 ("customers", self.customer_id), ("hotels", self.hotel_id)]
+        with _session(scope) as store:
+            data = store.data
+            if self.reservation_id in data["reservations"]:
+                raise ValueError(
+                    f"Reservation {self.reservation_id} already exists."
+                )
+            if self.customer_id not in data["customers"]:
+                raise ValueError(f"Customer {self.customer_id} not found.")
+            if self.hotel_id not in data["hotels"]:
+                raise ValueError(f"Hotel {self.hotel_id} not found.")
+            total_rooms = data["hotels"][self.hotel_id]["total_rooms"]
+            if auto_assign < 0:
+                raise ValueError(f"Invalid room count {auto_assign}.")
+            if auto_assign > total_rooms:
+                raise ValueError(
+                    f"Hotel {self.hotel_id} has only {total_rooms} rooms."
+                )
+            seen: set[int] = set()
+            for room in self.rooms:
+                if not 1 <= room <= total_rooms:
+                    raise ValueError(f"Room {room} does not exist.")
+                if room in seen:
+                    raise ValueError(f"Room {room} is requested twice.")
+                seen.add(room)
+            stay(self.check_in, self.check_out)  # invalid dates raise
+            try:
+                self.create(auto_assign)
+            except RoomTakenError:
+                request = Request(
+                    self.reservation_id, self.customer_id, self.hotel_id,
+                    list(self.rooms), auto_assign, self.check_in,
+                    self.check_out, priority
+                )
+                _waitlist.add(request)
+                store.on_rollback(partial(_waitlist.forget, request))
+                return False
+        return True
+
+    @staticmethod
+    @instrumented("Reservation.withdraw")
+    def withdraw(reservation_id: str) -> None:
+        """Remove a request from the waitlist."""
+        _waitlist.withdraw(reservation_id)
+
+    @staticmethod
+    @instrumented("Reservation.bulk_create")
+    def bulk_create(reservations: list["Reservation"]) -> None:
+        """Create many reservations in one write, all or none of them.
+
+        Every reservation is validated against the stored data and the
+        reservations before it in the batch; nothing is applied unless
+        all of them pass.
+        """
+        scope = [("reservations", r.reservation_id) for r in reservations]
+        scope += [("customers", r.customer_id) for r in reservations]
+        scope += [("hotels", r.hotel_id) for r in reservations]
+        with _session(scope) as store:
+            batch: dict[str, dict] = {}
+            index = AvailabilityIndex()
+            for reservation in reservations:
+                record = reservation.validate(store, batch, index)
+                batch[reservation.reservation_id] = record
+                index.add(reservation.reservation_id, record)
+
+            store.apply_many([
+                {"op": "put", "s": "reservations", "k": key, "v": record}
+                for key, record in batch.items()
+            ])
+
+    def validate(
+        self, store: "HotelStore", batch: dict, index: AvailabilityIndex
+    ) -> dict:
+        """Check the reservation can be created and return its record.
+
+        It is checked against the data of store and against batch, the
+        records created with it so far, whose rooms are in index.
+        """
+        data = store.data
+        if (self.reservation_id in data["reservations"] or
+                self.reservation_id in batch):
             raise ValueError(
                 f"Reservation {self.reservation_id} already exists."
             )
@@ -102,119 +977,262 @@ class Reservation:
         if self.hotel_id not in data["hotels"]:
             raise ValueError(f"Hotel {self.hotel_id} not found.")
 
+        hotel = data["hotels"][self.hotel_id]
+        start, end = stay(self.check_in, self.check_out)
+        seen: set[int] = set()
         for room in self.rooms:
-            Hotel.reserve_room(self.hotel_id, room)
-            data = _load()
+            if not 1 <= room <= hotel["total_rooms"]:
+                raise ValueError(f"Room {room} does not exist.")
+            if (room in hotel["reserved_rooms"] or room in seen or
+                    store.availability.conflict(
+                        self.hotel_id, room, start, end
+                    ) is not None or
+                    index.conflict(self.hotel_id, room, start, end)
+                    is not None):
+                raise RoomTakenError(f"Room {room} is already reserved.")
+            seen.add(room)
 
-        data["reservations"][self.reservation_id] = {
+        return {
             "customer_id": self.customer_id,
             "hotel_id": self.hotel_id,
-            "rooms": self.rooms,
+            "rooms": list(self.rooms),
             "check_in": self.check_in,
             "check_out": self.check_out
         }
-        _save(data)
 
     @staticmethod
+    @instrumented("Reservation.cancel")
     def cancel(reservation_id: str) -> None:
         """Cancel a reservation."""
-        data = _load()
-        if reservation_id not in data["reservations"]:
-            raise ValueError(f"Reservation {reservation_id} not found.")
-        reservation = data["reservations"][reservation_id]
+        Reservation.bulk_cancel([reservation_id])
 
-        for room in reservation["rooms"]:
-            Hotel.cancel_room(reservation["hotel_id"], room)
+    @staticmethod
+    @instrumented("Reservation.bulk_cancel")
+    def bulk_cancel(reservation_ids: list[str]) -> None:
+        """Cancel many reservations in one write, all or none of them."""
+        scope = [("reservations", key) for key in reservation_ids]
+        with _session(scope) as store:
+            data = store.data
+            seen: set[str] = set()
+            for reservation_id in reservation_ids:
+                if (reservation_id not in data["reservations"] or
+                        reservation_id in seen):
+                    raise ValueError(
+                        f"Reservation {reservation_id} not found."
+                    )
+                seen.add(reservation_id)
 
-        data = _load()
-        del data["reservations"][reservation_id]
-        _save(data)
+            hotels = {data["reservations"][key]["hotel_id"]
+                      for key in reservation_ids}
+            _free_rooms(store, _cascade(store, reservation_ids), hotels)
 
 
 class Hotel:
     """Hotel with a set of rooms."""
 
+    __slots__ = ("hotel_id", "name", "total_rooms")
+
     def __init__(self, hotel_id: str, name: str, total_rooms: int) -> None:
         """Create hotel entity."""
         self.hotel_id = hotel_id
         self.name = name
         self.total_rooms = total_rooms
 
+    @instrumented("Hotel.create")
     def create(self) -> None:
         """Create hotel and save on JSON."""
-        data = _load()
-        if self.hotel_id in data["hotels"]:
-            raise ValueError(f"Hotel {self.hotel_id} already exists.")
-
-        data["hotels"][self.hotel_id] = {
-            "name": self.name,
-            "total_rooms": self.total_rooms,
-            "reserved_rooms": []
-        }
+        with _session([("hotels", self.hotel_id)]) as store:
+            data = store.data
+            if self.hotel_id in data["hotels"]:
+                raise ValueError(f"Hotel {self.hotel_id} already exists.")
 
-        _save(data)
+            store.apply({
+                "op": "put", "s": "hotels", "k": self.hotel_id,
+                "v": {
+                    "name": self.name,
+                    "total_rooms": self.total_rooms,
+                    "reserved_rooms": []
+                }
+            })
 
     @staticmethod
-    def delete(hotel_id: str) -> None:
-        """Delete hotel using ID."""
-        data = _load()
-        if hotel_id not in data["hotels"]:
-            raise ValueError(f"hotel {hotel_id} not found.")
+    @instrumented("Hotel.delete")
+    def delete(hotel_id: str, cascade: bool = False) -> None:
+        """Delete hotel using ID.
 
-        del data["hotels"][hotel_id]
-        _save(data)
+        A hotel with reservations is only deleted with ``cascade``,
+        which cancels the reservations in the same write.
+        """
+        with _session([("hotels", hotel_id),
+                       ("reservations", hotel_id)]) as store:
+            data = store.data
+            if hotel_id not in data["hotels"]:
+                raise ValueError(f"hotel {hotel_id} not found.")
+            reservations = store.references.hotel_reservations(hotel_id)
+            if reservations and not cascade:
+                raise ValueError(
+                    f"Hotel {hotel_id} has {len(reservations)} reservations."
+                )
+
+            store.apply_many(_cascade(store, reservations) + [
+                {"op": "del", "s": "hotels", "k": hotel_id}
+            ])
+            for request in _waitlist.discard_hotel(hotel_id):
+                store.on_rollback(partial(_waitlist.restore, request, False))
 
     @staticmethod
-    def display_hotel_info(hotel_id: str) -> None:
-        """Print hotel info using ID."""
-        data = _load()
-        if hotel_id not in data["hotels"]:
+    @instrumented("Hotel.reservations")
+    def reservations(hotel_id: str) -> list[str]:
+        """Return the IDs of a hotel's reservations."""
+        with _session([("hotels", hotel_id),
+                       ("reservations", hotel_id)]) as store:
+            if hotel_id not in store.data["hotels"]:
+                raise ValueError(f"Hotel {hotel_id} not found.")
+            return store.references.hotel_reservations(hotel_id)
+
+    @staticmethod
+    @instrumented("Hotel.info")
+    def info(hotel_id: str) -> dict:
+        """Return a copy of hotel info using ID."""
+        hotel = _lookup("hotels", hotel_id)
+        if hotel is None:
             raise ValueError(f"hotel {hotel_id} not found.")
+        return hotel
 
-        print(data["hotels"][hotel_id])
+    @staticmethod
+    @instrumented("Hotel.display_hotel_info")
+    def display_hotel_info(hotel_id: str) -> None:
+        """Print hotel info using ID."""
+        print(Hotel.info(hotel_id))
 
     @staticmethod
+    @instrumented("Hotel.modify")
     def modify(
         hotel_id: str,
         name: Optional[str] = None,
         total_rooms: Optional[int] = None
     ) -> None:
         """Update the name, total rooms of a hotel by ID."""
-        data = _load()
-        if hotel_id not in data["hotels"]:
-            raise ValueError(f"Hotel {hotel_id} not found.")
-        if name:
-            data["hotels"][hotel_id]["name"] = name
-        if total_rooms:
-            data["hotels"][hotel_id]["total_rooms"] = total_rooms
-        _save(data)
+        with _session([("hotels", hotel_id),
+                       ("reservations", hotel_id)]) as store:
+            data = store.data
+            if hotel_id not in data["hotels"]:
+                raise ValueError(f"Hotel {hotel_id} not found.")
+            fields: dict = {}
+            if name:
+                fields["name"] = name
+            if total_rooms:
+                highest = store.highest_room(hotel_id)
+                if total_rooms < highest:
+                    raise ValueError(f"Room {highest} is reserved.")
+                fields["total_rooms"] = total_rooms
+            _free_rooms(store, [
+                {"op": "set", "s": "hotels", "k": hotel_id, "v": fields}
+            ], [hotel_id] if total_rooms else [])
 
     @staticmethod
+    @instrumented("Hotel.reserve_room")
     def reserve_room(hotel_id: str, room_number: int) -> None:
         """Reserved room in a hotel."""
-        data = _load()
-        if hotel_id not in data["hotels"]:
-            raise ValueError(f"Hotel {hotel_id} not found.")
+        with _session([("hotels", hotel_id)]) as store:
+            data = store.data
+            if hotel_id not in data["hotels"]:
+                raise ValueError(f"Hotel {hotel_id} not found.")
 
-        hotel = data["hotels"][hotel_id]
+            hotel = data["hotels"][hotel_id]
 
-        if room_number > hotel["total_rooms"]:
-            raise ValueError(f"Room {room_number} does not exist.")
+            if not 1 <= room_number <= hotel["total_rooms"]:
+                raise ValueError(f"Room {room_number} does not exist.")
 
-        if room_number in hotel["reserved_rooms"]:
-            raise ValueError(f"Room {room_number} is already reserved.")
+            if room_number in hotel["reserved_rooms"]:
+                raise ValueError(f"Room {room_number} is already reserved.")
 
-        hotel["reserved_rooms"].append(room_number)
-        _save(data)
+            store.apply({"op": "reserve", "k": hotel_id, "room": room_number})
 
     @staticmethod
+    @instrumented("Hotel.cancel_room")
     def cancel_room(hotel_id: str, room_number: int) -> None:
         """Mark a single room as available in a hotel."""
-        data = _load()
-        if hotel_id not in data["hotels"]:
-            raise ValueError(f"Hotel {hotel_id} not found.")
-        hotel = data["hotels"][hotel_id]
-        if room_number not in hotel["reserved_rooms"]:
-            raise ValueError(f"Room {room_number} is not reserved.")
-        hotel["reserved_rooms"].remove(room_number)
-        _save(data)
+        with _session([("hotels", hotel_id)]) as store:
+            data = store.data
+            if hotel_id not in data["hotels"]:
+                raise ValueError(f"Hotel {hotel_id} not found.")
+            hotel = data["hotels"][hotel_id]
+            if room_number not in hotel["reserved_rooms"]:
+                raise ValueError(f"Room {room_number} is not reserved.")
+            _free_rooms(store, [
+                {"op": "release", "k": hotel_id, "room": room_number}
+            ], [hotel_id])
+
+    @staticmethod
+    @instrumented("Hotel.is_room_available")
+    def is_room_available(
+        hotel_id: str, room_number: int, check_in: str, check_out: str
+    ) -> bool:
+        """Return True if the room can be booked for the given stay."""
+        with _session([("hotels", hotel_id)]) as store:
+            data = store.data
+            if hotel_id not in data["hotels"]:
+                raise ValueError(f"Hotel {hotel_id} not found.")
+            hotel = data["hotels"][hotel_id]
+            if not 1 <= room_number <= hotel["total_rooms"]:
+                raise ValueError(f"Room {room_number} does not exist.")
+            if room_number in hotel["reserved_rooms"]:
+                return False
+            start, end = stay(check_in, check_out)
+            return store.availability.conflict(
+                hotel_id, room_number, start, end
+            ) is None
+
+    @staticmethod
+    @instrumented("Hotel.find_available_rooms")
+    def find_available_rooms(
+        hotel_id: str, count: int, check_in: str = "", check_out: str = ""
+    ) -> list[int]:
+        """Return the count lowest rooms of a hotel free for the stay.
+
+        Without dates a room must have no reservation at all.
+        """
+        with _session([("hotels", hotel_id)]) as store:
+            return _pick_rooms(store, hotel_id, count, check_in, check_out)
+
+    @staticmethod
+    @instrumented("Hotel.find_hotels")
+    def find_hotels(
+        count: int, check_in: str = "", check_out: str = ""
+    ) -> dict[str, int]:
+        """Return the hotels with at least count rooms free for the stay.
+
+        Maps each hotel to its number of free rooms, most first. The free
+        count index narrows the search to hotels with enough rooms not
+        held by reserve_room; only their booked rooms are then checked.
+        """
+        with _session() as store:
+            start, end = stay(check_in, check_out)
+            found: dict[str, int] = {}
+            for hotel_id in store.free_counts.at_least(count):
+                hotel = store.data["hotels"][hotel_id]
+                free = store.free_counts.free[hotel_id] - sum(
+                    1 for room in store.availability.booked(
+                        hotel_id, start, end
+                    )
+                    if room <= hotel["total_rooms"] and
+                    room not in hotel["reserved_rooms"]
+                )
+                if free >= count:
+                    found[hotel_id] = free
+            return dict(sorted(found.items(), key=lambda item: -item[1]))
+
+    @staticmethod
+    @instrumented("Hotel.free_rooms")
+    def free_rooms(hotel_id: str, check_in: str, check_out: str) -> list[int]:
+        """Return the rooms of a hotel that are free for the given stay."""
+        with _session([("hotels", hotel_id)]) as store:
+            data = store.data
+            if hotel_id not in data["hotels"]:
+                raise ValueError(f"Hotel {hotel_id} not found.")
+            hotel = data["hotels"][hotel_id]
+            start, end = stay(check_in, check_out)
+            rooms = (room for room in range(1, hotel["total_rooms"] + 1)
+                     if room not in hotel["reserved_rooms"])
+            return store.availability.free_rooms(hotel_id, rooms, start, end)
@@ -0,0 +1,165 @@
+"""Counters, timings and hooks for hotel operations and storage calls.
+
+Instrumentation is off by default and costs one flag check per call.
+Once enabled, every instrumented call is timed into a per-name
+histogram, storage backends add to byte counters, and registered hooks
+are called with the name and duration of each timed call.
+"""
+
+import functools
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+Hook = Callable[[str, float], None]
+
+class Histogram:
+    """Durations bucketed by powers of two microseconds."""
+
+    __slots__ = ("count", "total", "max", "buckets")
+
+    def __init__(self) -> None:
+        """Create an empty histogram."""
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets: dict[int, int] = {}
+
+    def add(self, seconds: float) -> None:
+        """Record one duration."""
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        bucket = int(seconds * 1e6).bit_length()
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def percentile(self, fraction: float) -> float:
+        """Return an upper bound, in seconds, of the given percentile."""
+        rank = fraction * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min((1 << bucket) / 1e6, self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        """Return the histogram as plain data."""
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(0.50),
+            "p99": self.percentile(0.99),
+            "max": self.max,
+            "buckets_us": {
+                str(1 << bucket): n
+                for bucket, n in sorted(self.buckets.items())
+            },
+        }
+
+
+class _State:
+    """The switch and everything recorded while it is on."""
+
+    __slots__ = ("enabled", "timings", "counters", "hooks")
+
+    def __init__(self) -> None:
+        """Start switched off with nothing recorded."""
+        self.enabled = False
+        self.timings: dict[str, Histogram] = {}
+        self.counters: dict[str, int] = {}
+        self.hooks: list[Hook] = []
+
+    def clear(self) -> None:
+        """Drop all recorded timings and counters."""
+        self.timings.clear()
+        self.counters.clear()
+
+    def record(self, name: str, seconds: float) -> None:
+        """Add one duration to a histogram and notify the hooks."""
+        histogram = self.timings.get(name)
+        if histogram is None:
+            histogram = self.timings[name] = Histogram()
+        histogram.add(seconds)
+        for hook in list(self.hooks):
+            hook(name, seconds)
+
+
+_state = _State()
+
+
+def enable(on: bool = True) -> None:
+    """Turn instrumentation on or off."""
+    _state.enabled = on
+
+
+def enabled() -> bool:
+    """Return True if instrumentation is on."""
+    return _state.enabled
+
+
+def reset() -> None:
+    """Drop all recorded timings and counters."""
+    _state.clear()
+
+
+def stats() -> dict:
+    """Return the recorded timings and counters."""
+    return {
+        "timings": {
+            name: histogram.summary()
+            for name, histogram in sorted(_state.timings.items())
+        },
+        "counters": dict(sorted(_state.counters.items())),
+    }
+
+
+def add_hook(hook: Hook) -> None:
+    """Call hook(name, seconds) after every timed call."""
+    _state.hooks.append(hook)
+
+
+def remove_hook(hook: Hook) -> None:
+    """Stop calling a hook added with add_hook."""
+    _state.hooks.remove(hook)
+
+
+def count(name: str, amount: int = 1) -> None:
+    """Add to a counter."""
+    if _state.enabled:
+        _state.counters[name] = _state.counters.get(name, 0) + amount
+
+
+def record(name: str, seconds: float) -> None:
+    """Add one duration to a histogram and notify the hooks."""
+    _state.record(name, seconds)
+
+
+@contextmanager
+def timer(name: str) -> Iterator[None]:
+    """Time the body of a with statement."""
+    if not _state.enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+def instrumented(name: str) -> Callable[[Callable], Callable]:
+    """Decorate a function so that each call is timed under name."""
+    def decorate(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _state.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - start)
+        return wrapper
+    return decorate
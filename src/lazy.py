@@ -0,0 +1,551 @@
+"""Lazy, record-level access to JSON data snapshots.
+
+A snapshot comes with an offset index in ``<path>.idx``: for every
+record of every section the byte span of its ``"key": value`` text, and
+a table of CRC32 key hashes sorted for binary search. Opening a snapshot
+maps both files and returns LazySection mappings, so startup costs two
+mmaps and a lookup costs a binary search plus parsing one record,
+whatever the size of the data.
+
+The index is written together with every snapshot the backend writes.
+A snapshot without a valid index (written by hand or by another tool)
+is scanned once with the C JSON scanner and its index saved.
+"""
+
+import json
+import mmap
+import os
+import re
+import struct
+import zlib
+from json.encoder import encode_basestring_ascii
+from collections.abc import ItemsView, Mapping, MutableMapping
+from typing import Callable, Iterator, Optional
+from src.formats import SECTIONS, pack, plain, unpack
+from src.instrumentation import count
+from src.rooms import RoomSet
+
+STYLE_UNKNOWN, STYLE_INDENT, STYLE_COMPACT = 0, 1, 2
+
+_HEADER = struct.Struct("<5sBQQQB")  # magic, style, size, mtime, inode, n
+_MAGIC = b"HTLI\x01"
+_SECTION = struct.Struct("<BI")  # section number, record count
+_ENTRY = struct.Struct("<QQQ")  # key start, key end, value end
+_SLOT = struct.Struct("<II")  # key hash, entry number
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_SCAN_BATCH = 4096  # records decoded per json.loads call by scan()
+
+Span = tuple[int, int, int]
+# Per section: the key starts, key ends, value ends and key hashes of
+# its records, in file order.
+Columns = tuple[list[int], list[int], list[int], list[int]]
+
+
+def key_hash(key: str) -> int:
+    """Return the stable hash of a key used by the index."""
+    return zlib.crc32(key.encode("utf-8"))
+
+
+class SnapshotIndex:
+    """Offset index of the records of a snapshot, over any buffer."""
+
+    def __init__(self, buffer: "bytes | mmap.mmap") -> None:
+        """Read the header and the section tables' positions."""
+        self.buffer = buffer
+        (_, self.style, self.size, self.mtime, self.inode,
+         sections) = _HEADER.unpack_from(buffer, 0)
+        self.sections: dict[str, tuple[int, int, int]] = {}
+        pos = _HEADER.size
+        for _ in range(sections):
+            number, records = _SECTION.unpack_from(buffer, pos)
+            entries = pos + _SECTION.size
+            table = entries + records * _ENTRY.size
+            self.sections[SECTIONS[number]] = (records, entries, table)
+            pos = table + records * _SLOT.size
+
+    @staticmethod
+    def build(
+        columns: dict[str, Columns], style: int, stat: os.stat_result
+    ) -> bytes:
+        """Return the index of the given record columns."""
+        out = bytearray(_HEADER.pack(
+            _MAGIC, style, stat.st_size, stat.st_mtime_ns, stat.st_ino,
+            len(columns)
+        ))
+        for name, (starts, key_ends, ends, hashes) in columns.items():
+            records = len(starts)
+            out += _SECTION.pack(SECTIONS.index(name), records)
+            entries = [0] * (3 * records)
+            entries[0::3], entries[1::3], entries[2::3] = (
+                starts, key_ends, ends
+            )
+            out += pack("Q", entries)
+            order = sorted(range(records), key=hashes.__getitem__)
+            table = [0] * (2 * records)
+            table[0::2] = [hashes[i] for i in order]
+            table[1::2] = order
+            out += pack("I", table)
+        return bytes(out)
+
+    def matches(self, stat: os.stat_result) -> bool:
+        """Return True if the index describes the file with this stat."""
+        return (self.size, self.mtime, self.inode) == (
+            stat.st_size, stat.st_mtime_ns, stat.st_ino
+        )
+
+    def span(self, section: str, i: int) -> Span:
+        """Return the byte span of record i of a section."""
+        return _ENTRY.unpack_from(
+            self.buffer, self.sections[section][1] + i * _ENTRY.size
+        )
+
+    def columns(self, section: str) -> Columns:
+        """Return the spans and key hashes of every record of a section."""
+        records, entries, table = self.sections[section]
+        spans = unpack("Q", self.buffer[entries:table])
+        slots = unpack("I", self.buffer[table:table + records * 8])
+        hashes = [0] * records
+        for found, i in zip(slots[0::2], slots[1::2]):
+            hashes[i] = found
+        return spans[0::3], spans[1::3], spans[2::3], hashes
+
+    def candidates(self, section: str, key: str) -> Iterator[int]:
+        """Yield the records of a section whose key has the key's hash."""
+        records, _, table = self.sections[section]
+        wanted = key_hash(key)
+        lo, hi = 0, records
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if _SLOT.unpack_from(self.buffer, table + mid * 8)[0] < wanted:
+                lo = mid + 1
+            else:
+                hi = mid
+        while lo < records:
+            found, i = _SLOT.unpack_from(self.buffer, table + lo * 8)
+            if found != wanted:
+                return
+            yield i
+            lo += 1
+
+
+class LazySection(MutableMapping):
+    """One section of a snapshot, parsed a record at a time.
+
+    Records are decoded from the mapped snapshot on first access and
+    kept; assignments and deletions are held in memory on top of the
+    snapshot, in the same order a dict would keep them. Only assigned
+    records are written back, so a record changed in place must be
+    assigned again. Iterating items() decodes the records in bulk and
+    does not keep them.
+    """
+
+    def __init__(
+        self, raw: "bytes | mmap.mmap", index: SnapshotIndex, section: str
+    ) -> None:
+        """Wrap a section of a mapped snapshot."""
+        self.raw = raw
+        self.index = index
+        self.section = section
+        self.records = index.sections[section][0]
+        self.loaded: dict[str, dict] = {}
+        self.added: dict[str, None] = {}
+        self.changed: set[str] = set()
+        self.dead: set[str] = set()
+        self._positions: Optional[dict[str, int]] = None
+
+    def position(self, key: str) -> Optional[int]:
+        """Return the snapshot record of key, deleted or not."""
+        if self._positions is not None:
+            return self._positions.get(key)
+        for i in self.index.candidates(self.section, key):
+            start, end, _ = self.index.span(self.section, i)
+            if json.loads(self.raw[start:end]) == key:
+                return i
+        return None
+
+    def find(self, key: object) -> Optional[int]:
+        """Return the snapshot record holding key, if still live."""
+        if not isinstance(key, str) or key in self.dead or key in self.added:
+            return None
+        return self.position(key)
+
+    def _decode(self, i: int) -> dict:
+        """Parse the value of record i."""
+        _, start, end = self.index.span(self.section, i)
+        text = self.raw[start:end].lstrip()[1:]  # drop the ':'
+        count("bytes_read", end - start)
+        record = json.loads(text)
+        if self.section == "hotels":
+            record["reserved_rooms"] = RoomSet.from_rooms(
+                record["reserved_rooms"], record["total_rooms"]
+            )
+        return record
+
+    def __getitem__(self, key: object) -> dict:
+        """Return a record, decoding it on first access."""
+        if key in self.loaded:
+            return self.loaded[key]  # type: ignore[index]
+        i = self.find(key)
+        if i is None:
+            raise KeyError(key)
+        record = self.loaded[key] = self._decode(i)  # type: ignore[index]
+        return record
+
+    def __contains__(self, key: object) -> bool:
+        """Return True if the section holds key."""
+        return key in self.loaded or self.find(key) is not None
+
+    def __setitem__(self, key: str, record: dict) -> None:
+        """Assign a record."""
+        if key not in self.changed and key not in self.added:
+            if self.find(key) is None:
+                self.added[key] = None
+            else:
+                self.changed.add(key)
+        self.loaded[key] = record
+
+    def __delitem__(self, key: str) -> None:
+        """Delete a record."""
+        if key in self.added:
+            del self.added[key]
+        elif self.find(key) is not None:
+            self.dead.add(key)
+        else:
+            raise KeyError(key)
+        self.changed.discard(key)
+        self.loaded.pop(key, None)
+
+    def __iter__(self) -> Iterator[str]:
+        """Yield the keys in snapshot order, then the added ones."""
+        if self._positions is None:
+            starts, key_ends, _, _ = self.index.columns(self.section)
+            keys = json.loads(b"[" + b",".join(
+                self.raw[start:end] for start, end in zip(starts, key_ends)
+            ) + b"]")
+            self._positions = {key: i for i, key in enumerate(keys)}
+        for key in list(self._positions):
+            if key not in self.dead and key not in self.added:
+                yield key
+        yield from list(self.added)
+
+    def __len__(self) -> int:
+        """Return the number of records."""
+        return self.records - len(self.dead) + len(self.added)
+
+    def __repr__(self) -> str:
+        """Return a short description."""
+        return f"LazySection({self.section!r}, {len(self)} records)"
+
+    def items(self) -> ItemsView:
+        """Return a view of the records that iterates through scan()."""
+        return _ScanItems(self)
+
+    def scan(self) -> Iterator[tuple[str, dict]]:
+        """Yield every key and record, in iteration order.
+
+        Records not loaded yet are decoded a batch at a time with one
+        json.loads call and are not kept, so building an index over the
+        section neither parses record by record nor leaves every record
+        loaded.
+        """
+        keys = list(self)
+        assert self._positions is not None
+        _, key_ends, ends, _ = self.index.columns(self.section)
+        for first in range(0, len(keys), _SCAN_BATCH):
+            chunk = keys[first:first + _SCAN_BATCH]
+            missing = [key for key in chunk if key not in self.loaded]
+            spans = [(key_ends[i], ends[i]) for i in
+                     map(self._positions.__getitem__, missing)]
+            count("bytes_read", sum(end - start for start, end in spans))
+            records = json.loads(b"[" + b",".join(
+                self.raw[start:end].lstrip()[1:] for start, end in spans
+            ) + b"]")
+            if self.section == "hotels":
+                for record in records:
+                    record["reserved_rooms"] = RoomSet.from_rooms(
+                        record["reserved_rooms"], record["total_rooms"]
+                    )
+            decoded = dict(zip(missing, records))
+            for key in chunk:
+                record = decoded.get(key)
+                yield key, self.loaded[key] if record is None else record
+
+
+class _ScanItems(ItemsView):
+    """Items view of a LazySection."""
+
+    _mapping: LazySection
+
+    def __iter__(self) -> Iterator[tuple[str, dict]]:
+        """Yield the items through scan()."""
+        return self._mapping.scan()
+
+
+class RoutedSection(MutableMapping):
+    """Union of disjoint mappings, each key living in the one route picks."""
+
+    def __init__(
+        self, parts: dict[str, MutableMapping], route: Callable[[str], str]
+    ) -> None:
+        """Combine the parts."""
+        self.parts = parts
+        self.route = route
+
+    def __getitem__(self, key: str) -> dict:
+        """Return a record from its part."""
+        return self.parts[self.route(key)][key]
+
+    def __contains__(self, key: object) -> bool:
+        """Return True if the key's part holds it."""
+        return key in self.parts[self.route(key)]  # type: ignore[arg-type]
+
+    def __setitem__(self, key: str, record: dict) -> None:
+        """Assign a record in its part."""
+        self.parts[self.route(key)][key] = record
+
+    def __delitem__(self, key: str) -> None:
+        """Delete a record from its part."""
+        del self.parts[self.route(key)][key]
+
+    def __iter__(self) -> Iterator[str]:
+        """Yield the keys of every part."""
+        for part in self.parts.values():
+            yield from part
+
+    def __len__(self) -> int:
+        """Return the number of records of every part."""
+        return sum(len(part) for part in self.parts.values())
+
+
+def _scan(raw: bytes) -> Optional[dict[str, Columns]]:
+    """Find the record spans of a JSON snapshot.
+
+    Returns None if the top level is not an object made only of the
+    known sections.
+    """
+    try:
+        text = raw.decode("utf-8")
+    except UnicodeDecodeError:
+        return None
+    scan_once = json.JSONDecoder().scan_once
+
+    def skip(pos: int) -> int:
+        return _WHITESPACE.match(text, pos).end()  # type: ignore[union-attr]
+
+    columns: dict[str, Columns] = {}
+    try:
+        pos = skip(0)
+        if text[pos] != "{":
+            return None
+        pos = skip(pos + 1)
+        while text[pos] != "}":
+            name, pos = scan_once(text, pos)
+            pos = skip(pos)
+            if name not in SECTIONS or name in columns or text[pos] != ":":
+                return None
+            pos = skip(pos + 1)
+            if text[pos] != "{":
+                return None
+            starts, key_ends, ends, hashes = columns[name] = [], [], [], []
+            pos = skip(pos + 1)
+            while text[pos] != "}":
+                starts.append(pos)
+                key, pos = scan_once(text, pos)
+                key_ends.append(pos)
+                pos = skip(pos)
+                if text[pos] != ":":
+                    return None
+                value, pos = scan_once(text, skip(pos + 1))
+                if not isinstance(value, dict):
+                    return None
+                ends.append(pos)
+                hashes.append(key_hash(key))
+                pos = skip(pos)
+                if text[pos] == ",":
+                    pos = skip(pos + 1)
+            pos = skip(pos + 1)
+            if text[pos] == ",":
+                pos = skip(pos + 1)
+        if skip(pos + 1) != len(text):
+            return None
+    except (IndexError, StopIteration, ValueError):
+        return None
+
+    if len(text) != len(raw):  # non-ASCII: turn characters into bytes
+        offsets = sorted({pos for spans in columns.values()
+                          for column in spans[:3] for pos in column})
+        to_bytes: dict[int, int] = {}
+        last = size = 0
+        for pos in offsets:
+            size += len(text[last:pos].encode("utf-8"))
+            to_bytes[pos], last = size, pos
+        columns = {
+            name: ([to_bytes[pos] for pos in starts],
+                   [to_bytes[pos] for pos in key_ends],
+                   [to_bytes[pos] for pos in ends], hashes)
+            for name, (starts, key_ends, ends, hashes) in columns.items()
+        }
+    return columns
+
+
+def _map(path: str) -> tuple["bytes | mmap.mmap", os.stat_result]:
+    """Map a file read-only, returning its contents and stat."""
+    with open(path, "rb") as f:
+        stat = os.fstat(f.fileno())
+        if stat.st_size == 0:
+            return b"", stat
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), stat
+
+
+def open_snapshot(path: str, index_path: str) -> Optional[dict]:
+    """Return the sections of a JSON snapshot as LazySections.
+
+    Returns None if the file is not a snapshot that can be indexed; the
+    caller should then parse it whole.
+    """
+    raw, stat = _map(path)
+    index: Optional[SnapshotIndex] = None
+    if os.path.exists(index_path):
+        buffer, _ = _map(index_path)
+        if len(buffer) >= _HEADER.size and buffer[:5] == _MAGIC:
+            index = SnapshotIndex(buffer)
+            if not index.matches(stat):
+                index = None
+    if index is None:
+        columns = _scan(raw[:])
+        if columns is None:
+            return None
+        built = SnapshotIndex.build(columns, STYLE_UNKNOWN, stat)
+        write_index(index_path, built)
+        index = SnapshotIndex(built)
+    return {name: LazySection(raw, index, name) for name in index.sections}
+
+
+def rebase(data: dict, path: str, built: bytes) -> None:
+    """Point the sections of data at the snapshot they were written to.
+
+    Every dict or LazySection section becomes a LazySection over the
+    snapshot at path with its index built, so the next write copies
+    their records from it and only encodes those assigned since. Other
+    mappings, like columnar Tables, are kept.
+    """
+    raw, _ = _map(path)
+    index = SnapshotIndex(built)
+    for name in index.sections:
+        if isinstance(data.get(name), (dict, LazySection)):
+            data[name] = LazySection(raw, index, name)
+
+
+def write_index(index_path: str, built: bytes) -> None:
+    """Atomically replace an index file; failing to is not an error."""
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(built)
+        os.replace(tmp_path, index_path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def dump_json(
+    data: dict, compact: bool = False
+) -> tuple[bytes, dict[str, Columns]]:
+    """Serialise data like json.dumps and return the record columns.
+
+    The output is byte for byte what ``json.dumps(data, indent=4)`` (or
+    with compact separators) gives. Runs of LazySection records that
+    were never decoded are copied from its snapshot in one piece when
+    the snapshot has the same layout.
+    """
+    if not data:
+        return b"{}", {}
+    style = STYLE_COMPACT if compact else STYLE_INDENT
+    if compact:
+        colon, sep, pad, margin = b":", b",", b"", ""
+    else:
+        colon, sep, pad, margin = b": ", b",\n", b"        ", "\n        "
+    out = bytearray(b"{" if compact else b"{\n")
+    columns: dict[str, Columns] = {}
+
+    encoder = json.JSONEncoder(
+        separators=(",", ":") if compact else None,
+        indent=None if compact else 4,
+        default=plain
+    ).encode
+
+    def encode(value: object, margin: str = margin) -> bytes:
+        text = encoder(value)
+        if not compact:
+            text = text.replace("\n", margin)
+        return text.encode("ascii")
+
+    def put(cols: Columns, key: str, record: dict) -> None:
+        if cols[0]:
+            out.extend(sep)
+        out.extend(pad)
+        cols[0].append(len(out))
+        out.extend(encode_basestring_ascii(key).encode("ascii"))
+        cols[1].append(len(out))
+        out.extend(colon + encode(record))
+        cols[2].append(len(out))
+        cols[3].append(key_hash(key))
+
+    for n, (name, section) in enumerate(data.items()):
+        if n:
+            out += sep
+        out += b"" if compact else b"    "
+        out += json.dumps(name).encode("ascii") + colon
+        if name not in SECTIONS or not isinstance(section, Mapping):
+            out += encode(section, "\n    ")
+            continue
+        cols: Columns = ([], [], [], [])
+        columns[name] = cols
+        if not section:
+            out += b"{}"
+            continue
+        out += b"{" if compact else b"{\n"
+        if isinstance(section, LazySection) and section.index.style == style:
+            _splice(section, cols, put, out, sep, pad)
+        else:
+            for key, record in section.items():
+                put(cols, key, record)
+        out += b"}" if compact else b"\n    }"
+    out += b"}" if compact else b"\n}"
+    return bytes(out), columns
+
+
+def _splice(
+    section: LazySection,
+    cols: Columns,
+    put: Callable[[Columns, str, dict], None],
+    out: bytearray,
+    sep: bytes,
+    pad: bytes
+) -> None:
+    """Write a LazySection, copying unchanged runs from its snapshot."""
+    starts, key_ends, ends, hashes = section.index.columns(section.section)
+    changed: dict[int, Optional[str]] = {
+        section.position(key): key  # type: ignore[misc]
+        for key in section.changed
+    }
+    for key in section.dead:
+        changed[section.position(key)] = None  # type: ignore[index]
+    first = 0
+    for i in [*sorted(changed), section.records]:
+        if first < i:
+            if cols[0]:
+                out.extend(sep)
+            out.extend(pad)
+            shift = len(out) - starts[first]
+            out.extend(section.raw[starts[first]:ends[i - 1]])
+            cols[0].extend(pos + shift for pos in starts[first:i])
+            cols[1].extend(pos + shift for pos in key_ends[first:i])
+            cols[2].extend(pos + shift for pos in ends[first:i])
+            cols[3].extend(hashes[first:i])
+        key = changed.get(i)
+        if key is not None:
+            put(cols, key, section.loaded[key])
+        first = i + 1
+    for key in section.added:
+        put(cols, key, section.loaded[key])
@@ -0,0 +1,193 @@
+"""Occupancy reports over hotels and nights, built with NumPy.
+
+The reservations of a window of nights are folded into a hotel x night
+matrix of booked room counts in one vectorised pass per chunk: each
+chunk of reservations becomes arrays of (hotel, first night, last
+night, rooms), clipped to the window, and ``np.bincount`` adds the room
+counts at the first night and subtracts them after the last one; a
+running sum along the nights then gives the bookings of every night.
+Memory is the matrix plus one chunk, whatever the number of
+reservations.
+
+NumPy is an optional dependency (``uv sync --extra reports``); the
+rest of the package does not need it.
+
+Run ``python -m src.occupancy hotel.json 2026-01-01 2027-01-01`` for
+the occupancy rate and peak night of every hotel.
+"""
+
+import argparse
+from datetime import date
+from itertools import islice
+from typing import Iterable, Optional
+from src import formats
+from src.availability import stay
+
+try:
+    import numpy as np
+except ImportError:  # optional, only needed for the reports
+    np = None
+
+CHUNK = 100_000
+
+
+class Occupancy:
+    """Booked rooms per hotel and night over a window of nights.
+
+    ``booked[h, d]`` is the number of rooms of ``hotel_ids[h]`` booked
+    for night ``d`` of the window, night 0 being the first night and
+    ``capacity[h]`` the hotel's number of rooms.
+    """
+
+    def __init__(self, hotels: dict, start: str, end: str) -> None:
+        """Create an empty matrix for the nights from start to end."""
+        if np is None:
+            raise ImportError("Occupancy reports require numpy: "
+                              "uv sync --extra reports")
+        self.first, last = stay(start, end)
+        if not start or not end or last <= self.first:
+            raise ValueError(f"Invalid window {start} to {end}.")
+        self.hotel_ids = list(hotels)
+        self.positions = {
+            hotel_id: i for i, hotel_id in enumerate(self.hotel_ids)
+        }
+        self.capacity = np.fromiter(
+            (record["total_rooms"] for record in hotels.values()),
+            dtype=np.int64, count=len(self.hotel_ids)
+        )
+        self.nights = last - self.first
+        self.booked = np.zeros((len(self.hotel_ids), self.nights),
+                               dtype=np.int64)
+
+    @classmethod
+    def build(
+        cls, data: dict, start: str, end: str, chunk: int = CHUNK
+    ) -> "Occupancy":
+        """Return the occupancy of the data's reservations in a window."""
+        occupancy = cls(data["hotels"], start, end)
+        records = iter(data["reservations"].values())
+        while batch := list(islice(records, chunk)):
+            occupancy.add(batch)
+        return occupancy
+
+    def add(self, reservations: Iterable[dict]) -> None:
+        """Add the rooms of reservations to the matrix.
+
+        Reservations of hotels outside the matrix are ignored; missing
+        dates leave a stay open-ended like in the availability index.
+        """
+        hotels, starts, ends, rooms = [], [], [], []
+        for record in reservations:
+            position = self.positions.get(record["hotel_id"])
+            if position is None or not record["rooms"]:
+                continue
+            start, end = stay(record["check_in"], record["check_out"])
+            hotels.append(position)
+            starts.append(start)
+            ends.append(end)
+            rooms.append(len(record["rooms"]))
+        if not hotels:
+            return
+        width = self.nights + 1
+        row = np.array(hotels, dtype=np.int64) * width
+        first = np.clip(np.array(starts, dtype=np.int64) - self.first,
+                        0, self.nights)
+        last = np.clip(np.array(ends, dtype=np.int64) - self.first,
+                       0, self.nights)
+        keep = first < last
+        weights = np.array(rooms, dtype=np.int64)[keep]
+        size = len(self.hotel_ids) * width
+        delta = (
+            np.bincount(row[keep] + first[keep], weights, size)
+            - np.bincount(row[keep] + last[keep], weights, size)
+        ).astype(np.int64).reshape(-1, width)
+        self.booked += np.cumsum(delta[:, :-1], axis=1)
+
+    def day(self, night: int) -> str:
+        """Return the ISO date of a night of the window."""
+        return date.fromordinal(self.first + night).isoformat()
+
+    def _row(self, hotel_id: str) -> int:
+        """Return the matrix row of a hotel."""
+        if hotel_id not in self.positions:
+            raise ValueError(f"Hotel {hotel_id} not found.")
+        return self.positions[hotel_id]
+
+    def rates(self) -> "np.ndarray":
+        """Return the booked share of every hotel's rooms per night."""
+        capacity = self.capacity[:, None]
+        return np.divide(self.booked, capacity,
+                         out=np.zeros(self.booked.shape),
+                         where=capacity > 0)
+
+    def occupancy_rates(self) -> dict[str, float]:
+        """Return each hotel's booked share of its room nights."""
+        room_nights = self.capacity * self.nights
+        rates = np.divide(self.booked.sum(axis=1), room_nights,
+                          out=np.zeros(len(self.hotel_ids)),
+                          where=room_nights > 0)
+        return dict(zip(self.hotel_ids, rates.tolist()))
+
+    def free(self) -> "np.ndarray":
+        """Return the free rooms of every hotel per night."""
+        return np.maximum(self.capacity[:, None] - self.booked, 0)
+
+    def peak_nights(
+        self, top: int = 1, hotel_id: Optional[str] = None
+    ) -> list[tuple[str, int]]:
+        """Return the top nights by booked rooms, busiest first.
+
+        Counts one hotel's rooms, or those of all hotels by default;
+        ties go to the earlier night.
+        """
+        if hotel_id is None:
+            totals = self.booked.sum(axis=0)
+        else:
+            totals = self.booked[self._row(hotel_id)]
+        order = np.argsort(-totals, kind="stable")[:top]
+        return [(self.day(night), int(totals[night]))
+                for night in order.tolist()]
+
+    def free_capacity(self) -> dict[str, int]:
+        """Return the free rooms of all hotels together per night."""
+        totals = self.free().sum(axis=0).tolist()
+        return {self.day(night): free for night, free in enumerate(totals)}
+
+    def hotels_with_free(
+        self, count: int, check_in: str, check_out: str
+    ) -> list[str]:
+        """Return the hotels with count rooms free on every night.
+
+        The stay is clipped to the window.
+        """
+        start, end = stay(check_in, check_out)
+        first = max(start - self.first, 0)
+        last = min(end - self.first, self.nights)
+        if last <= first:
+            raise ValueError(f"Invalid stay {check_in} to {check_out}.")
+        fits = self.free()[:, first:last].min(axis=1) >= count
+        return [self.hotel_ids[i] for i in np.flatnonzero(fits).tolist()]
+
+
+def main() -> None:
+    """Print the occupancy of a data file given on the command line."""
+    parser = argparse.ArgumentParser(
+        description="Report hotel occupancy over a window of nights."
+    )
+    parser.add_argument("path")
+    parser.add_argument("start", help="first night (ISO date)")
+    parser.add_argument("end", help="day after the last night")
+    parser.add_argument("--format", dest="fmt", choices=formats.FORMATS)
+    args = parser.parse_args()
+    with open(args.path, "rb") as f:
+        data = formats.loads(f.read(), args.fmt or formats.detect(args.path))
+    occupancy = Occupancy.build(data, args.start, args.end)
+    rates = occupancy.occupancy_rates()
+    print(f"{'hotel':<12}{'rate':>8}  peak night")
+    for hotel_id in occupancy.hotel_ids:
+        (day, rooms), = occupancy.peak_nights(1, hotel_id)
+        print(f"{hotel_id:<12}{rates[hotel_id]:>8.1%}  {day} ({rooms})")
+
+
+if __name__ == "__main__":
+    main()
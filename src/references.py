@@ -0,0 +1,95 @@
+"""Secondary indexes over the references between records."""
+
+from typing import Optional
+
+
+class ReferenceIndex:
+    """Reservations per customer and per hotel, and customers per email.
+
+    The reservation sets are dicts used as ordered sets, so adding and
+    removing one reservation is O(1) and listing them keeps the order
+    they were indexed in. Empty emails are not indexed; if the data
+    holds an email twice (it can only come from a file written by
+    hand), the index keeps the first customer.
+    """
+
+    def __init__(self) -> None:
+        """Create an empty index."""
+        self.by_customer: dict[str, dict[str, None]] = {}
+        self.by_hotel: dict[str, dict[str, None]] = {}
+        self.by_email: dict[str, str] = {}
+
+    @classmethod
+    def build(cls, data: dict) -> "ReferenceIndex":
+        """Index the customers and reservations of the data."""
+        index = cls()
+        for customer_id, record in data["customers"].items():
+            index.add("customers", customer_id, record)
+        for reservation_id, record in data["reservations"].items():
+            index.add("reservations", reservation_id, record)
+        return index
+
+    def add(self, section: str, key: str, record: dict) -> None:
+        """Index a customer or reservation record."""
+        if section == "customers":
+            if record["email"]:
+                self.by_email.setdefault(record["email"], key)
+        elif section == "reservations":
+            self.by_customer.setdefault(record["customer_id"], {})[key] = None
+            self.by_hotel.setdefault(record["hotel_id"], {})[key] = None
+
+    def remove(self, section: str, key: str, record: dict) -> None:
+        """Drop a customer or reservation record from the index."""
+        if section == "customers":
+            if self.by_email.get(record["email"]) == key:
+                del self.by_email[record["email"]]
+        elif section == "reservations":
+            for mapping, owner in ((self.by_customer, record["customer_id"]),
+                                   (self.by_hotel, record["hotel_id"])):
+                keys = mapping.get(owner, {})
+                keys.pop(key, None)
+                if not keys:
+                    mapping.pop(owner, None)
+
+    def customer_reservations(self, customer_id: str) -> list[str]:
+        """Return the IDs of a customer's reservations."""
+        return list(self.by_customer.get(customer_id, ()))
+
+    def hotel_reservations(self, hotel_id: str) -> list[str]:
+        """Return the IDs of a hotel's reservations."""
+        return list(self.by_hotel.get(hotel_id, ()))
+
+    def customer_with_email(self, email: str) -> Optional[str]:
+        """Return the ID of the customer with an email, if any."""
+        return self.by_email.get(email) if email else None
+
+    def verify(self, data: dict) -> list[str]:
+        """Return the differences between the index and the data.
+
+        The index is compared with one rebuilt from the data; dangling
+        references and emails used twice are reported as well. An empty
+        list means the index and the data are consistent.
+        """
+        problems: list[str] = []
+        rebuilt = ReferenceIndex.build(data)
+        for name in ("by_customer", "by_hotel"):
+            ours, theirs = getattr(self, name), getattr(rebuilt, name)
+            for owner in sorted(ours.keys() | theirs.keys()):
+                if set(ours.get(owner, ())) != set(theirs.get(owner, ())):
+                    problems.append(f"Index {name} is stale for {owner}.")
+        if self.by_email != rebuilt.by_email:
+            problems.append("Index by_email is stale.")
+        seen: dict[str, str] = {}
+        for customer_id, record in data["customers"].items():
+            email = record["email"]
+            if email and email in seen:
+                problems.append(f"Email {email} is used by customers "
+                                f"{seen[email]} and {customer_id}.")
+            seen.setdefault(email, customer_id)
+        for reservation_id, record in data["reservations"].items():
+            for section, owner in (("customers", record["customer_id"]),
+                                   ("hotels", record["hotel_id"])):
+                if owner not in data[section]:
+                    problems.append(f"Reservation {reservation_id} refers "
+                                    f"to missing {section} {owner}.")
+        return problems
@@ -0,0 +1,233 @@
+"""Result events of a run: buffered writers and a streaming comparator.
+
+A run reports section headers, displayed values and one result per
+operation. ``ResultLog`` renders them in one of RESULT_FORMATS:
+
+    text   the original lines ("  [OK] Created customer C1", ...), as
+           in files/results/*.txt
+    jsonl  one JSON event per line, results with their duration
+    quiet  nothing but the OK/FAIL counts at the end
+
+and writes them in large chunks instead of one write per line. Given
+the lines of an expected results file it also compares its text lines
+with them as they are produced, without keeping either in memory.
+
+Run ``python -m src.results ACTUAL EXPECTED`` to compare two results
+files the same way.
+"""
+
+import argparse
+import json
+import sys
+import time
+from json.encoder import encode_basestring_ascii
+from typing import IO, Callable, Iterable, Iterator, Optional
+
+RESULT_FORMATS = ("text", "jsonl", "quiet")
+BUFFER_SIZE = 1 << 16
+
+
+class Comparator:
+    """Compare lines, one at a time, with the lines of an expected file.
+
+    Only the first ``limit`` mismatches are kept, as (line number,
+    expected, actual) with None for a line missing on one side.
+    """
+
+    def __init__(self, expected: Iterable[str], limit: int = 10) -> None:
+        """Start comparing with the expected lines."""
+        self.expected = iter(expected)
+        self.limit = limit
+        self.line = 0
+        self.count = 0
+        self.mismatches: list[tuple[int, Optional[str], Optional[str]]] = []
+
+    def _differ(self, expected: Optional[str], actual: Optional[str]) -> None:
+        """Record a mismatch on the current line."""
+        self.count += 1
+        if len(self.mismatches) < self.limit:
+            self.mismatches.append((self.line, expected, actual))
+
+    def feed(self, line: str) -> None:
+        """Compare the next actual line, without its newline."""
+        self.line += 1
+        expected = next(self.expected, None)
+        if expected is not None:
+            expected = expected.rstrip("\n")
+        if expected != line:
+            self._differ(expected, line)
+
+    def finish(self) -> bool:
+        """Count the expected lines never produced; True if all matched."""
+        for expected in self.expected:
+            self.line += 1
+            self._differ(expected.rstrip("\n"), None)
+        return self.count == 0
+
+    def report(self) -> Iterator[str]:
+        """Yield a description of each kept mismatch."""
+        for line, expected, actual in self.mismatches:
+            yield f"line {line}: expected {expected!r}, got {actual!r}"
+        if self.count > len(self.mismatches):
+            yield f"... {self.count - len(self.mismatches)} more"
+
+
+def compare(
+    actual: Iterable[str], expected: Iterable[str], limit: int = 10
+) -> Comparator:
+    """Compare two sequences of lines and return the finished comparator."""
+    comparator = Comparator(expected, limit)
+    for line in actual:
+        comparator.feed(line.rstrip("\n"))
+    comparator.finish()
+    return comparator
+
+
+class ResultLog:
+    """Buffered writer of the result events of a run.
+
+    ``out`` may be None to only count (and compare) the results. The
+    pending output is written once it reaches ``buffer_size``
+    characters and on flush() or close().
+    """
+
+    def __init__(
+        self,
+        out: Optional[IO[str]] = None,
+        fmt: str = "text",
+        expected: Optional[Iterable[str]] = None,
+        buffer_size: int = BUFFER_SIZE
+    ) -> None:
+        """Create a log writing to out in one of RESULT_FORMATS."""
+        if fmt not in RESULT_FORMATS:
+            raise ValueError(f"Unknown results format {fmt}.")
+        self.out = out
+        self.fmt = fmt
+        self.buffer_size = buffer_size
+        self.comparator = None if expected is None else Comparator(expected)
+        self.ok = 0
+        self.failed = 0
+        self._pending: list[str] = []
+        self._size = 0
+        self._sections = 0
+
+    def _emit(self, lines: list[str], event: Callable[[], str]) -> None:
+        """Compare the text lines of an event and buffer its output.
+
+        event renders the JSON line; it is only called in jsonl format.
+        """
+        if self.comparator is not None:
+            for line in lines:
+                self.comparator.feed(line)
+        if self.out is None or self.fmt == "quiet":
+            return
+        if self.fmt == "text":
+            chunk = "\n".join(lines) + "\n"
+        else:
+            chunk = event() + "\n"
+        self._pending.append(chunk)
+        self._size += len(chunk)
+        if self._size >= self.buffer_size:
+            self.flush()
+
+    def section(self, name: str) -> None:
+        """Start a section of the run, such as Customers."""
+        lines = [f"--- {name} ---"]
+        if self._sections:
+            lines.insert(0, "")
+        self._sections += 1
+        self._emit(lines, lambda: json.dumps(
+            {"event": "section", "name": name}
+        ))
+
+    def display(self, value: object) -> None:
+        """Report a value shown by an operation."""
+        self._emit([str(value)], lambda: json.dumps(
+            {"event": "display", "value": value}, default=str
+        ))
+
+    def result(
+        self, label: str, error: Optional[str] = None, seconds: float = 0.0
+    ) -> None:
+        """Report an operation that succeeded, or failed with error."""
+        if error is None:
+            self.ok += 1
+            line = f"  [OK] {label}"
+        else:
+            self.failed += 1
+            line = f"  [FAIL] {label}" + (f": {error}" if error else "")
+        # the most frequent event: formatted by hand instead of json.dumps
+        self._emit([line], lambda: "".join((
+            '{"event": "result", "ok": ',
+            "true" if error is None else "false",
+            ', "label": ', encode_basestring_ascii(label),
+            ', "seconds": ', repr(seconds),
+            "" if error is None else
+            ', "error": ' + encode_basestring_ascii(error),
+            "}"
+        )))
+
+    def attempt(
+        self,
+        done: str,
+        label: str,
+        call: Callable[..., object],
+        *args: object,
+        **kwargs: object
+    ) -> bool:
+        """Run call(*args, **kwargs) and report it as done or failed.
+
+        Returns False if it raised ValueError. A value returned by call
+        is displayed before the result.
+        """
+        start = time.perf_counter()
+        try:
+            value = call(*args, **kwargs)
+        except ValueError as e:
+            self.result(label, str(e), time.perf_counter() - start)
+            return False
+        seconds = time.perf_counter() - start
+        if value is not None:
+            self.display(value)
+        self.result(done, seconds=seconds)
+        return True
+
+    def flush(self) -> None:
+        """Write the pending output."""
+        if self._pending and self.out is not None:
+            self.out.write("".join(self._pending))
+            self.out.flush()
+        self._pending = []
+        self._size = 0
+
+    def close(self) -> bool:
+        """Flush the log; return False if it differs from the expected.
+
+        Quiet logs write their counts here.
+        """
+        if self.fmt == "quiet" and self.out is not None:
+            self._pending.append(f"OK: {self.ok}, FAIL: {self.failed}\n")
+        self.flush()
+        return self.comparator is None or self.comparator.finish()
+
+
+def main() -> None:
+    """Compare two results files given on the command line."""
+    parser = argparse.ArgumentParser(
+        description="Compare a results file with the expected results."
+    )
+    parser.add_argument("actual")
+    parser.add_argument("expected")
+    parser.add_argument("--limit", type=int, default=10,
+                        help="Mismatches to show (default: 10)")
+    args = parser.parse_args()
+    with open(args.actual, "r", encoding="utf-8") as actual, \
+            open(args.expected, "r", encoding="utf-8") as expected:
+        comparator = compare(actual, expected, args.limit)
+    for line in comparator.report():
+        print(line)
+    sys.exit(1 if comparator.count else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Compact room occupancy for hotels."""
+
+from typing import Iterable, Iterator, Optional
+
+
+class RoomSet:
+    """Set of reserved room numbers stored as an integer bitset.
+
+    Room ``n`` (numbered from 1 to ``size``) is bit ``n - 1``, so
+    membership, reserve and cancel are single bit operations, the
+    number of reserved rooms is a popcount and the next free room is the
+    lowest clear bit.
+    """
+
+    __slots__ = ("bits", "size")
+
+    def __init__(self, size: int = 0, bits: int = 0) -> None:
+        """Create a set for a hotel with size rooms."""
+        self.size = max(size, 0)
+        self.bits = bits
+
+    @classmethod
+    def from_rooms(cls, rooms: Iterable[int], size: int) -> "RoomSet":
+        """Build a set from a list of room numbers.
+
+        Raise ValueError for a room below 1, which older data files may
+        hold: it has no bit and the hotel does not have it.
+        """
+        bits = 0
+        for room in rooms:
+            if room < 1:
+                raise ValueError(
+                    f"Reserved room {room} does not exist: rooms are "
+                    "numbered from 1."
+                )
+            bits |= 1 << (room - 1)
+        return cls(size, bits)
+
+    @classmethod
+    def from_bytes(cls, raw: bytes, size: int) -> "RoomSet":
+        """Build a set from the output of to_bytes()."""
+        return cls(size, int.from_bytes(raw, "little"))
+
+    def to_bytes(self) -> bytes:
+        """Return the bitmap, one bit per room, little-endian."""
+        return self.bits.to_bytes((self.bits.bit_length() + 7) // 8,
+                                  "little")
+
+    def __contains__(self, room: object) -> bool:
+        """Return True if the room is reserved."""
+        if not isinstance(room, int) or room < 1:
+            return False
+        return bool(self.bits >> (room - 1) & 1)
+
+    def add(self, room: int) -> None:
+        """Mark a room as reserved."""
+        self.bits |= 1 << (room - 1)
+
+    def discard(self, room: int) -> None:
+        """Mark a room as free."""
+        if room >= 1:
+            self.bits &= ~(1 << (room - 1))
+
+    def __len__(self) -> int:
+        """Return the number of reserved rooms."""
+        return self.bits.bit_count()
+
+    def __iter__(self) -> Iterator[int]:
+        """Yield reserved room numbers in ascending order."""
+        bits = self.bits
+        while bits:
+            low = bits & -bits
+            yield low.bit_length()
+            bits ^= low
+
+    def __eq__(self, other: object) -> bool:
+        """Compare with another RoomSet or any iterable of rooms."""
+        if isinstance(other, RoomSet):
+            return self.bits == other.bits
+        if isinstance(other, (list, tuple, set, frozenset)):
+            return sorted(other) == list(self)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        """Return a readable representation."""
+        return f"RoomSet({list(self)!r}, size={self.size})"
+
+    def free_count(self) -> int:
+        """Return the number of free rooms."""
+        return max(self.size - len(self), 0)
+
+    def next_free(self, start: int = 1) -> Optional[int]:
+        """Return the lowest free room at or after start, if any."""
+        start = max(start, 1)
+        taken = self.bits | ((1 << (start - 1)) - 1)
+        room = (~taken & (taken + 1)).bit_length()
+        return room if room <= self.size else None
+
+    def highest(self) -> int:
+        """Return the highest reserved room, or 0 if none are."""
+        return self.bits.bit_length()
+
+    def resize(self, size: int) -> None:
+        """Change the number of rooms, keeping existing reservations."""
+        self.size = max(size, 0)
@@ -0,0 +1,266 @@
+"""Asyncio service API over the hotel management system."""
+
+import asyncio
+import copy
+from typing import Callable, Optional
+from src.hotel_management import Customer, Hotel, HotelStore, Reservation
+from src.storage import Backend
+
+
+def _fail(future: asyncio.Future, error: Exception) -> None:
+    """Fail a caller with an error caught in the writer task.
+
+    The traceback drops the writer's own frame: it is still running,
+    and a caller clearing the frames of the traceback (as assertRaises
+    does) would close it.
+    """
+    assert error.__traceback__ is not None
+    future.set_exception(error.with_traceback(error.__traceback__.tb_next))
+
+
+class AsyncHotelService:
+    """Async Customer/Hotel/Reservation operations with group commit.
+
+    All data lives in one HotelStore. Mutations are queued to a single
+    writer task, which applies every queued mutation in memory and then
+    persists the whole batch with one flush in a worker thread; each
+    caller resolves only after the flush that contains its change.
+    Reads are answered from memory on the event loop and may see changes
+    whose flush is still in progress.
+
+    A failed flush fails its batch and reloads the store. If the reload
+    fails too, the batch's changes are dropped and the service stops:
+    queued and later mutations raise RuntimeError.
+    """
+
+    def __init__(
+        self, backend: Optional[Backend] = None, max_batch: int = 1000
+    ) -> None:
+        """Create a service; call start() or use ``async with``."""
+        self.backend = backend
+        self.max_batch = max_batch
+        self.store: Optional[HotelStore] = None
+        self.batches = 0
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._writer: Optional[asyncio.Task] = None
+        self._error: Optional[Exception] = None
+
+    async def start(self) -> None:
+        """Load the data and start the writer task."""
+        self.store = await asyncio.to_thread(HotelStore, self.backend)
+        self.store.__enter__()
+        self._writer = asyncio.create_task(self._write_loop())
+
+    async def close(self) -> None:
+        """Wait for queued mutations, then stop the writer."""
+        if self._writer is None or self.store is None:
+            return
+        await self._queue.join()
+        self._writer.cancel()
+        try:
+            await self._writer
+        except asyncio.CancelledError:
+            pass
+        self._writer = None
+        self.store.__exit__(None, None, None)
+
+    async def __aenter__(self) -> "AsyncHotelService":
+        """Start the service."""
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        """Close the service."""
+        await self.close()
+
+    async def _submit(self, mutation: Callable[[], None]) -> None:
+        """Queue a mutation and wait until it is durable."""
+        if self._error is not None:
+            raise self._stopped()
+        if self._writer is None:
+            raise RuntimeError("AsyncHotelService is not started.")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((mutation, future))
+        await future
+
+    async def _write_loop(self) -> None:
+        """Apply queued mutations in batches with one flush per batch."""
+        assert self.store is not None
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            # errors go to the callers: a writer that stopped would
+            # leave every later caller waiting
+            applied = []
+            for mutation, future in batch:
+                try:
+                    mutation()
+                except Exception as e:  # pylint: disable=W0718
+                    _fail(future, e)
+                else:
+                    applied.append(future)
+
+            try:
+                await asyncio.to_thread(self.store.flush)
+            except Exception as e:  # pylint: disable=W0718
+                for future in applied:
+                    _fail(future, e)
+                try:
+                    await asyncio.to_thread(self.store.reload)
+                except Exception as reload_error:  # pylint: disable=W0718
+                    self._stop(reload_error)
+            else:
+                for future in applied:
+                    future.set_result(None)
+            self.batches += 1
+            for _ in batch:
+                self._queue.task_done()
+            if self._error is not None:
+                return
+
+    def _stop(self, error: Exception) -> None:
+        """Stop the service after the store failed to reload.
+
+        Memory still holds the changes of the batch that was not
+        written; they are dropped so that closing the store does not
+        write them, and every queued caller is failed.
+        """
+        assert self.store is not None
+        self._error = error
+        self.store.discard()
+        self.store.__exit__(None, None, None)
+        self.store = None
+        self._writer = None
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            future.set_exception(self._stopped())
+            self._queue.task_done()
+
+    def _stopped(self) -> RuntimeError:
+        """Return the error raised by mutations after the service stopped."""
+        error = RuntimeError(
+            "AsyncHotelService stopped: the store could not be reloaded "
+            "after a failed write."
+        )
+        error.__cause__ = self._error
+        return error
+
+    async def create_customer(
+        self, customer_id: str, name: str, email: str
+    ) -> None:
+        """Create a customer."""
+        await self._submit(Customer(customer_id, name, email).create)
+
+    async def modify_customer(
+        self,
+        customer_id: str,
+        name: Optional[str] = None,
+        email: Optional[str] = None
+    ) -> None:
+        """Update the name or email of a customer."""
+        await self._submit(lambda: Customer.modify(customer_id, name, email))
+
+    async def delete_customer(
+        self, customer_id: str, cascade: bool = False
+    ) -> None:
+        """Delete a customer, and its reservations with cascade."""
+        await self._submit(lambda: Customer.delete(customer_id, cascade))
+
+    async def create_hotel(
+        self, hotel_id: str, name: str, total_rooms: int
+    ) -> None:
+        """Create a hotel."""
+        await self._submit(Hotel(hotel_id, name, total_rooms).create)
+
+    async def modify_hotel(
+        self,
+        hotel_id: str,
+        name: Optional[str] = None,
+        total_rooms: Optional[int] = None
+    ) -> None:
+        """Update the name or total rooms of a hotel."""
+        await self._submit(lambda: Hotel.modify(hotel_id, name, total_rooms))
+
+    async def delete_hotel(self, hotel_id: str, cascade: bool = False) -> None:
+        """Delete a hotel, and its reservations with cascade."""
+        await self._submit(lambda: Hotel.delete(hotel_id, cascade))
+
+    async def reserve_room(self, hotel_id: str, room_number: int) -> None:
+        """Hold a room in a hotel."""
+        await self._submit(lambda: Hotel.reserve_room(hotel_id, room_number))
+
+    async def cancel_room(self, hotel_id: str, room_number: int) -> None:
+        """Release a held room in a hotel."""
+        await self._submit(lambda: Hotel.cancel_room(hotel_id, room_number))
+
+    async def create_reservation(
+        self, reservation: Reservation, auto_assign: int = 0
+    ) -> None:
+        """Create a reservation, picking auto_assign free rooms if set."""
+        await self._submit(lambda: reservation.create(auto_assign))
+
+    async def cancel_reservation(self, reservation_id: str) -> None:
+        """Cancel a reservation."""
+        await self._submit(lambda: Reservation.cancel(reservation_id))
+
+    def _get(self, section: str, key: str, label: str) -> dict:
+        """Return a copy of one record from memory."""
+        if self.store is None:
+            raise RuntimeError("AsyncHotelService is not running.")
+        record = self.store.data[section].get(key)
+        if record is None:
+            raise ValueError(f"{label} {key} not found.")
+        return copy.deepcopy(record)
+
+    def get_customer(self, customer_id: str) -> dict:
+        """Return a customer's record."""
+        return self._get("customers", customer_id, "Customer")
+
+    def get_hotel(self, hotel_id: str) -> dict:
+        """Return a hotel's record with reserved rooms as a list."""
+        hotel = self._get("hotels", hotel_id, "Hotel")
+        hotel["reserved_rooms"] = list(hotel["reserved_rooms"])
+        return hotel
+
+    def get_reservation(self, reservation_id: str) -> dict:
+        """Return a reservation's record."""
+        return self._get("reservations", reservation_id, "Reservation")
+
+    def customer_reservations(self, customer_id: str) -> list[str]:
+        """Return the IDs of a customer's reservations."""
+        return Customer.reservations(customer_id)
+
+    def hotel_reservations(self, hotel_id: str) -> list[str]:
+        """Return the IDs of a hotel's reservations."""
+        return Hotel.reservations(hotel_id)
+
+    def is_room_available(
+        self, hotel_id: str, room_number: int, check_in: str, check_out: str
+    ) -> bool:
+        """Return True if the room can be booked for the given stay."""
+        return Hotel.is_room_available(
+            hotel_id, room_number, check_in, check_out
+        )
+
+    def free_rooms(
+        self, hotel_id: str, check_in: str, check_out: str
+    ) -> list[int]:
+        """Return the rooms of a hotel that are free for the given stay."""
+        return Hotel.free_rooms(hotel_id, check_in, check_out)
+
+    def find_available_rooms(
+        self, hotel_id: str, count: int, check_in: str = "",
+        check_out: str = ""
+    ) -> list[int]:
+        """Return the count lowest rooms of a hotel free for the stay."""
+        return Hotel.find_available_rooms(
+            hotel_id, count, check_in, check_out
+        )
+
+    def find_hotels(
+        self, count: int, check_in: str = "", check_out: str = ""
+    ) -> dict[str, int]:
+        """Return the hotels with at least count rooms free for the stay."""
+        return Hotel.find_hotels(count, check_in, check_out)
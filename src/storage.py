@@ -0,0 +1,803 @@
+"""Storage backends for the hotel management system."""
+
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from contextlib import ExitStack, contextmanager
+from typing import Iterable, Iterator, Optional
+from src import formats, lazy
+from src.instrumentation import count, instrumented, timer
+from src.rooms import RoomSet
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+
+class ConflictError(ValueError):
+    """Raised when another writer changed the data since it was loaded."""
+
+
+# The (section, key) pairs an operation reads or writes, e.g.
+# [("hotels", "H1")]; backends that lock finer than the whole data set
+# use it to lock only what the operation touches.
+Scope = Optional[Iterable[tuple[str, object]]]
+
+
+_locks: dict[str, list] = {}
+_locks_guard = threading.Lock()
+
+
+@contextmanager
+def file_lock(path: str) -> Iterator[int]:
+    """Hold an exclusive fcntl lock on path, yielding its descriptor.
+
+    The lock is re-entrant within a thread, and other threads of the
+    process wait on it like other processes do.
+    """
+    with _locks_guard:
+        entry = _locks.setdefault(path, [threading.RLock(), None, 0])
+    with entry[0]:
+        if entry[2] == 0:
+            entry[1] = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            if fcntl is not None:
+                fcntl.flock(entry[1], fcntl.LOCK_EX)
+        entry[2] += 1
+        try:
+            yield entry[1]
+        finally:
+            entry[2] -= 1
+            if entry[2] == 0:
+                os.close(entry[1])  # closing releases the flock
+                entry[1] = None
+
+
+def _file_stamp(path: str) -> Optional[tuple[int, int, int]]:
+    """Return the mtime, size and inode of a file, None if missing."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+def empty() -> dict:
+    """Return the data structure of an empty database."""
+    return {"hotels": {}, "customers": {}, "reservations": {}}
+
+
+def with_room_sets(data: dict) -> dict:
+    """Replace the reserved room lists of every hotel by RoomSets."""
+    for hotel in data["hotels"].values():
+        hotel["reserved_rooms"] = RoomSet.from_rooms(
+            hotel["reserved_rooms"], hotel["total_rooms"]
+        )
+    return data
+
+
+def apply_change(data: dict, change: dict) -> None:
+    """Apply one change record to the data.
+
+    Records assign absolute values (put, set, del, reserve, release), and
+    a record whose target is already gone is skipped, so replaying a log
+    over a snapshot that already contains it leaves the data unchanged.
+    Records changed in place are assigned back to their section, which
+    is how a LazySection learns which records to write.
+    """
+    op = change["op"]
+    if op in ("reserve", "release"):
+        hotel = data["hotels"].get(change["k"])
+        if hotel is None:
+            return
+        if op == "reserve":
+            hotel["reserved_rooms"].add(change["room"])
+        else:
+            hotel["reserved_rooms"].discard(change["room"])
+        data["hotels"][change["k"]] = hotel
+        return
+
+    section = data[change["s"]]
+    if op == "put":
+        record = {
+            key: list(value) if isinstance(value, list) else value
+            for key, value in change["v"].items()
+        }
+        if change["s"] == "hotels":
+            record["reserved_rooms"] = RoomSet.from_rooms(
+                record["reserved_rooms"], record["total_rooms"]
+            )
+        section[change["k"]] = record
+    elif op == "set":
+        if change["k"] in section:
+            record = section[change["k"]]
+            record.update(change["v"])
+            if change["s"] == "hotels" and "total_rooms" in change["v"]:
+                record["reserved_rooms"].resize(change["v"]["total_rooms"])
+            section[change["k"]] = record
+    elif op == "del":
+        section.pop(change["k"], None)
+    else:
+        raise ValueError(f"Unknown change {op}.")
+
+
+class Backend:
+    """Interface between the in-memory data and persistent storage."""
+
+    def load(self) -> dict:
+        """Return the full data structure."""
+        raise NotImplementedError
+
+    def save(
+        self,
+        data: dict,
+        changes: Optional[list] = None,
+        expected: Optional[int] = None
+    ) -> int:
+        """Persist the data and return the new version.
+
+        ``changes`` lists the records applied since the last save; a
+        backend may write only those. ``None`` asks for a full write.
+        If ``expected`` is given and the stored version differs, nothing
+        is written and ConflictError is raised.
+        """
+        raise NotImplementedError
+
+    def version(self) -> int:
+        """Return the version counter, bumped by every save."""
+        raise NotImplementedError
+
+    def stamp(self, scope: Scope = None) -> dict:
+        """Return tokens that change whenever the stored data changes.
+
+        The tokens cover the parts of the storage holding the entities
+        in ``scope`` (everything if None), keyed by part, and also change
+        when a file is rewritten behind the backend's back. An empty
+        dict means the backend cannot tell, and nothing is cached.
+        """
+        return {}
+
+    @contextmanager
+    def locked(self, scope: Scope = None) -> Iterator[None]:
+        """Hold the cross-process write lock for a read-modify-write.
+
+        ``scope`` lists the entities the read-modify-write touches;
+        ``None`` means it may touch anything.
+        """
+        yield
+
+    def compact(self, data: dict) -> None:
+        """Fold incremental writes into the main copy of the data."""
+
+    def clear(self) -> None:
+        """Remove all stored data."""
+        raise NotImplementedError
+
+
+class JsonBackend(Backend):
+    """Indented JSON file, optionally with an append-only change log.
+
+    ``fmt`` selects the snapshot format from ``formats.FORMATS``: the
+    default indented ``json``, ``compact`` JSON without whitespace, or
+    the packed ``binary`` format.
+
+    With ``wal=True`` incremental saves append the change records to
+    ``<path>.log`` instead of rewriting the file; loading replays the log
+    over the snapshot, and the snapshot is rewritten once the log grows
+    past ``compact_at`` bytes.
+
+    JSON snapshots are written with an offset index in ``<path>.idx``
+    and loaded lazily through it: sections are LazySections that parse
+    a record only when it is first read (see ``src.lazy``). Writing a
+    snapshot replaces the dict and LazySection sections of the data by
+    LazySections over it, so the next write only encodes the records
+    assigned since. Binary snapshots are column-wise and are decoded
+    whole.
+
+    Writes go through ``<path>.lock``: an fcntl lock serialises writers
+    across processes and the file holds the version counter. The
+    snapshot is replaced atomically with a temporary file and rename.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        wal: bool = False,
+        compact_at: int = 1 << 20,
+        fmt: str = "json"
+    ) -> None:
+        """Create a backend over the JSON file at path."""
+        if fmt not in formats.FORMATS:
+            raise ValueError(f"Unknown format {fmt}.")
+        self.path = path
+        self.fmt = fmt
+        self.log_path = path + ".log"
+        self.lock_path = path + ".lock"
+        self.index_path = path + ".idx"
+        self.wal = wal
+        self.compact_at = compact_at
+
+    @instrumented("storage.load")
+    def load(self) -> dict:
+        """Load the snapshot and replay the log on top of it."""
+        if os.path.exists(self.path):
+            with timer(f"{self.fmt}.parse"):
+                data = None
+                if self.fmt != "binary":
+                    data = lazy.open_snapshot(self.path, self.index_path)
+                if data is None:
+                    with open(self.path, "rb") as f:
+                        raw = f.read()
+                    count("bytes_read", len(raw))
+                    data = formats.loads(raw, self.fmt)
+                    if self.fmt != "binary":
+                        with_room_sets(data)
+        else:
+            data = empty()
+        if self.wal and os.path.exists(self.log_path):
+            with open(self.log_path, "r", encoding="utf-8") as f:
+                count("bytes_read", os.fstat(f.fileno()).st_size)
+                with timer("json.replay"):
+                    for line in f:
+                        if not line.endswith("\n"):
+                            break  # torn write from a crash, drop the rest
+                        apply_change(data, json.loads(line))
+        return data
+
+    @instrumented("storage.save")
+    def save(
+        self,
+        data: dict,
+        changes: Optional[list] = None,
+        expected: Optional[int] = None
+    ) -> int:
+        """Append changes to the log, or rewrite the whole file."""
+        with self.locked():
+            current = self.version()
+            if expected is not None and current != expected:
+                raise ConflictError(
+                    f"{self.path} changed (version {expected} -> {current})."
+                )
+            if not self.wal or changes is None:
+                self.compact(data)
+            else:
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    with timer("json.dump"):
+                        text = "".join(
+                            json.dumps(change, separators=(",", ":"),
+                                       default=list) + "\n"
+                            for change in changes
+                        )
+                    f.write(text)
+                    f.flush()
+                    os.fsync(f.fileno())
+                count("bytes_written", len(text.encode("utf-8")))
+                if os.path.getsize(self.log_path) >= self.compact_at:
+                    self.compact(data)
+            self._set_version(current + 1)
+            return current + 1
+
+    @instrumented("storage.version")
+    def version(self) -> int:
+        """Read the version counter from the lock file."""
+        try:
+            with open(self.lock_path, "rb") as f:
+                raw = f.read(20)
+        except FileNotFoundError:
+            return 0
+        return int(raw) if raw.strip() else 0
+
+    def stamp(self, scope: Scope = None) -> dict:
+        """Return the version and the snapshot and log file stamps."""
+        return {self.path: (
+            self.wal, self.fmt, self.version(), _file_stamp(self.path),
+            _file_stamp(self.log_path) if self.wal else None
+        )}
+
+    def _set_version(self, version: int) -> None:
+        """Write the version counter; the lock must be held."""
+        with file_lock(self.lock_path) as fd:
+            os.pwrite(fd, f"{version:020d}".encode(), 0)
+
+    @contextmanager
+    def locked(self, scope: Scope = None) -> Iterator[None]:
+        """Hold the fcntl lock on <path>.lock."""
+        with file_lock(self.lock_path):
+            yield
+
+    @instrumented("storage.compact")
+    def compact(self, data: dict) -> None:
+        """Rewrite the snapshot atomically and truncate the log."""
+        with self.locked():
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            built = self._write(data, tmp_path)
+            os.replace(tmp_path, self.path)
+            if built is not None:
+                os.replace(tmp_path + ".idx", self.index_path)
+                lazy.rebase(data, self.path, built)
+            elif os.path.exists(self.index_path):
+                os.remove(self.index_path)
+            if os.path.exists(self.log_path):
+                os.remove(self.log_path)
+
+    def clear(self) -> None:
+        """Delete the snapshot, index, log and lock files."""
+        for path in (self.path, self.index_path, self.log_path,
+                     self.lock_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _write(self, data: dict, path: str) -> Optional[bytes]:
+        """Write data to a snapshot file and sync it to disk.
+
+        JSON snapshots get their offset index in ``<path>.idx``, which is
+        also returned.
+        """
+        spans = None
+        with timer(f"{self.fmt}.dump"):
+            if self.fmt == "binary":
+                raw = formats.dumps(data, self.fmt)
+            else:
+                raw, spans = lazy.dump_json(data, self.fmt == "compact")
+        with open(path, "wb") as f:
+            f.write(raw)
+            f.flush()
+            os.fsync(f.fileno())
+            stat = os.fstat(f.fileno())
+        count("bytes_written", len(raw))
+        if spans is None:
+            return None
+        style = (lazy.STYLE_COMPACT if self.fmt == "compact"
+                 else lazy.STYLE_INDENT)
+        built = lazy.SnapshotIndex.build(spans, style, stat)
+        with open(path + ".idx", "wb") as f:
+            f.write(built)
+        return built
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS hotels (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    total_rooms INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS reserved_rooms (
+    hotel_id TEXT NOT NULL REFERENCES hotels(id) ON DELETE CASCADE,
+    room INTEGER NOT NULL,
+    PRIMARY KEY (hotel_id, room)
+);
+CREATE TABLE IF NOT EXISTS customers (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS reservations (
+    id TEXT PRIMARY KEY,
+    customer_id TEXT NOT NULL,
+    hotel_id TEXT NOT NULL,
+    check_in TEXT NOT NULL,
+    check_out TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reservations_customer
+    ON reservations (customer_id);
+CREATE INDEX IF NOT EXISTS reservations_hotel
+    ON reservations (hotel_id);
+CREATE TABLE IF NOT EXISTS reservation_rooms (
+    reservation_id TEXT NOT NULL
+        REFERENCES reservations(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    room INTEGER NOT NULL,
+    PRIMARY KEY (reservation_id, position)
+);
+"""
+
+# Reservations are only indexed by customer and hotel, not constrained:
+# the JSON store lets a customer or hotel be deleted while reservations
+# still point at it, and both backends must behave the same.
+_COLUMNS = {
+    "hotels": ("name", "total_rooms"),
+    "customers": ("name", "email"),
+    "reservations": ("customer_id", "hotel_id", "check_in", "check_out"),
+}
+
+
+class SqliteBackend(Backend):
+    """SQLite database in WAL journal mode, written incrementally.
+
+    Every save runs in a ``BEGIN IMMEDIATE`` transaction, which SQLite
+    serialises across processes, and bumps ``PRAGMA user_version`` as the
+    version counter. Read-modify-write sessions additionally hold an
+    fcntl lock on ``<path>.lock``.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Open (and if needed create) the database at path."""
+        self.path = path
+        self.conn = sqlite3.connect(
+            path, isolation_level=None, timeout=30, check_same_thread=False
+        )
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # FULL syncs every commit, so a save is durable when it returns
+        # as it is with JsonBackend
+        self.conn.execute("PRAGMA synchronous=FULL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(_SCHEMA)
+
+    @instrumented("storage.load")
+    def load(self) -> dict:
+        """Read every table into the dict-of-dicts structure."""
+        data = empty()
+        cur = self.conn.cursor()
+        cur.execute("BEGIN")  # one read snapshot for all the tables
+        for hotel_id, name, total_rooms in cur.execute(
+            "SELECT id, name, total_rooms FROM hotels"
+        ):
+            data["hotels"][hotel_id] = {
+                "name": name,
+                "total_rooms": total_rooms,
+                "reserved_rooms": []
+            }
+        for hotel_id, room in cur.execute(
+            "SELECT hotel_id, room FROM reserved_rooms"
+        ):
+            data["hotels"][hotel_id]["reserved_rooms"].append(room)
+        for customer_id, name, email in cur.execute(
+            "SELECT id, name, email FROM customers"
+        ):
+            data["customers"][customer_id] = {"name": name, "email": email}
+        for row in cur.execute(
+            "SELECT id, customer_id, hotel_id, check_in, check_out "
+            "FROM reservations"
+        ):
+            data["reservations"][row[0]] = {
+                "customer_id": row[1],
+                "hotel_id": row[2],
+                "rooms": [],
+                "check_in": row[3],
+                "check_out": row[4]
+            }
+        for reservation_id, room in cur.execute(
+            "SELECT reservation_id, room FROM reservation_rooms "
+            "ORDER BY reservation_id, position"
+        ):
+            data["reservations"][reservation_id]["rooms"].append(room)
+        cur.execute("COMMIT")
+        return with_room_sets(data)
+
+    @instrumented("storage.save")
+    def save(
+        self,
+        data: dict,
+        changes: Optional[list] = None,
+        expected: Optional[int] = None
+    ) -> int:
+        """Apply the change records, or replace every row, in one commit."""
+        count("rows_written", len(changes) if changes is not None else sum(
+            len(data[section]) for section in _COLUMNS
+        ))
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            current = self.version()
+            if expected is not None and current != expected:
+                raise ConflictError(
+                    f"{self.path} changed (version {expected} -> {current})."
+                )
+            if changes is None:
+                for table in ("reservation_rooms", "reservations",
+                              "reserved_rooms", "hotels", "customers"):
+                    self.conn.execute(f"DELETE FROM {table}")
+                for section in ("hotels", "customers", "reservations"):
+                    for key, value in data[section].items():
+                        self._put(section, key, value)
+            else:
+                for change in changes:
+                    self._write_change(change)
+            self.conn.execute(f"PRAGMA user_version = {current + 1:d}")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+        return current + 1
+
+    @instrumented("storage.version")
+    def version(self) -> int:
+        """Return PRAGMA user_version."""
+        return self.conn.execute("PRAGMA user_version").fetchone()[0]
+
+    def stamp(self, scope: Scope = None) -> dict:
+        """Return the version and the database and WAL file stamps."""
+        return {self.path: (
+            self.version(), _file_stamp(self.path),
+            _file_stamp(self.path + "-wal")
+        )}
+
+    @contextmanager
+    def locked(self, scope: Scope = None) -> Iterator[None]:
+        """Hold the fcntl lock on <path>.lock."""
+        with file_lock(self.path + ".lock"):
+            yield
+
+    def clear(self) -> None:
+        """Delete every row."""
+        self.save(empty())
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self.conn.close()
+
+    def _write_change(self, change: dict) -> None:
+        """Translate one change record into SQL statements."""
+        op = change["op"]
+        if op == "reserve":
+            self.conn.execute(
+                "INSERT OR IGNORE INTO reserved_rooms (hotel_id, room) "
+                "VALUES (?, ?)", (change["k"], change["room"])
+            )
+        elif op == "release":
+            self.conn.execute(
+                "DELETE FROM reserved_rooms WHERE hotel_id = ? AND room = ?",
+                (change["k"], change["room"])
+            )
+        elif op == "put":
+            self._put(change["s"], change["k"], change["v"])
+        elif op == "set":
+            for column, value in change["v"].items():
+                if column not in _COLUMNS[change["s"]]:
+                    raise ValueError(f"Unknown field {column}.")
+                self.conn.execute(
+                    f"UPDATE {change['s']} SET {column} = ? WHERE id = ?",
+                    (value, change["k"])
+                )
+        elif op == "del":
+            self.conn.execute(
+                f"DELETE FROM {change['s']} WHERE id = ?", (change["k"],)
+            )
+        else:
+            raise ValueError(f"Unknown change {op}.")
+
+    def _put(self, section: str, key: str, value: dict) -> None:
+        """Insert or replace one entity and its room rows."""
+        columns = _COLUMNS[section]
+        self.conn.execute(
+            f"INSERT INTO {section} (id, {', '.join(columns)}) "
+            f"VALUES (?{', ?' * len(columns)}) "
+            f"ON CONFLICT(id) DO UPDATE SET "
+            + ", ".join(f"{c} = excluded.{c}" for c in columns),
+            (key, *(value[c] for c in columns))
+        )
+        if section == "hotels":
+            self.conn.execute(
+                "DELETE FROM reserved_rooms WHERE hotel_id = ?", (key,)
+            )
+            self.conn.executemany(
+                "INSERT INTO reserved_rooms (hotel_id, room) VALUES (?, ?)",
+                ((key, room) for room in value["reserved_rooms"])
+            )
+        elif section == "reservations":
+            self.conn.execute(
+                "DELETE FROM reservation_rooms WHERE reservation_id = ?",
+                (key,)
+            )
+            self.conn.executemany(
+                "INSERT INTO reservation_rooms "
+                "(reservation_id, position, room) VALUES (?, ?, ?)",
+                ((key, i, room) for i, room in enumerate(value["rooms"]))
+            )
+
+
+class ShardedBackend(Backend):
+    """Data split into shard files so writers only touch what they change.
+
+    The directory holds a ``customers`` shard, a ``reservations`` shard
+    and ``buckets`` hotel shards, each hotel going to the bucket of the
+    CRC32 of its id. Every shard is a JsonBackend with its own lock and
+    version counter, so reserving a room rewrites one hotel bucket and
+    writers of different buckets never wait on each other.
+
+    The version is a dict of shard versions. A save locks, in name
+    order, the shards it writes plus those its changes were validated
+    against (a new reservation depends on its hotel and the customers),
+    and only conflicts if one of those changed. Deleting a customer or
+    hotel, or changing a hotel's total rooms, also depends on the
+    reservations.
+
+    A thread only ever waits for a shard lock in name order. When a save
+    needs a shard that sorts before one its session already holds (a
+    cancellation writing a hotel its scope did not name), the held
+    locks are released and the whole set is taken again in order; the
+    version check then catches anything written in between.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        buckets: int = 16,
+        wal: bool = False,
+        fmt: str = "json"
+    ) -> None:
+        """Create a backend over the shard files in directory."""
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.buckets = buckets
+        extension = ".bin" if fmt == "binary" else ".json"
+        self._held = threading.local()
+        self.shards = {
+            name: JsonBackend(os.path.join(directory, name + extension),
+                              wal=wal, fmt=fmt)
+            for name in ("customers", "reservations",
+                         *(f"hotels-{i:02d}" for i in range(buckets)))
+        }
+
+    def shard(self, section: str, key: object) -> str:
+        """Return the name of the shard holding an entity."""
+        if section != "hotels":
+            return section
+        bucket = zlib.crc32(str(key).encode("utf-8")) % self.buckets
+        return f"hotels-{bucket:02d}"
+
+    def _touched(self, changes: list) -> tuple[dict[str, list], set[str]]:
+        """Return the changes per written shard and the shards read."""
+        written: dict[str, list] = {}
+        read: set[str] = set()
+        for change in changes:
+            section = change.get("s", "hotels")
+            written.setdefault(self.shard(section, change["k"]), []).append(
+                change
+            )
+            if change["op"] == "put" and section == "reservations":
+                read.add("customers")
+                read.add(self.shard("hotels", change["v"]["hotel_id"]))
+            elif (change["op"] == "del" and section != "reservations" or
+                  change["op"] == "set" and section == "hotels" and
+                  "total_rooms" in change["v"]):
+                # checked against the reservations referring to them
+                read.add("reservations")
+        return written, read
+
+    def _slice(self, data: dict, name: str) -> dict:
+        """Return the part of the data stored in one shard."""
+        part = empty()
+        if name.startswith("hotels-"):
+            hotels = data["hotels"]
+            if isinstance(hotels, lazy.RoutedSection):
+                part["hotels"] = hotels.parts[name]
+                return part
+            part["hotels"] = {
+                key: value for key, value in data["hotels"].items()
+                if self.shard("hotels", key) == name
+            }
+        else:
+            part[name] = data[name]
+        return part
+
+    @staticmethod
+    def _adopt(data: dict, name: str, part: dict) -> None:
+        """Take back the sections a shard write rebased (see _slice)."""
+        if not name.startswith("hotels-"):
+            data[name] = part[name]
+        elif isinstance(data["hotels"], lazy.RoutedSection):
+            data["hotels"].parts[name] = part["hotels"]
+
+    @contextmanager
+    def _lock(self, names: Iterable[str]) -> Iterator[None]:
+        """Hold the locks of the named shards, taken in name order.
+
+        Inside another _lock of the same thread the shards are added to
+        those held, which stay held until the outermost one ends.
+        """
+        held = self._held
+        if getattr(held, "stack", None) is not None:
+            self._extend(set(names))
+            yield
+            return
+        held.names, held.stack = set(), ExitStack()
+        try:
+            self._extend(set(names))
+            yield
+        finally:
+            stack, held.stack = held.stack, None
+            stack.close()
+
+    def _extend(self, names: set[str]) -> None:
+        """Add shards to the locks the thread holds, keeping name order."""
+        held = self._held
+        missing = names - held.names
+        if not missing:
+            return
+        if held.names and min(missing) < max(held.names):
+            held.stack.close()
+            missing |= held.names
+            held.names, held.stack = set(), ExitStack()
+        for name in sorted(missing):
+            held.stack.enter_context(self.shards[name].locked())
+            held.names.add(name)
+
+    @instrumented("storage.load")
+    def load(self) -> dict:
+        """Merge every shard into one data structure.
+
+        Hotels are a RoutedSection over the buckets, so the shards'
+        sections stay lazy and a bucket is written back as it is.
+        """
+        data = empty()
+        buckets = {}
+        for name, backend in self.shards.items():
+            if name.startswith("hotels-"):
+                buckets[name] = backend.load()["hotels"]
+            else:
+                data[name] = backend.load()[name]
+        data["hotels"] = lazy.RoutedSection(
+            buckets, lambda key: self.shard("hotels", key)
+        )
+        return data
+
+    @instrumented("storage.save")
+    def save(
+        self,
+        data: dict,
+        changes: Optional[list] = None,
+        expected: Optional[dict] = None
+    ) -> dict:
+        """Write the shards the changes touch, or every shard."""
+        if changes is None:
+            written = {name: None for name in self.shards}
+            read: set[str] = set()
+        else:
+            written, read = self._touched(changes)
+        with self._lock([*written, *read]):
+            current = {name: self.shards[name].version()
+                       for name in [*written, *read]}
+            if expected is not None:
+                for name, version in current.items():
+                    if expected.get(name, 0) != version:
+                        raise ConflictError(
+                            f"{name} changed (version {expected.get(name, 0)}"
+                            f" -> {version})."
+                        )
+            versions = dict(expected or self.version())
+            for name, shard_changes in written.items():
+                part = self._slice(data, name)
+                versions[name] = self.shards[name].save(part, shard_changes)
+                self._adopt(data, name, part)
+            return versions
+
+    def version(self) -> dict:
+        """Return the version counter of every shard."""
+        return {name: backend.version()
+                for name, backend in self.shards.items()}
+
+    def stamp(self, scope: Scope = None) -> dict:
+        """Return the stamps of the shards in scope, or of every shard."""
+        if scope is None:
+            names: Iterable[str] = self.shards
+        else:
+            names = {self.shard(section, key) for section, key in scope}
+        stamps: dict = {}
+        for name in names:
+            stamps.update(self.shards[name].stamp())
+        return stamps
+
+    @contextmanager
+    def locked(self, scope: Scope = None) -> Iterator[None]:
+        """Hold the locks of the shards in scope, or of every shard."""
+        if scope is None:
+            names: Iterable[str] = self.shards
+        else:
+            names = [self.shard(section, key) for section, key in scope]
+        with self._lock(names):
+            yield
+
+    def compact(self, data: dict) -> None:
+        """Rewrite every shard and fold its log."""
+        with self.locked():
+            for name, backend in self.shards.items():
+                part = self._slice(data, name)
+                backend.compact(part)
+                self._adopt(data, name, part)
+
+    def clear(self) -> None:
+        """Delete every shard file."""
+        for backend in self.shards.values():
+            backend.clear()
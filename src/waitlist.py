@@ -0,0 +1,192 @@
+"""Waitlists of reservation requests, one priority heap per hotel.
+
+A request that cannot be booked because its rooms are taken may wait
+for them. Each hotel has a heap ordered by priority class (higher
+first) and then by the order requests were queued, so taking the next
+request and putting back one that still does not fit are O(log n),
+whatever the number of requests waiting.
+
+The waitlist only holds the requests; hotel_management books them when
+a cancellation frees rooms. It lives in memory, in the process that
+queued the requests.
+"""
+
+import heapq
+import itertools
+import time
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+from src.instrumentation import Histogram
+
+SCAN = 32
+
+
+@dataclass(slots=True)
+class Request:
+    """A reservation waiting for rooms.
+
+    ``count`` rooms are picked when it is booked, or ``rooms`` exactly
+    if count is 0.
+    """
+    reservation_id: str
+    customer_id: str
+    hotel_id: str
+    rooms: list[int] = field(default_factory=list)
+    count: int = 0
+    check_in: str = ""
+    check_out: str = ""
+    priority: int = 0
+    queued: float = 0.0
+    order: int = 0
+
+
+class Waitlist:
+    """Requests waiting for rooms, served by priority then queue order.
+
+    ``waiting`` maps reservation IDs to their requests in queue order;
+    withdrawn requests are only dropped from their heap when they reach
+    its top, and a heap with as many dead entries as live ones is
+    rebuilt. Wait times of booked requests go to a Histogram.
+    """
+
+    def __init__(self, scan: int = SCAN) -> None:
+        """Create an empty waitlist examining scan requests per hotel."""
+        self.scan = scan
+        self.clear()
+
+    def clear(self) -> None:
+        """Drop every request and reset the counters."""
+        self.heaps: dict[str, list[tuple[int, int, Request]]] = {}
+        self.waiting: dict[str, Request] = {}
+        self.depths: dict[str, int] = {}
+        self.waits = Histogram()
+        self.queued = 0
+        self.booked = 0
+        self.dropped = 0
+        self.withdrawn = 0
+        self._order = itertools.count()
+
+    def add(self, request: Request) -> None:
+        """Queue a request; raise ValueError if its ID is already waiting."""
+        if request.reservation_id in self.waiting:
+            raise ValueError(
+                f"Reservation {request.reservation_id} is already waiting."
+            )
+        request.queued = request.queued or time.monotonic()
+        request.order = next(self._order)
+        self.waiting[request.reservation_id] = request
+        self._push(request)
+        self.depths[request.hotel_id] = self.depth(request.hotel_id) + 1
+        self.queued += 1
+
+    def _push(self, request: Request) -> None:
+        """Put a request in its hotel's heap."""
+        heapq.heappush(
+            self.heaps.setdefault(request.hotel_id, []),
+            (-request.priority, request.order, request)
+        )
+
+    def _remove(self, request: Request) -> None:
+        """Forget a waiting request."""
+        del self.waiting[request.reservation_id]
+        depth = self.depths[request.hotel_id] - 1
+        if depth:
+            self.depths[request.hotel_id] = depth
+        else:
+            del self.depths[request.hotel_id]
+            self.heaps.pop(request.hotel_id, None)
+
+    def withdraw(self, reservation_id: str) -> None:
+        """Remove a waiting request; raise ValueError if there is none."""
+        request = self.waiting.get(reservation_id)
+        if request is None:
+            raise ValueError(f"Reservation {reservation_id} is not waiting.")
+        self._remove(request)
+        self.withdrawn += 1
+        heap = self.heaps.get(request.hotel_id)
+        depth = self.depth(request.hotel_id)
+        if heap is not None and len(heap) > 2 * depth:
+            heap[:] = [entry for entry in heap
+                       if self.waiting.get(entry[2].reservation_id)
+                       is entry[2]]
+            heapq.heapify(heap)
+
+    def take(self, hotel_id: str) -> list[Request]:
+        """Pop up to scan waiting requests of a hotel, next served first.
+
+        The caller books those it can and must give the others back
+        with requeue(), which keeps their place in the queue.
+        """
+        heap = self.heaps.get(hotel_id)
+        taken: list[Request] = []
+        while heap and len(taken) < self.scan:
+            _, _, request = heapq.heappop(heap)
+            if self.waiting.get(request.reservation_id) is request:
+                taken.append(request)
+        return taken
+
+    def requeue(self, requests: Iterable[Request]) -> None:
+        """Give back requests returned by take() that were not booked."""
+        for request in requests:
+            self._push(request)
+
+    def done(self, request: Request, booked: bool = True) -> None:
+        """Remove a request returned by take() once booked or dropped."""
+        self._remove(request)
+        if booked:
+            self.booked += 1
+            self.waits.add(time.monotonic() - request.queued)
+        else:
+            self.dropped += 1
+
+    def restore(self, request: Request, booked: bool = True) -> None:
+        """Put back a request removed by done(), in its old place.
+
+        Rolls back a booking or drop; the wait time of a booking stays
+        in ``waits``.
+        """
+        if booked:
+            self.booked -= 1
+        else:
+            self.dropped -= 1
+        self.waiting[request.reservation_id] = request
+        self.depths[request.hotel_id] = self.depth(request.hotel_id) + 1
+        self._push(request)
+
+    def forget(self, request: Request) -> None:
+        """Remove a request as if add() had never queued it."""
+        self._remove(request)
+        self.queued -= 1
+
+    def discard_hotel(self, hotel_id: str) -> list[Request]:
+        """Drop every request waiting for a hotel and return them."""
+        dropped = [request for _, _, request in self.heaps.get(hotel_id, [])
+                   if self.waiting.get(request.reservation_id) is request]
+        for request in dropped:
+            self.done(request, booked=False)
+        return dropped
+
+    def depth(self, hotel_id: Optional[str] = None) -> int:
+        """Return the requests waiting for a hotel, or for all hotels."""
+        if hotel_id is None:
+            return len(self.waiting)
+        return self.depths.get(hotel_id, 0)
+
+    def stats(self) -> dict:
+        """Return the queue depths, counters and wait times in seconds."""
+        oldest = next(iter(self.waiting.values()), None)
+        waits = self.waits.summary()
+        return {
+            "depth": len(self.waiting),
+            "hotels": dict(self.depths),
+            "queued": self.queued,
+            "booked": self.booked,
+            "dropped": self.dropped,
+            "withdrawn": self.withdrawn,
+            "oldest_wait": (0.0 if oldest is None
+                            else time.monotonic() - oldest.queued),
+            "wait_mean": waits["mean"],
+            "wait_p50": waits["p50"],
+            "wait_p99": waits["p99"],
+            "wait_max": waits["max"],
+        }
@@ -0,0 +1,115 @@
+"""Unit tests for availability.py."""
+
+import unittest
+from src.availability import (
+    AvailabilityIndex, BEGINNING, FOREVER, FreeCountIndex, parse_day, stay
+)
+from src.rooms import RoomSet
+
+
+def _record(rooms: list[int], check_in: str, check_out: str) -> dict:
+    """Return a reservation record in hotel H1."""
+    return {"customer_id": "C1", "hotel_id": "H1", "rooms": rooms,
+            "check_in": check_in, "check_out": check_out}
+
+
+class TestStay(unittest.TestCase):
+    """Tests for date parsing."""
+
+    def test_parse_day(self) -> None:
+        """Consecutive dates map to consecutive ordinals."""
+        self.assertEqual(parse_day("2026-03-02") - parse_day("2026-03-01"),
+                         1)
+
+    def test_parse_invalid_raises(self) -> None:
+        """A malformed date raises ValueError."""
+        with self.assertRaises(ValueError):
+            parse_day("2026-13-01")
+
+    def test_open_ended(self) -> None:
+        """Empty dates make the stay open-ended."""
+        self.assertEqual(stay("", ""), (BEGINNING, FOREVER))
+
+
+class TestAvailabilityIndex(unittest.TestCase):
+    """Tests for the per-room interval index."""
+
+    def setUp(self) -> None:
+        """Index one reservation of rooms 1 and 2 for four nights."""
+        self.index = AvailabilityIndex.build(
+            {"R1": _record([1, 2], "2026-03-01", "2026-03-05")}
+        )
+        self.start, self.end = stay("2026-03-04", "2026-03-06")
+
+    def test_conflict(self) -> None:
+        """An overlapping stay reports the holding reservation."""
+        self.assertEqual(
+            self.index.conflict("H1", 1, self.start, self.end), "R1"
+        )
+        self.assertIsNone(self.index.conflict("H1", 3, self.start,
+                                              self.end))
+
+    def test_adjacent_stays_do_not_conflict(self) -> None:
+        """Check-out day is free for the next check-in."""
+        start, end = stay("2026-03-05", "2026-03-07")
+        self.assertIsNone(self.index.conflict("H1", 1, start, end))
+
+    def test_remove(self) -> None:
+        """Removed reservations no longer hold their rooms."""
+        self.index.remove("R1", _record([1, 2], "2026-03-01",
+                                        "2026-03-05"))
+        self.assertIsNone(self.index.conflict("H1", 1, self.start,
+                                              self.end))
+
+    def test_free_rooms(self) -> None:
+        """free_rooms() filters out booked rooms."""
+        self.assertEqual(
+            self.index.free_rooms("H1", range(1, 5), self.start, self.end),
+            [3, 4]
+        )
+
+    def test_empty_stay_not_indexed(self) -> None:
+        """A stay with check-out on check-in day holds nothing."""
+        self.index.add("R2", _record([3], "2026-03-04", "2026-03-04"))
+        self.assertIsNone(self.index.conflict("H1", 3, self.start,
+                                              self.end))
+
+    def test_booked(self) -> None:
+        """booked() lists the rooms held during the stay."""
+        self.assertEqual(self.index.booked("H1", self.start, self.end),
+                         {1, 2})
+        start, end = stay("2026-03-05", "2026-03-07")
+        self.assertEqual(self.index.booked("H1", start, end), set())
+        self.index.remove("R1", _record([1, 2], "2026-03-01",
+                                        "2026-03-05"))
+        self.assertEqual(self.index.rooms["H1"], set())
+
+
+class TestFreeCountIndex(unittest.TestCase):
+    """Tests for the hotel free room count index."""
+
+    def setUp(self) -> None:
+        """Index three hotels with 5, 2 and 0 free rooms."""
+        self.index = FreeCountIndex.build({
+            hotel_id: {"reserved_rooms": RoomSet.from_rooms(held, total)}
+            for hotel_id, held, total in (
+                ("H1", [1], 6), ("H2", [], 2), ("H3", [1, 2], 2)
+            )
+        })
+
+    def test_at_least(self) -> None:
+        """Hotels with enough free rooms come most free first."""
+        self.assertEqual(self.index.at_least(2), ["H1", "H2"])
+        self.assertEqual(self.index.at_least(0), ["H1", "H2", "H3"])
+        self.assertEqual(self.index.at_least(6), [])
+
+    def test_update(self) -> None:
+        """Updated and removed hotels move in the order."""
+        self.index.update("H3", 9)
+        self.index.update("H1", None)
+        self.assertEqual(self.index.at_least(1), ["H3", "H2"])
+        self.assertEqual(self.index.free, {"H2": 2, "H3": 9})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,169 @@
+"""Unit tests for cache.py."""
+
+import json
+import multiprocessing
+import shutil
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from src import instrumentation
+from src.cache import ReadCache
+from src.hotel_management import (
+    Customer, Hotel, HotelStore, read_cache, use_backend
+)
+from src.storage import JsonBackend, ShardedBackend
+
+TEST_FILE = "hotel_cache_test.json"
+SHARDS_DIR = "hotel_cache_test_shards"
+
+
+def _display(customer_id: str) -> str:
+    """Return what display_customer_info prints."""
+    out = StringIO()
+    with redirect_stdout(out):
+        Customer.display_customer_info(customer_id)
+    return out.getvalue()
+
+
+def _rename(customer_id: str, name: str) -> None:
+    """Rename a customer (worker process)."""
+    Customer.modify(customer_id, name=name)
+
+
+class TestReadCache(unittest.TestCase):
+    """Tests for the ReadCache container."""
+
+    def test_take_needs_matching_stamp(self) -> None:
+        """Data comes back only for the stamp it was cached at, once."""
+        cache = ReadCache()
+        cache.put({"f": 1}, "data")
+        self.assertIsNone(cache.take({"f": 2}))
+        cache.put({"f": 1}, "data")
+        self.assertEqual(cache.take({"f": 1}), "data")
+        self.assertIsNone(cache.take({"f": 1}))
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 2)
+
+    def test_records_are_bounded(self) -> None:
+        """The record LRU evicts the least recently used record."""
+        cache = ReadCache(size=2)
+        for key in ("a", "b"):
+            cache.remember(key, {"f": 1}, {"name": key})
+        cache.lookup("a", {"f": 1})
+        cache.remember("c", {"f": 1}, {"name": "c"})
+        self.assertEqual(list(cache.records), ["a", "c"])
+        self.assertEqual(cache.lookup("b", {"f": 1}), (False, None))
+        self.assertEqual(cache.lookup("a", {"f": 2}), (False, None))
+
+    def test_empty_stamp_is_never_cached(self) -> None:
+        """Backends that cannot stamp their data are not cached."""
+        cache = ReadCache()
+        cache.put({}, "data")
+        cache.remember("a", {}, {"name": "a"})
+        self.assertIsNone(cache.take({}))
+        self.assertEqual(cache.stats()["records"], 0)
+
+
+class TestOperationCache(unittest.TestCase):
+    """Tests for operations run outside a store through the cache."""
+
+    def setUp(self) -> None:
+        """Use a fresh data file and create a customer."""
+        self.backend = JsonBackend(TEST_FILE)
+        self.backend.clear()
+        use_backend(self.backend)
+        Customer("C1", "Alice", "a@example.com").create()
+        instrumentation.reset()
+        instrumentation.enable()
+
+    def tearDown(self) -> None:
+        """Remove the data files and go back to the default backend."""
+        instrumentation.enable(False)
+        instrumentation.reset()
+        use_backend(None)
+        self.backend.clear()
+
+    def test_repeated_display_skips_loads(self) -> None:
+        """Displays after the first are served from memory."""
+        for _ in range(3):
+            self.assertIn("Alice", _display("C1"))
+        stats = instrumentation.stats()
+        self.assertNotIn("storage.load", stats["timings"])
+        self.assertEqual(stats["counters"]["record_cache_hits"], 2)
+        self.assertEqual(read_cache().stats()["records"], 1)
+
+    def test_mutations_reuse_the_data(self) -> None:
+        """Existence checks of later operations skip the reload."""
+        Customer.modify("C1", name="Bob")
+        Customer.modify("C1", email="b@example.com")
+        with self.assertRaises(ValueError):
+            Customer.delete("C404")
+        stats = instrumentation.stats()
+        self.assertNotIn("storage.load", stats["timings"])
+        self.assertEqual(stats["counters"]["cache_hits"], 3)
+        self.assertEqual(JsonBackend(TEST_FILE).load()["customers"]["C1"],
+                         {"name": "Bob", "email": "b@example.com"})
+
+    def test_store_writes_invalidate(self) -> None:
+        """Changes written by a store are seen by the next display."""
+        _display("C1")
+        with HotelStore(JsonBackend(TEST_FILE)):
+            Customer.modify("C1", name="Carol")
+        self.assertIn("Carol", _display("C1"))
+
+    def test_file_rewrites_invalidate(self) -> None:
+        """A data file replaced by hand is reloaded."""
+        _display("C1")
+        with open(TEST_FILE, "w", encoding="utf-8") as f:
+            json.dump({"hotels": {}, "reservations": {}, "customers": {
+                "C1": {"name": "Edited by hand", "email": ""}
+            }}, f)
+        self.assertIn("Edited by hand", _display("C1"))
+
+    def test_other_process_writes_invalidate(self) -> None:
+        """Changes written by another process are seen."""
+        self.assertIn("Alice", _display("C1"))
+        worker = multiprocessing.Process(target=_rename, args=("C1", "Dan"))
+        worker.start()
+        worker.join()
+        self.assertIn("Dan", _display("C1"))
+
+    def test_missing_records_are_cached(self) -> None:
+        """Repeated lookups of a missing record do not reload."""
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                Customer.display_customer_info("C404")
+        Customer("C404", "Late", "").create()
+        self.assertIn("Late", _display("C404"))
+        self.assertEqual(
+            instrumentation.stats()["counters"]["record_cache_hits"], 1
+        )
+
+
+class TestShardedCache(unittest.TestCase):
+    """Tests for the per-shard validity of cached records."""
+
+    def setUp(self) -> None:
+        """Use fresh shards with a customer and a hotel."""
+        use_backend(ShardedBackend(SHARDS_DIR, buckets=4))
+        Customer("C1", "Alice", "a@example.com").create()
+        Hotel("H1", "Grand", 10).create()
+
+    def tearDown(self) -> None:
+        """Remove the shards and go back to the default backend."""
+        use_backend(None)
+        shutil.rmtree(SHARDS_DIR, ignore_errors=True)
+
+    def test_hotel_writes_keep_customers_cached(self) -> None:
+        """Writing a hotel bucket leaves customer records valid."""
+        _display("C1")
+        Hotel.reserve_room("H1", 3)
+        hits = read_cache().record_hits
+        _display("C1")
+        self.assertEqual(read_cache().record_hits, hits + 1)
+        Customer.modify("C1", name="Eve")
+        self.assertIn("Eve", _display("C1"))
+
+
+if __name__ == "__main__":
+    unittest.main()
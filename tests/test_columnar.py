@@ -0,0 +1,131 @@
+"""Unit tests for columnar.py."""
+
+import copy
+import os
+import unittest
+from src.columnar import SCHEMAS, Row, Table, to_columnar
+from src.formats import dumps
+from src.hotel_management import Customer, Hotel, HotelStore, Reservation
+from src.rooms import RoomSet
+from src.storage import JsonBackend
+
+TEST_FILE = "hotel_columnar_test.json"
+
+
+def _sample() -> dict:
+    """Return a small data set in the dict layout."""
+    return {
+        "hotels": {
+            "H1": {"name": "Grand", "total_rooms": 4,
+                   "reserved_rooms": RoomSet.from_rooms([2], 4)},
+        },
+        "customers": {
+            "C1": {"name": "Alice", "email": "a@example.com"},
+            "C2": {"name": "Bob", "email": "b@example.com"},
+        },
+        "reservations": {
+            "R1": {"customer_id": "C1", "hotel_id": "H1", "rooms": [1, 3],
+                   "check_in": "2026-03-01", "check_out": "2026-03-03"},
+        },
+    }
+
+
+class TestTable(unittest.TestCase):
+    """Tests for the columnar tables and their row views."""
+
+    def setUp(self) -> None:
+        """Convert the sample data."""
+        self.data = to_columnar(_sample())
+
+    def test_same_records(self) -> None:
+        """Tables hold the same records and serialise the same way."""
+        self.assertIsInstance(self.data["customers"], Table)
+        self.assertEqual(self.data["customers"]["C2"],
+                         {"name": "Bob", "email": "b@example.com"})
+        self.assertEqual(list(self.data["reservations"]["R1"]["rooms"]),
+                         [1, 3])
+        self.assertEqual(dumps(self.data), dumps(_sample()))
+        self.assertEqual(dumps(self.data, "binary"),
+                         dumps(_sample(), "binary"))
+
+    def test_row_views(self) -> None:
+        """Rows are mutable views; copies are plain dicts."""
+        customer = self.data["customers"]["C1"]
+        self.assertIsInstance(customer, Row)
+        customer.update(name="Alicia")
+        self.assertEqual(self.data["customers"]["C1"]["name"], "Alicia")
+        copied = copy.deepcopy(self.data["hotels"]["H1"])
+        self.assertIsInstance(copied, dict)
+        copied["reserved_rooms"].add(1)
+        self.assertNotIn(1, self.data["hotels"]["H1"]["reserved_rooms"])
+        with self.assertRaises(ValueError):
+            customer["phone"] = "555"
+        with self.assertRaises(ValueError):
+            self.data["customers"]["C3"] = {"name": "Carol"}
+
+    def test_delete_reuses_rows(self) -> None:
+        """A deleted row is reused and iteration keeps insertion order."""
+        customers = self.data["customers"]
+        del customers["C1"]
+        customers["C3"] = {"name": "Carol", "email": "c@example.com"}
+        self.assertEqual(list(customers), ["C2", "C3"])
+        self.assertEqual(len(customers.keys_of), 2)
+        self.assertIsNone(customers.get("C1"))
+        with self.assertRaises(KeyError):
+            del customers["C1"]
+
+    def test_room_pool(self) -> None:
+        """Replaced rooms are dropped from the pool once it is mostly dead."""
+        table = Table(SCHEMAS["reservations"])
+        record = dict(_sample()["reservations"]["R1"])
+        for i in range(2000):
+            table["R1"] = dict(record, rooms=[i % 4 + 1, 5])
+        self.assertLess(len(table.pool), 2100)
+        self.assertEqual(list(table["R1"]["rooms"]), [4, 5])
+
+    def test_values_that_do_not_fit(self) -> None:
+        """Columns fall back to lists for values their array cannot hold."""
+        table = Table(SCHEMAS["hotels"])
+        table["H1"] = {"name": "A", "total_rooms": 3, "reserved_rooms": []}
+        table["H2"] = {"name": "B", "total_rooms": "ten",
+                       "reserved_rooms": []}
+        self.assertEqual([table[key]["total_rooms"] for key in table],
+                         [3, "ten"])
+        reservations = Table(SCHEMAS["reservations"])
+        reservations["R1"] = _sample()["reservations"]["R1"]
+        reservations["R2"] = dict(reservations["R1"], rooms=[1.5])
+        self.assertIsNone(reservations.pool)
+        self.assertEqual(reservations["R1"]["rooms"], [1, 3])
+        self.assertEqual(reservations["R2"]["rooms"], [1.5])
+
+
+class TestColumnarStore(unittest.TestCase):
+    """Tests for HotelStore with columnar data."""
+
+    def tearDown(self) -> None:
+        """Remove the data files."""
+        JsonBackend(TEST_FILE).clear()
+
+    def test_operations(self) -> None:
+        """Operations on a columnar store write the same data."""
+        backend = JsonBackend(TEST_FILE)
+        with HotelStore(backend, columnar=True) as store:
+            self.assertIsInstance(store.data["hotels"], Table)
+            Hotel("H1", "Grand", 3).create()
+            Customer("C1", "Alice", "a@example.com").create()
+            Reservation("R1", "C1", "H1", [], "2026-03-01",
+                        "2026-03-03").create(auto_assign=2)
+            Hotel.reserve_room("H1", 3)
+            Customer.modify("C1", name="Alicia")
+            self.assertEqual(Customer.info("C1")["name"], "Alicia")
+            with self.assertRaises(ValueError):
+                Customer("C2", "Bob", "a@example.com").create()
+            self.assertEqual(store.verify(), [])
+        data = backend.load()
+        self.assertEqual(data["reservations"]["R1"]["rooms"], [1, 2])
+        self.assertEqual(list(data["hotels"]["H1"]["reserved_rooms"]), [3])
+        self.assertTrue(os.path.exists(TEST_FILE))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+"""Unit tests for feed.py."""
+
+import json
+import os
+import unittest
+from src.feed import ChangeFeed, delta
+from src.hotel_management import (
+    Customer, Hotel, HotelStore, Reservation, export, use_backend, use_feed
+)
+from src.storage import JsonBackend
+
+TEST_FILE = "hotel_feed_test.json"
+FEED_FILE = "hotel_feed_test.ndjson"
+EXPORT_FILE = "hotel_feed_export.json"
+
+
+def _change(key: str, after: object = None) -> dict:
+    """Return the record of a change to customer key."""
+    return {"op": "put", "entity": "customers", "id": key,
+            "before": None, "after": after}
+
+
+class TestChangeFeed(unittest.TestCase):
+    """Tests for the feed file, its sequence numbers and exports."""
+
+    def setUp(self) -> None:
+        """Start from no feed file."""
+        self.feed = ChangeFeed(FEED_FILE)
+        self.feed.clear()
+
+    def tearDown(self) -> None:
+        """Remove the feed and export files."""
+        self.feed.clear()
+        if os.path.exists(EXPORT_FILE):
+            os.remove(EXPORT_FILE)
+
+    def test_append_and_since(self) -> None:
+        """Records are numbered in order and read back after a number."""
+        self.assertEqual(self.feed.last, 0)
+        self.assertEqual(list(self.feed.since(0)), [])
+        self.assertEqual(self.feed.append([_change("C1"), _change("C2")]),
+                         2)
+        self.assertEqual(ChangeFeed(FEED_FILE).append([_change("C3")]), 3)
+        self.assertEqual(self.feed.last, 3)
+        self.assertEqual([r["id"] for r in self.feed.since(1)],
+                         ["C2", "C3"])
+        self.assertEqual(list(self.feed.since(3)), [])
+
+    def test_since_searches_large_feeds(self) -> None:
+        """Reads start near their record, and partial lines are skipped."""
+        padding = "x" * 200
+        for start in range(0, 5000, 500):
+            self.feed.append([_change(f"C{i}", {"name": padding})
+                              for i in range(start, start + 500)])
+        self.assertGreater(os.path.getsize(FEED_FILE), 1 << 20)
+        records = self.feed.since(4321)
+        self.assertEqual(next(records)["seq"], 4322)
+        self.assertEqual(sum(1 for _ in records), 678)
+        with open(FEED_FILE, "a", encoding="utf-8") as f:
+            f.write('{"seq":5001,"op":')
+        self.assertEqual(self.feed.last, 5000)
+        self.assertEqual(list(self.feed.since(5000)), [])
+
+    def test_export(self) -> None:
+        """Exports hold a snapshot or the last value of changed records."""
+        self.feed.append([_change("C1", {"name": "A"}),
+                          _change("C2", {"name": "B"}),
+                          _change("C1", {"name": "C"}),
+                          _change("C2")])
+        data = {"customers": {"C1": {"name": "C"}}}
+        self.assertEqual(self.feed.export(EXPORT_FILE, data), 4)
+        with open(EXPORT_FILE, "r", encoding="utf-8") as f:
+            self.assertEqual(json.load(f),
+                             {"since": None, "seq": 4, "data": data})
+        self.feed.export(EXPORT_FILE, data, since=1)
+        with open(EXPORT_FILE, "r", encoding="utf-8") as f:
+            self.assertEqual(json.load(f)["changes"], {
+                "customers": {"C2": None, "C1": {"name": "C"}}
+            })
+        with self.assertRaises(ValueError):
+            self.feed.export(EXPORT_FILE, data, since=5)
+        self.assertEqual(delta([]), {})
+
+
+class TestStoreFeed(unittest.TestCase):
+    """Tests for the change records of HotelStore."""
+
+    def setUp(self) -> None:
+        """Store data in a test file and record changes in a feed."""
+        self.backend = JsonBackend(TEST_FILE)
+        self.backend.clear()
+        self.feed = ChangeFeed(FEED_FILE)
+        self.feed.clear()
+        use_backend(self.backend)
+        use_feed(self.feed)
+
+    def tearDown(self) -> None:
+        """Remove the files and stop recording changes."""
+        use_feed(None)
+        use_backend(None)
+        self.backend.clear()
+        self.feed.clear()
+        if os.path.exists(EXPORT_FILE):
+            os.remove(EXPORT_FILE)
+
+    def test_records_with_before_and_after(self) -> None:
+        """Every change is recorded once written, with both values."""
+        with HotelStore() as store:
+            Hotel("H1", "Grand", 2).create()
+            Customer("C1", "Alice", "a@example.com").create()
+            Reservation("R1", "C1", "H1", [1], "2026-03-01",
+                        "2026-03-03").create()
+            Hotel.reserve_room("H1", 2)
+            self.assertEqual(self.feed.last, 0)
+            store.flush()
+            Customer.delete("C1", cascade=True)
+        records = list(self.feed.since(0))
+        self.assertEqual([(r["seq"], r["op"], r["entity"], r["id"])
+                          for r in records], [
+            (1, "put", "hotels", "H1"),
+            (2, "put", "customers", "C1"),
+            (3, "put", "reservations", "R1"),
+            (4, "reserve", "hotels", "H1"),
+            (5, "del", "reservations", "R1"),
+            (6, "del", "customers", "C1"),
+        ])
+        self.assertEqual(records[3]["before"]["reserved_rooms"], [])
+        self.assertEqual(records[3]["after"]["reserved_rooms"], [2])
+        self.assertEqual(records[4]["before"]["rooms"], [1])
+        self.assertIsNone(records[5]["after"])
+
+    def test_conflicts_are_recorded_once(self) -> None:
+        """A flush replayed on newer data records the replayed changes."""
+        first = HotelStore()
+        second = HotelStore()
+        with first:
+            Customer("C1", "Alice", "a@example.com").create()
+        with second:
+            Customer("C2", "Bob", "b@example.com").create()
+        self.assertEqual([r["id"] for r in self.feed.since(0)],
+                         ["C1", "C2"])
+        self.assertEqual(len(self.backend.load()["customers"]), 2)
+
+    def test_export(self) -> None:
+        """export() writes what the store holds once it is flushed."""
+        with HotelStore():
+            Customer("C1", "Alice", "a@example.com").create()
+            self.assertEqual(export(EXPORT_FILE), 1)
+            Customer.modify("C1", name="Alicia")
+            self.assertEqual(export(EXPORT_FILE, since=1), 2)
+        with open(EXPORT_FILE, "r", encoding="utf-8") as f:
+            self.assertEqual(json.load(f)["changes"], {
+                "customers": {"C1": {"name": "Alicia",
+                                     "email": "a@example.com"}}
+            })
+        use_feed(None)
+        with self.assertRaises(ValueError):
+            export(EXPORT_FILE)
+
+
+if __name__ == "__main__":
+    unittest.main()
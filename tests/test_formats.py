@@ -0,0 +1,113 @@
+"""Unit tests for formats.py."""
+
+import json
+import os
+import unittest
+from src import formats
+from src.hotel_management import Customer, Hotel, HotelStore, Reservation
+from src.rooms import RoomSet
+from src.storage import JsonBackend, with_room_sets
+
+BIN_FILE = "hotel_formats_test.bin"
+JSON_FILE = "hotel_formats_test.json"
+
+
+def _sample() -> dict:
+    """Return data covering every kind of column."""
+    return {
+        "hotels": {
+            "H1": {"name": "Hôtel Ünïcode", "total_rooms": 10,
+                   "reserved_rooms": RoomSet.from_rooms([1, 10], 10)},
+            "H2": {"name": 12345, "total_rooms": -5,
+                   "reserved_rooms": RoomSet(0)},
+        },
+        "customers": {
+            f"C{i}": {"name": "Same", "email": ""} for i in range(5)
+        },
+        "reservations": {
+            "R1": {"customer_id": "C1", "hotel_id": "H1", "rooms": [2, 3],
+                   "check_in": "2026-03-01", "check_out": "2026-03-05"},
+            "": {"customer_id": "C2", "hotel_id": "H1", "rooms": [],
+                 "check_in": "", "check_out": ""},
+        },
+    }
+
+
+class TestFormats(unittest.TestCase):
+    """Tests for the snapshot formats."""
+
+    def tearDown(self) -> None:
+        """Remove the data files."""
+        for path in (BIN_FILE, JSON_FILE):
+            JsonBackend(path).clear()
+
+    def test_round_trip(self) -> None:
+        """Every format gives back the same data."""
+        data = _sample()
+        for fmt in formats.FORMATS:
+            with self.subTest(fmt=fmt):
+                loaded = formats.loads(formats.dumps(data, fmt), fmt)
+                self.assertEqual(with_room_sets(loaded), data)
+
+    def test_binary_keeps_order_and_room_sets(self) -> None:
+        """Binary data keeps key order and loads RoomSets directly."""
+        loaded = formats.loads(formats.dumps(_sample(), "binary"), "binary")
+        self.assertEqual(list(loaded["reservations"]), ["R1", ""])
+        self.assertEqual(list(loaded["reservations"]["R1"]),
+                         ["customer_id", "hotel_id", "rooms", "check_in",
+                          "check_out"])
+        self.assertIsInstance(loaded["hotels"]["H1"]["reserved_rooms"],
+                              RoomSet)
+
+    def test_binary_keeps_booleans(self) -> None:
+        """Boolean columns are not packed as integers."""
+        data = _sample()
+        for i, record in enumerate(data["customers"].values()):
+            record["email"] = i % 2 == 0
+        loaded = formats.loads(formats.dumps(data, "binary"), "binary")
+        self.assertEqual([record["email"] is True
+                          for record in loaded["customers"].values()],
+                         [True, False, True, False, True])
+
+    def test_sizes(self) -> None:
+        """Compact and binary snapshots are smaller than indented JSON."""
+        data = _sample()
+        sizes = [len(formats.dumps(data, fmt)) for fmt in formats.FORMATS]
+        self.assertEqual(sizes, sorted(sizes, reverse=True))
+
+    def test_bad_input(self) -> None:
+        """Unknown formats and foreign files are rejected."""
+        with self.assertRaises(ValueError):
+            formats.dumps(_sample(), "xml")
+        with self.assertRaises(ValueError):
+            formats.loads(b"{}", "binary")
+
+    def test_convert(self) -> None:
+        """convert() infers formats from the extensions."""
+        with open(JSON_FILE, "w", encoding="utf-8") as f:
+            json.dump(_sample(), f, default=list)
+        formats.convert(JSON_FILE, BIN_FILE)
+        with open(BIN_FILE, "rb") as f:
+            self.assertTrue(f.read().startswith(formats.MAGIC))
+        os.remove(JSON_FILE)
+        formats.convert(BIN_FILE, JSON_FILE)
+        self.assertEqual(JsonBackend(JSON_FILE).load(), _sample())
+
+    def test_binary_backend(self) -> None:
+        """A binary JsonBackend stores and reloads hotel operations."""
+        backend = JsonBackend(BIN_FILE, fmt="binary")
+        with HotelStore(backend):
+            Customer("C1", "Alice", "a@example.com").create()
+            Hotel("H1", "Grand", 5).create()
+            Hotel.reserve_room("H1", 5)
+            Reservation("R1", "C1", "H1", [1, 2], "2026-03-01",
+                        "2026-03-05").create()
+        data = JsonBackend(BIN_FILE, fmt="binary").load()
+        self.assertEqual(data["hotels"]["H1"]["reserved_rooms"], [5])
+        self.assertEqual(data["reservations"]["R1"]["rooms"], [1, 2])
+        with self.assertRaises(ValueError):
+            JsonBackend(BIN_FILE).load()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,15 +3,61 @@
 import unittest
 import os
 import json
+import multiprocessing
+import shutil
+from contextlib import contextmanager
+from typing import Iterator
 from src.hotel_management import (
-    Customer, Hotel, Reservation, JSON_FILE, _load
+    Customer, Hotel, Reservation, HotelStore, JSON_FILE, _load,
+    get_backend, read_cache, transaction, use_backend
 )
+from src.storage import (
+    ConflictError, JsonBackend, ShardedBackend, SqliteBackend
+)
+
+SQLITE_FILE = "hotel_test.db"
+SHARDS_DIR = "hotel_test_shards"
 
 
 def _reset() -> None:
-    """Remove the data file to start each test with a clean state."""
-    if os.path.exists(JSON_FILE):
-        os.remove(JSON_FILE)
+    """Clear stored data to start each test with a clean state."""
+    JsonBackend(JSON_FILE, wal=True).clear()
+    get_backend().clear()
+    read_cache().clear()
+
+
+class SqliteMixin:
+    """Run the tests of a TestCase against the SQLite backend."""
+
+    def setUp(self) -> None:
+        """Switch to the SQLite backend before the base setUp."""
+        use_backend(SqliteBackend(SQLITE_FILE))
+        super().setUp()
+
+    def tearDown(self) -> None:
+        """Close the database and go back to the JSON file."""
+        backend = get_backend()
+        use_backend(None)
+        backend.close()
+        for suffix in ("", "-wal", "-shm", ".lock"):
+            if os.path.exists(SQLITE_FILE + suffix):
+                os.remove(SQLITE_FILE + suffix)
+        super().tearDown()
+
+
+class ShardedMixin:
+    """Run the tests of a TestCase against the sharded backend."""
+
+    def setUp(self) -> None:
+        """Switch to the sharded backend before the base setUp."""
+        use_backend(ShardedBackend(SHARDS_DIR, buckets=4))
+        super().setUp()
+
+    def tearDown(self) -> None:
+        """Remove the shard files and go back to the JSON file."""
+        use_backend(None)
+        shutil.rmtree(SHARDS_DIR, ignore_errors=True)
+        super().tearDown()
 
 
 class TestLoad(unittest.TestCase):
@@ -93,6 +139,28 @@ class TestCustomer(unittest.TestCase):
         with self.assertRaises(ValueError):
             Customer.modify("UNKNOWN", name="Bob")
 
+    def test_email_is_unique(self) -> None:
+        """Two customers cannot share a non-empty email."""
+        with self.assertRaisesRegex(ValueError, "used by customer C1"):
+            Customer("C2", "Bob", "alice@example.com").create()
+        Customer("C2", "Bob", "").create()
+        Customer("C3", "Carol", "").create()
+        with self.assertRaises(ValueError):
+            Customer.modify("C2", email="alice@example.com")
+        Customer.modify("C1", email="alice@example.com")
+        self.assertNotIn("C4", _load()["customers"])
+
+    def test_find_by_email(self) -> None:
+        """Customers are found by their current email."""
+        self.assertEqual(Customer.find_by_email("alice@example.com"), "C1")
+        Customer.modify("C1", email="new@example.com")
+        self.assertIsNone(Customer.find_by_email("alice@example.com"))
+        Customer("C2", "Bob", "alice@example.com").create()
+        self.assertEqual(Customer.find_by_email("alice@example.com"), "C2")
+        Customer.delete("C1")
+        self.assertIsNone(Customer.find_by_email("new@example.com"))
+        self.assertIsNone(Customer.find_by_email(""))
+
 
 class TestHotel(unittest.TestCase):
     """Tests for the Hotel class."""
@@ -166,6 +234,35 @@ class TestHotel(unittest.TestCase):
         with self.assertRaises(ValueError):
             Hotel.reserve_room("H1", 99)
 
+    def test_reserve_room_zero_raises(self) -> None:
+        """Reserving room 0 raises ValueError."""
+        with self.assertRaises(ValueError):
+            Hotel.reserve_room("H1", 0)
+
+    def test_modify_below_reserved_room_raises(self) -> None:
+        """Shrinking total_rooms below a reserved room raises ValueError."""
+        Hotel.reserve_room("H1", 8)
+        with self.assertRaises(ValueError):
+            Hotel.modify("H1", total_rooms=5)
+
+    def test_modify_below_reservation_raises(self) -> None:
+        """Shrinking total_rooms below a booked room raises ValueError."""
+        Customer("C1", "Alice", "alice@example.com").create()
+        Reservation("R1", "C1", "H1", [8], "2026-03-01",
+                    "2026-03-03").create()
+        with self.assertRaises(ValueError):
+            Hotel.modify("H1", total_rooms=5)
+        Hotel.modify("H1", total_rooms=8)
+        self.assertEqual(_load()["hotels"]["H1"]["total_rooms"], 8)
+
+    def test_modify_total_rooms_resizes_occupancy(self) -> None:
+        """Growing total_rooms makes the new rooms reservable."""
+        Hotel.modify("H1", total_rooms=20)
+        Hotel.reserve_room("H1", 15)
+        data = _load()
+        self.assertEqual(data["hotels"]["H1"]["reserved_rooms"].size, 20)
+        self.assertIn(15, data["hotels"]["H1"]["reserved_rooms"])
+
     def test_reserve_room_already_reserved_raises(self) -> None:
         """Reserving an already reserved room raises ValueError."""
         Hotel.reserve_room("H1", 1)
@@ -200,13 +297,167 @@ class TestReservation(unittest.TestCase):
         Hotel("H1", "Grand Palace", 10).create()
 
     def test_create(self) -> None:
-        """Reservation is persisted and rooms are marked reserved."""
+        """Reservation is persisted and rooms are held for its stay."""
         Reservation("R1", "C1", "H1", [1, 2], "2026-03-01",
                     "2026-03-05").create()
         data = _load()
         self.assertIn("R1", data["reservations"])
-        self.assertIn(1, data["hotels"]["H1"]["reserved_rooms"])
-        self.assertIn(2, data["hotels"]["H1"]["reserved_rooms"])
+        for room in (1, 2):
+            self.assertFalse(Hotel.is_room_available(
+                "H1", room, "2026-03-01", "2026-03-05"
+            ))
+
+    def test_create_other_dates(self) -> None:
+        """Rooms stay bookable outside an existing reservation's stay."""
+        Reservation("R1", "C1", "H1", [1], "2026-03-01",
+                    "2026-03-05").create()
+        Reservation("R2", "C1", "H1", [1], "2026-03-05",
+                    "2026-03-08").create()
+        Reservation("R3", "C1", "H1", [1], "2026-02-20",
+                    "2026-03-01").create()
+        self.assertIn("R3", _load()["reservations"])
+
+    def test_create_overlap_raises(self) -> None:
+        """Booking a room for an overlapping stay raises ValueError."""
+        Reservation("R1", "C1", "H1", [1], "2026-03-01",
+                    "2026-03-05").create()
+        with self.assertRaises(ValueError):
+            Reservation(
+                "R2", "C1", "H1", [2, 1], "2026-03-04", "2026-03-06"
+            ).create()
+        self.assertNotIn("R2", _load()["reservations"])
+
+    def test_create_held_room_raises(self) -> None:
+        """Rooms held with reserve_room() cannot be booked on any date."""
+        Hotel.reserve_room("H1", 3)
+        with self.assertRaises(ValueError):
+            Reservation(
+                "R1", "C1", "H1", [3], "2026-03-01", "2026-03-05"
+            ).create()
+
+    def test_create_invalid_date_raises(self) -> None:
+        """A malformed date raises ValueError."""
+        with self.assertRaises(ValueError):
+            Reservation("R1", "C1", "H1", [1], "03/01/2026",
+                        "2026-03-05").create()
+
+    def test_free_rooms(self) -> None:
+        """free_rooms() lists the rooms without a booking for the stay."""
+        Hotel.reserve_room("H1", 10)
+        Reservation("R1", "C1", "H1", [1, 2], "2026-03-01",
+                    "2026-03-05").create()
+        self.assertEqual(
+            Hotel.free_rooms("H1", "2026-03-03", "2026-03-04"),
+            [3, 4, 5, 6, 7, 8, 9]
+        )
+        self.assertEqual(
+            len(Hotel.free_rooms("H1", "2026-03-05", "2026-03-06")), 9
+        )
+
+    def test_find_available_rooms(self) -> None:
+        """Held rooms and rooms booked for the stay are skipped."""
+        Hotel.reserve_room("H1", 1)
+        Reservation("R1", "C1", "H1", [2, 4], "2026-03-01",
+                    "2026-03-05").create()
+        self.assertEqual(
+            Hotel.find_available_rooms("H1", 3, "2026-03-04", "2026-03-06"),
+            [3, 5, 6]
+        )
+        self.assertEqual(
+            Hotel.find_available_rooms("H1", 3, "2026-03-05", "2026-03-06"),
+            [2, 3, 4]
+        )
+        self.assertEqual(Hotel.find_available_rooms("H1", 2), [3, 5])
+        with self.assertRaises(ValueError):
+            Hotel.find_available_rooms("H1", 8)
+        with self.assertRaises(ValueError):
+            Hotel.find_available_rooms("UNKNOWN", 1)
+
+    def test_find_hotels(self) -> None:
+        """Hotels are listed with their free rooms for the stay."""
+        Hotel("H2", "Small Inn", 3).create()
+        Hotel("H3", "Full House", 2).create()
+        Hotel.reserve_room("H3", 1)
+        Hotel.reserve_room("H1", 10)
+        Reservation("R1", "C1", "H1", [1, 2, 3, 4, 5, 6, 7], "2026-03-01",
+                    "2026-03-05").create()
+        self.assertEqual(Hotel.find_hotels(1, "2026-03-02", "2026-03-03"),
+                         {"H2": 3, "H1": 2, "H3": 1})
+        self.assertEqual(Hotel.find_hotels(3, "2026-03-05", "2026-03-06"),
+                         {"H1": 9, "H2": 3})
+        self.assertEqual(Hotel.find_hotels(3), {"H2": 3})
+        Hotel.delete("H2")
+        self.assertEqual(Hotel.find_hotels(3), {})
+
+    def test_find_hotels_follows_store_changes(self) -> None:
+        """The free count index is kept up to date inside a store."""
+        with HotelStore() as store:
+            self.assertEqual(Hotel.find_hotels(10), {"H1": 10})
+            Hotel.reserve_room("H1", 1)
+            Hotel("H2", "Small Inn", 12).create()
+            self.assertEqual(Hotel.find_hotels(10), {"H2": 12})
+            Hotel.modify("H1", total_rooms=20)
+            self.assertEqual(store.free_counts.free, {"H1": 19, "H2": 12})
+
+    def test_create_auto_assign(self) -> None:
+        """auto_assign picks the lowest free rooms for the stay."""
+        Reservation("R1", "C1", "H1", [1, 2], "2026-03-01",
+                    "2026-03-05").create()
+        reservation = Reservation("R2", "C1", "H1", [], "2026-03-03",
+                                  "2026-03-04")
+        reservation.create(auto_assign=2)
+        self.assertEqual(reservation.rooms, [3, 4])
+        self.assertEqual(_load()["reservations"]["R2"]["rooms"], [3, 4])
+
+    def test_create_auto_assign_without_rooms_raises(self) -> None:
+        """auto_assign fails without enough rooms or a known customer."""
+        with self.assertRaises(ValueError):
+            Reservation("R1", "C1", "H1", [], "2026-03-01",
+                        "2026-03-05").create(auto_assign=11)
+        reservation = Reservation("R1", "UNKNOWN", "H1")
+        with self.assertRaisesRegex(ValueError, "Customer UNKNOWN"):
+            reservation.create(auto_assign=1)
+        self.assertEqual(reservation.rooms, [])
+        self.assertEqual(_load()["reservations"], {})
+
+    def test_reservations_by_customer_and_hotel(self) -> None:
+        """Customers and hotels list their current reservations."""
+        Customer("C2", "Bob", "bob@example.com").create()
+        Reservation("R1", "C1", "H1", [1]).create()
+        Reservation("R2", "C2", "H1", [2]).create()
+        Reservation("R3", "C1", "H1", [3]).create()
+        Reservation.cancel("R1")
+        self.assertEqual(Customer.reservations("C1"), ["R3"])
+        self.assertEqual(Hotel.reservations("H1"), ["R2", "R3"])
+        self.assertEqual(Customer.reservations("C2"), ["R2"])
+        with self.assertRaises(ValueError):
+            Customer.reservations("UNKNOWN")
+        with self.assertRaises(ValueError):
+            Hotel.reservations("UNKNOWN")
+
+    def test_delete_with_reservations(self) -> None:
+        """Deletes are refused while reservations refer to the record."""
+        Reservation("R1", "C1", "H1", [1]).create()
+        with self.assertRaisesRegex(ValueError, "has 1 reservations"):
+            Customer.delete("C1")
+        with self.assertRaisesRegex(ValueError, "has 1 reservations"):
+            Hotel.delete("H1")
+        Reservation.cancel("R1")
+        Hotel.delete("H1")
+        self.assertNotIn("H1", _load()["hotels"])
+
+    def test_delete_cascade(self) -> None:
+        """cascade cancels the reservations along with the record."""
+        Hotel("H2", "Sea View", 5).create()
+        Reservation("R1", "C1", "H1", [1]).create()
+        Reservation("R2", "C1", "H2", [1]).create()
+        Hotel.delete("H2", cascade=True)
+        self.assertEqual(list(_load()["reservations"]), ["R1"])
+        Customer.delete("C1", cascade=True)
+        data = _load()
+        self.assertEqual(data["reservations"], {})
+        self.assertNotIn("C1", data["customers"])
+        self.assertTrue(Hotel.is_room_available("H1", 1, "", ""))
 
     def test_create_duplicate_raises(self) -> None:
         """Creating a reservation with a duplicate ID raises ValueError."""
@@ -239,12 +490,635 @@ class TestReservation(unittest.TestCase):
         self.assertNotIn("R1", data["reservations"])
         self.assertNotIn(1, data["hotels"]["H1"]["reserved_rooms"])
         self.assertNotIn(2, data["hotels"]["H1"]["reserved_rooms"])
+        self.assertTrue(Hotel.is_room_available(
+            "H1", 1, "2026-03-01", "2026-03-05"
+        ))
 
     def test_cancel_not_found_raises(self) -> None:
         """Cancelling a non-existent reservation raises ValueError."""
         with self.assertRaises(ValueError):
             Reservation.cancel("UNKNOWN")
 
+    def test_bulk_create(self) -> None:
+        """bulk_create() persists every reservation of the batch."""
+        Reservation.bulk_create([
+            Reservation("R1", "C1", "H1", [1, 2], "2026-03-01",
+                        "2026-03-05"),
+            Reservation("R2", "C1", "H1", [1], "2026-03-05", "2026-03-07"),
+        ])
+        data = _load()
+        self.assertIn("R1", data["reservations"])
+        self.assertIn("R2", data["reservations"])
+
+    def test_bulk_create_conflict_in_batch_rolls_back(self) -> None:
+        """A conflict between batch members leaves nothing created."""
+        with self.assertRaises(ValueError):
+            Reservation.bulk_create([
+                Reservation("R1", "C1", "H1", [1], "2026-03-01",
+                            "2026-03-05"),
+                Reservation("R2", "C1", "H1", [3, 1], "2026-03-02",
+                            "2026-03-03"),
+            ])
+        self.assertEqual(_load()["reservations"], {})
+
+    def test_bulk_create_duplicate_id_raises(self) -> None:
+        """Repeating a reservation ID in a batch raises ValueError."""
+        with self.assertRaises(ValueError):
+            Reservation.bulk_create([
+                Reservation("R1", "C1", "H1", [1]),
+                Reservation("R1", "C1", "H1", [2]),
+            ])
+
+    def test_bulk_cancel(self) -> None:
+        """bulk_cancel() removes every listed reservation."""
+        Reservation("R1", "C1", "H1", [1]).create()
+        Reservation("R2", "C1", "H1", [2]).create()
+        Reservation.bulk_cancel(["R1", "R2"])
+        self.assertEqual(_load()["reservations"], {})
+
+    def test_bulk_cancel_unknown_rolls_back(self) -> None:
+        """An unknown ID in a cancel batch leaves every reservation."""
+        Reservation("R1", "C1", "H1", [1]).create()
+        with self.assertRaises(ValueError):
+            Reservation.bulk_cancel(["R1", "UNKNOWN"])
+        self.assertIn("R1", _load()["reservations"])
+
+
+class TestHotelStore(unittest.TestCase):
+    """Tests for the HotelStore write-back session."""
+
+    def setUp(self) -> None:
+        """Reset data file before each test."""
+        _reset()
+
+    def test_info_keeps_stored_values(self) -> None:
+        """Values other than room collections are returned as stored."""
+        hotel = {"name": "Odd", "total_rooms": 2.5, "reserved_rooms": [1]}
+        customer = {"name": None, "email": ""}
+        with open(JSON_FILE, "w", encoding="utf-8") as f:
+            json.dump({"hotels": {"H1": hotel}, "customers": {"C1": customer},
+                       "reservations": {}}, f)
+        self.assertEqual(Hotel.info("H1"), hotel)
+        self.assertEqual(Customer.info("C1"), customer)
+
+    def test_info_returns_copies(self) -> None:
+        """Changing an info() result leaves later results unchanged."""
+        Hotel("H1", "Grand", 3).create()
+        Customer("C1", "Alice", "alice@example.com").create()
+        hotel = Hotel.info("H1")
+        customer = Customer.info("C1")
+        hotel["reserved_rooms"].append(1)
+        customer["name"] = "Mallory"
+        self.assertEqual(Hotel.info("H1")["reserved_rooms"], [])
+        self.assertEqual(Customer.info("C1")["name"], "Alice")
+
+    def test_cancel_releases_baseline_rooms(self) -> None:
+        """Cancelling a reservation saved by the baseline frees its rooms."""
+        with open(JSON_FILE, "w", encoding="utf-8") as f:
+            json.dump({
+                "hotels": {"H1": {"name": "Grand", "total_rooms": 3,
+                                  "reserved_rooms": [1, 2, 3]}},
+                "customers": {"C1": {"name": "Alice",
+                                     "email": "alice@example.com"}},
+                "reservations": {
+                    "R1": {"customer_id": "C1", "hotel_id": "H1",
+                           "rooms": [1], "check_in": "2026-03-01",
+                           "check_out": "2026-03-05"},
+                    "R2": {"customer_id": "C1", "hotel_id": "H1",
+                           "rooms": [2], "check_in": "2026-03-01",
+                           "check_out": "2026-03-05"},
+                },
+            }, f)
+        Reservation.cancel("R1")
+        Customer.delete("C1", cascade=True)
+        Customer("C2", "Bob", "bob@example.com").create()
+        self.assertTrue(Hotel.is_room_available("H1", 1, "2026-03-01",
+                                                "2026-03-05"))
+        Reservation("R3", "C2", "H1", [1, 2], "2026-03-01",
+                    "2026-03-05").create()
+        self.assertEqual(_load()["hotels"]["H1"]["reserved_rooms"], [3])
+
+    def test_operations_stay_in_memory_until_flush(self) -> None:
+        """Mutations are not written to the file before flush()."""
+        with HotelStore() as store:
+            Customer("C1", "Alice", "alice@example.com").create()
+            self.assertFalse(os.path.exists(JSON_FILE))
+            self.assertIn("C1", store.data["customers"])
+            store.flush()
+            self.assertIn("C1", _load()["customers"])
+
+    def test_exit_flushes(self) -> None:
+        """Leaving the context manager writes dirty state."""
+        with HotelStore():
+            Hotel("H1", "Grand Palace", 10).create()
+            Hotel.reserve_room("H1", 1)
+        self.assertIn(1, _load()["hotels"]["H1"]["reserved_rooms"])
+
+    def test_flush_every(self) -> None:
+        """The store flushes itself after flush_every mutations."""
+        with HotelStore(flush_every=2) as store:
+            Customer("C1", "Alice", "alice@example.com").create()
+            self.assertTrue(store.dirty)
+            Customer("C2", "Bob", "bob@example.com").create()
+            self.assertFalse(store.dirty)
+            self.assertIn("C2", _load()["customers"])
+
+    def test_reads_do_not_dirty(self) -> None:
+        """Read-only operations leave the store clean."""
+        Customer("C1", "Alice", "alice@example.com").create()
+        with HotelStore() as store:
+            Customer.display_customer_info("C1")
+            self.assertFalse(store.dirty)
+
+    def test_reservation_against_store(self) -> None:
+        """Reservations see rooms reserved earlier in the same store."""
+        with HotelStore() as store:
+            Customer("C1", "Alice", "alice@example.com").create()
+            Hotel("H1", "Grand Palace", 10).create()
+            Reservation("R1", "C1", "H1", [1, 2]).create()
+            with self.assertRaises(ValueError):
+                Reservation("R2", "C1", "H1", [2]).create()
+            Reservation.cancel("R1")
+            self.assertEqual(store.data["hotels"]["H1"]["reserved_rooms"], [])
+
+    def test_verify(self) -> None:
+        """Built indexes follow every change and match a rebuild."""
+        with HotelStore() as store:
+            self.assertEqual(store.verify(), [])
+            Customer("C1", "Alice", "alice@example.com").create()
+            Customer("C2", "Bob", "bob@example.com").create()
+            Hotel("H1", "Grand Palace", 10).create()
+            Hotel.find_hotels(1)
+            Reservation("R1", "C1", "H1", [1, 2]).create()
+            Reservation("R2", "C2", "H1", [3]).create()
+            Customer.modify("C2", email="robert@example.com")
+            Customer.delete("C1", cascade=True)
+            Hotel.reserve_room("H1", 9)
+            self.assertEqual(store.verify(), [])
+            store.references.by_hotel["H1"]["R9"] = None
+            store.data["reservations"]["R3"] = dict(
+                store.data["reservations"]["R2"], customer_id="C1"
+            )
+            self.assertEqual(store.verify(), [
+                "Index by_customer is stale for C1.",
+                "Index by_hotel is stale for H1.",
+                "Reservation R3 refers to missing customers C1.",
+                "Index availability is stale.",
+            ])
+            store.discard()
+
+    def test_conflicting_email_detected(self) -> None:
+        """A store replaying a customer whose email was taken fails."""
+        first, second = HotelStore(), HotelStore()
+        with first:
+            Customer("C1", "Alice", "alice@example.com").create()
+        with self.assertRaises(ConflictError):
+            with second:
+                Customer("C2", "Alicia", "alice@example.com").create()
+
+    def test_shrink_below_new_reservation_detected(self) -> None:
+        """A store shrinking a hotel under a newer reservation fails."""
+        Customer("C1", "Alice", "alice@example.com").create()
+        Hotel("H1", "Grand Palace", 10).create()
+        first, second = HotelStore(), HotelStore()
+        with first:
+            Reservation("R1", "C1", "H1", [8]).create()
+        with self.assertRaises(ConflictError):
+            with second:
+                Hotel.modify("H1", total_rooms=5)
+        self.assertEqual(_load()["hotels"]["H1"]["total_rooms"], 10)
+
+
+def _wal() -> JsonBackend:
+    """Return a JSON backend over the data file in WAL mode."""
+    return JsonBackend(JSON_FILE, wal=True)
+
+
+class TestWriteAheadLog(unittest.TestCase):
+    """Tests for the append-only WAL storage mode."""
+
+    def setUp(self) -> None:
+        """Reset data files before each test."""
+        _reset()
+
+    def tearDown(self) -> None:
+        """Remove the data files written in WAL mode."""
+        _reset()
+
+    def test_flush_appends_to_log(self) -> None:
+        """A flush appends records and leaves the snapshot untouched."""
+        with HotelStore(_wal()):
+            Hotel("H1", "Grand Palace", 10).create()
+            Hotel.reserve_room("H1", 3)
+        self.assertFalse(os.path.exists(JSON_FILE))
+        with open(JSON_FILE + ".log", "r", encoding="utf-8") as f:
+            self.assertEqual(len(f.readlines()), 2)
+
+    def test_replay_rebuilds_state(self) -> None:
+        """A new store rebuilds state from snapshot plus log."""
+        with HotelStore(_wal()):
+            Customer("C1", "Alice", "alice@example.com").create()
+            Customer.modify("C1", name="Bob")
+        with HotelStore(_wal()) as store:
+            self.assertEqual(store.data["customers"]["C1"]["name"], "Bob")
+
+    def test_compaction(self) -> None:
+        """Passing compact_at rewrites the snapshot and drops the log."""
+        with HotelStore(JsonBackend(JSON_FILE, wal=True, compact_at=1)):
+            Customer("C1", "Alice", "alice@example.com").create()
+        self.assertFalse(os.path.exists(JSON_FILE + ".log"))
+        self.assertIn("C1", _load()["customers"])
+
+    def test_torn_record_ignored(self) -> None:
+        """An incomplete trailing record from a crash is skipped."""
+        with HotelStore(_wal()):
+            Customer("C1", "Alice", "alice@example.com").create()
+        with open(JSON_FILE + ".log", "a", encoding="utf-8") as f:
+            f.write('{"op":"del","s":"cust')
+        with HotelStore(_wal()) as store:
+            self.assertIn("C1", store.data["customers"])
+
+    def test_replay_is_idempotent(self) -> None:
+        """Replaying a log already folded into the snapshot is harmless."""
+        with HotelStore(_wal()) as store:
+            Hotel("H1", "Grand Palace", 10).create()
+            Hotel.reserve_room("H1", 1)
+            store.flush()
+            snapshot = store.data
+        with open(JSON_FILE, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, default=list)
+        with HotelStore(_wal()) as store:
+            self.assertEqual(store.data["hotels"]["H1"]["reserved_rooms"], [1])
+
+
+def _reserve_rooms(rooms: list[int]) -> None:
+    """Reserve rooms of hotel H1 one call at a time (worker process)."""
+    _reserve_hotel_rooms("H1", rooms)
+
+
+def _reserve_hotel_rooms(hotel_id: str, rooms: list[int]) -> None:
+    """Reserve rooms of a hotel one call at a time (worker process)."""
+    for room in rooms:
+        Hotel.reserve_room(hotel_id, room)
+
+
+class TestConcurrency(unittest.TestCase):
+    """Tests for locking and optimistic concurrency on the JSON file."""
+
+    def setUp(self) -> None:
+        """Reset data files and create a base hotel."""
+        _reset()
+        Hotel("H1", "Grand Palace", 100).create()
+
+    def tearDown(self) -> None:
+        """Remove the data and lock files."""
+        _reset()
+
+    def test_version_bumped_by_writes(self) -> None:
+        """Every write increments the backend version."""
+        version = get_backend().version()
+        Hotel.reserve_room("H1", 1)
+        self.assertEqual(get_backend().version(), version + 1)
+
+    def test_disjoint_stores_merge(self) -> None:
+        """A stale store replays its changes on top of the newer file."""
+        first, second = HotelStore(), HotelStore()
+        with first:
+            Hotel.reserve_room("H1", 1)
+        with second:
+            Hotel.reserve_room("H1", 2)
+        self.assertEqual(_load()["hotels"]["H1"]["reserved_rooms"], [1, 2])
+
+    def test_conflicting_stores_detected(self) -> None:
+        """Two stores reserving the same room cannot both win."""
+        first, second = HotelStore(), HotelStore()
+        with first:
+            Hotel.reserve_room("H1", 1)
+        with self.assertRaises(ConflictError):
+            with second:
+                Hotel.reserve_room("H1", 1)
+        self.assertEqual(_load()["hotels"]["H1"]["reserved_rooms"], [1])
+        self.assertFalse(second.dirty)
+
+    def test_processes_do_not_lose_updates(self) -> None:
+        """Concurrent processes calling reserve_room keep every room."""
+        workers = [
+            multiprocessing.Process(
+                target=_reserve_rooms, args=(list(range(i, 41, 4)),)
+            )
+            for i in range(1, 5)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(len(_load()["hotels"]["H1"]["reserved_rooms"]), 40)
+
+
+class TestTransaction(unittest.TestCase):
+    """Tests for transaction(): one write, or none of the changes."""
+
+    def setUp(self) -> None:
+        """Reset data file and create a customer and a hotel."""
+        _reset()
+        Customer("C1", "Alice", "alice@example.com").create()
+        Hotel("H1", "Grand Palace", 4).create()
+
+    def tearDown(self) -> None:
+        """Remove the data and lock files."""
+        _reset()
+
+    def _workflow(self) -> None:
+        """Create a customer and a reservation, then modify the hotel."""
+        Customer("C2", "Bob", "bob@example.com").create()
+        Reservation("R1", "C2", "H1", [1, 2], "2026-03-01",
+                    "2026-03-05").create()
+        Hotel.reserve_room("H1", 3)
+        Hotel.modify("H1", name="Grand")
+
+    def test_commit_in_one_write(self) -> None:
+        """The operations see each other and are written together."""
+        version = get_backend().version()
+        with transaction():
+            self._workflow()
+            self.assertNotIn("C2", _load()["customers"])
+        data = _load()
+        self.assertEqual(data["reservations"]["R1"]["rooms"], [1, 2])
+        self.assertEqual(data["hotels"]["H1"]["name"], "Grand")
+        if isinstance(version, int):
+            self.assertEqual(get_backend().version(), version + 1)
+
+    def test_rollback(self) -> None:
+        """A failing operation leaves the stored data as it was."""
+        before = _load()
+        with self.assertRaises(ValueError):
+            with transaction():
+                self._workflow()
+                Customer.delete("C1")
+                Reservation("R2", "C2", "H1", [3], "2026-03-01",
+                            "2026-03-05").create()
+        self.assertEqual(_load(), before)
+        self.assertEqual(Hotel.info("H1")["reserved_rooms"], [])
+        Customer("C2", "Bob", "bob@example.com").create()
+
+    def test_rollback_in_store(self) -> None:
+        """An active store gets its data and indexes back."""
+        with HotelStore(flush_every=1) as store:
+            Reservation("R0", "C1", "H1", [4], "2026-03-01",
+                        "2026-03-05").create()
+            self.assertEqual(store.references.customer_reservations("C1"),
+                             ["R0"])
+            before = _load()
+            with self.assertRaises(ValueError):
+                with transaction():
+                    self._workflow()
+                    Customer.modify("C1", name="Alicia")
+                    Reservation.cancel("R0")
+                    self.assertEqual(_load(), before)
+                    raise ValueError("Stop.")
+            self.assertEqual(store.verify(), [])
+            self.assertEqual(store.data["customers"]["C1"]["name"], "Alice")
+            self.assertEqual(list(store.data["reservations"]), ["R0"])
+            self.assertEqual(list(store.data["hotels"]["H1"]
+                                  ["reserved_rooms"]), [])
+            self.assertEqual(store.free_counts.free["H1"], 4)
+            self.assertFalse(store.dirty)
+
+    def test_nested_rollback(self) -> None:
+        """A nested transaction that fails undoes only its own changes."""
+        with transaction():
+            Customer("C2", "Bob", "bob@example.com").create()
+            with self.assertRaises(ValueError):
+                with transaction():
+                    Hotel.reserve_room("H1", 1)
+                    Hotel.reserve_room("H1", 1)
+            Hotel.reserve_room("H1", 2)
+        data = _load()
+        self.assertIn("C2", data["customers"])
+        self.assertEqual(data["hotels"]["H1"]["reserved_rooms"], [2])
+
+
+class TestCustomerSqlite(SqliteMixin, TestCustomer):
+    """Customer tests on the SQLite backend."""
+
+
+class TestHotelSqlite(SqliteMixin, TestHotel):
+    """Hotel tests on the SQLite backend."""
+
+
+class TestReservationSqlite(SqliteMixin, TestReservation):
+    """Reservation tests on the SQLite backend."""
+
+
+class TestTransactionSqlite(SqliteMixin, TestTransaction):
+    """Transaction tests on the SQLite backend."""
+
+
+class TestSqliteBackend(SqliteMixin, unittest.TestCase):
+    """Tests specific to the SQLite backend."""
+
+    def setUp(self) -> None:
+        """Reset the database before each test."""
+        super().setUp()
+        _reset()
+
+    def test_round_trip(self) -> None:
+        """Reloading returns the reserved and reservation rooms."""
+        Customer("C1", "Alice", "alice@example.com").create()
+        Hotel("H1", "Grand Palace", 10).create()
+        Hotel.reserve_room("H1", 7)
+        Reservation("R1", "C1", "H1", [3, 1], "2026-03-01",
+                    "2026-03-05").create()
+        data = _load()
+        self.assertEqual(data["hotels"]["H1"]["reserved_rooms"], [7])
+        self.assertEqual(data["reservations"]["R1"]["rooms"], [3, 1])
+
+    def test_delete_hotel_removes_rooms(self) -> None:
+        """Deleting a hotel cascades to its reserved room rows."""
+        Hotel("H1", "Grand Palace", 10).create()
+        Hotel.reserve_room("H1", 1)
+        Hotel.delete("H1")
+        backend = get_backend()
+        rows = backend.conn.execute(
+            "SELECT COUNT(*) FROM reserved_rooms"
+        ).fetchone()
+        self.assertEqual(rows[0], 0)
+
+    def test_conflicting_stores_detected(self) -> None:
+        """Two stores reserving the same room cannot both win."""
+        Hotel("H1", "Grand Palace", 10).create()
+        first, second = HotelStore(), HotelStore()
+        with first:
+            Hotel.reserve_room("H1", 1)
+        with self.assertRaises(ConflictError):
+            with second:
+                Hotel.reserve_room("H1", 1)
+
+    def test_wal_journal_mode(self) -> None:
+        """The database runs in WAL journal mode."""
+        backend = get_backend()
+        mode = backend.conn.execute(
+            "PRAGMA journal_mode"
+        ).fetchone()
+        self.assertEqual(mode[0], "wal")
+
+
+class TestCustomerSharded(ShardedMixin, TestCustomer):
+    """Customer tests on the sharded backend."""
+
+
+class TestHotelSharded(ShardedMixin, TestHotel):
+    """Hotel tests on the sharded backend."""
+
+
+class TestReservationSharded(ShardedMixin, TestReservation):
+    """Reservation tests on the sharded backend."""
+
+
+class TestTransactionSharded(ShardedMixin, TestTransaction):
+    """Transaction tests on the sharded backend."""
+
+
+class TestShardedBackend(ShardedMixin, unittest.TestCase):
+    """Tests specific to the sharded backend."""
+
+    def setUp(self) -> None:
+        """Create two hotels stored in different shards."""
+        super().setUp()
+        _reset()
+        backend = get_backend()
+        self.other = next(
+            f"H{i}" for i in range(2, 100)
+            if backend.shard("hotels", f"H{i}") != backend.shard(
+                "hotels", "H1"
+            )
+        )
+        Hotel("H1", "Grand Palace", 40).create()
+        Hotel(self.other, "Sea View", 40).create()
+        Customer("C1", "Alice", "alice@example.com").create()
+
+    def _changed(self, before: dict) -> list[str]:
+        """Return the shards whose version moved since before."""
+        after = get_backend().version()
+        return [name for name in after if after[name] != before[name]]
+
+    def test_reserve_room_writes_one_shard(self) -> None:
+        """Room updates only rewrite the hotel's shard."""
+        before = get_backend().version()
+        Hotel.reserve_room("H1", 1)
+        Hotel.modify("H1", name="Renamed")
+        Hotel.cancel_room("H1", 1)
+        self.assertEqual(self._changed(before),
+                         [get_backend().shard("hotels", "H1")])
+
+    def test_customer_modify_writes_customer_shard(self) -> None:
+        """Customer updates only rewrite the customer shard."""
+        before = get_backend().version()
+        Customer.modify("C1", name="Alicia")
+        self.assertEqual(self._changed(before), ["customers"])
+        self.assertEqual(_load()["customers"]["C1"]["name"], "Alicia")
+
+    def test_different_hotels_do_not_conflict(self) -> None:
+        """A store writing another hotel's shard is not rebased."""
+        first, second = HotelStore(), HotelStore()
+        with first:
+            Hotel.reserve_room("H1", 1)
+        with second:
+            Hotel.reserve_room(self.other, 1)
+        self.assertEqual(second.data["hotels"]["H1"]["reserved_rooms"], [])
+        data = _load()
+        self.assertEqual(data["hotels"]["H1"]["reserved_rooms"], [1])
+        self.assertEqual(data["hotels"][self.other]["reserved_rooms"], [1])
+
+    def test_conflicting_stores_detected(self) -> None:
+        """Two stores reserving the same room cannot both win."""
+        first, second = HotelStore(), HotelStore()
+        with first:
+            Hotel.reserve_room("H1", 1)
+        with self.assertRaises(ConflictError):
+            with second:
+                Hotel.reserve_room("H1", 1)
+
+    def test_delete_checks_reservations_shard(self) -> None:
+        """A stale delete or shrink conflicts with a newer reservation."""
+        stores = [HotelStore() for _ in range(3)]
+        Reservation("R1", "C1", "H1", [8], "2026-03-01",
+                    "2026-03-05").create()
+        for store, operation in zip(stores, (
+            lambda: Customer.delete("C1"),
+            lambda: Hotel.delete("H1"),
+            lambda: Hotel.modify("H1", total_rooms=5),
+        )):
+            with self.assertRaises(ConflictError):
+                with store:
+                    operation()
+        self.assertEqual(HotelStore().verify(), [])
+        self.assertIn("R1", _load()["reservations"])
+
+    def test_reservation_checks_its_hotel_shard(self) -> None:
+        """A reservation conflicts with a room held since it was checked."""
+        store = HotelStore()
+        Hotel.reserve_room("H1", 1)
+        with self.assertRaises(ConflictError):
+            with store:
+                Reservation("R1", "C1", "H1", [1], "2026-03-01",
+                            "2026-03-05").create()
+        self.assertNotIn("R1", _load()["reservations"])
+
+    def test_locks_are_taken_in_name_order(self) -> None:
+        """A save needing an earlier shard relocks its session in order."""
+        backend = get_backend()
+        held: list[str] = []
+        taken: list[str] = []
+
+        def tracked(name: str, locked):  # type: ignore[no-untyped-def]
+            @contextmanager
+            def wrapper(scope: object = None) -> Iterator[None]:
+                if name in held:
+                    with locked(scope):
+                        yield
+                    return
+                self.assertTrue(all(other < name for other in held))
+                held.append(name)
+                taken.append(name)
+                try:
+                    with locked(scope):
+                        yield
+                finally:
+                    held.remove(name)
+            return wrapper
+
+        for name, shard in backend.shards.items():
+            shard.locked = tracked(name, shard.locked)  # type: ignore
+        Reservation("R1", "C1", "H1", [1], "2026-03-01",
+                    "2026-03-05").create()
+        Reservation("R2", "C1", "H1", [1], "2026-03-02",
+                    "2026-03-04").request()
+        del taken[:]
+        Reservation.cancel("R1")
+        self.assertEqual(taken, ["reservations", "customers",
+                                 backend.shard("hotels", "H1"),
+                                 "reservations"])
+        self.assertIn("R2", _load()["reservations"])
+
+    def test_processes_do_not_lose_updates(self) -> None:
+        """Concurrent processes on two hotels keep every room."""
+        workers = [
+            multiprocessing.Process(
+                target=_reserve_hotel_rooms,
+                args=("H1" if i % 2 else self.other,
+                      list(range(i, 41, 4)))
+            )
+            for i in range(1, 5)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        hotels = _load()["hotels"]
+        self.assertEqual(len(hotels["H1"]["reserved_rooms"]), 20)
+        self.assertEqual(len(hotels[self.other]["reserved_rooms"]), 20)
+
 
 if __name__ == "__main__":
     unittest.main()
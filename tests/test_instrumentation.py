@@ -0,0 +1,95 @@
+"""Unit tests for instrumentation.py."""
+
+import os
+import unittest
+from src import instrumentation
+from src.hotel_management import Customer, HotelStore
+from src.instrumentation import Histogram
+from src.storage import JsonBackend
+
+TEST_FILE = "hotel_instrumentation_test.json"
+
+
+class TestHistogram(unittest.TestCase):
+    """Tests for the duration histogram."""
+
+    def test_summary(self) -> None:
+        """Counts, totals and percentiles follow the recorded durations."""
+        histogram = Histogram()
+        for micros in (1, 2, 3, 100):
+            histogram.add(micros / 1e6)
+        summary = histogram.summary()
+        self.assertEqual(summary["count"], 4)
+        self.assertAlmostEqual(summary["total"], 106e-6)
+        self.assertLessEqual(summary["p50"], 4e-6)
+        self.assertAlmostEqual(summary["p99"], 100e-6)
+        self.assertEqual(sum(summary["buckets_us"].values()), 4)
+
+
+class TestInstrumentation(unittest.TestCase):
+    """Tests for the stats API."""
+
+    def setUp(self) -> None:
+        """Start with instrumentation on and no stats."""
+        instrumentation.reset()
+        instrumentation.enable()
+        self.backend = JsonBackend(TEST_FILE)
+        self.backend.clear()
+
+    def tearDown(self) -> None:
+        """Turn instrumentation off and remove the data file."""
+        instrumentation.enable(False)
+        instrumentation.reset()
+        self.backend.clear()
+
+    def test_disabled_records_nothing(self) -> None:
+        """Instrumented calls are not timed while disabled."""
+        instrumentation.enable(False)
+        with HotelStore(self.backend):
+            Customer("C1", "Alice", "a@example.com").create()
+        self.assertEqual(instrumentation.stats()["timings"], {})
+
+    def test_operations_and_storage_calls(self) -> None:
+        """Public operations, storage calls and bytes are recorded."""
+        with HotelStore(self.backend):
+            Customer("C1", "Alice", "a@example.com").create()
+            Customer.display_customer_info("C1")
+        stats = instrumentation.stats()
+        self.assertEqual(stats["timings"]["Customer.create"]["count"], 1)
+        self.assertEqual(stats["timings"]["storage.load"]["count"], 1)
+        self.assertEqual(stats["timings"]["storage.save"]["count"], 1)
+        self.assertIn("json.dump", stats["timings"])
+        self.assertEqual(stats["counters"]["bytes_written"],
+                         os.path.getsize(TEST_FILE))
+
+    def test_failed_calls_are_timed(self) -> None:
+        """A call that raises is still recorded."""
+        with HotelStore(self.backend):
+            with self.assertRaises(ValueError):
+                Customer.delete("C404")
+        self.assertEqual(
+            instrumentation.stats()["timings"]["Customer.delete"]["count"], 1
+        )
+
+    def test_hooks(self) -> None:
+        """Hooks see every timed call until removed."""
+        seen = []
+
+        def hook(name: str, seconds: float) -> None:
+            seen.append(name)
+
+        instrumentation.add_hook(hook)
+        try:
+            with HotelStore(self.backend):
+                Customer("C1", "Alice", "a@example.com").create()
+        finally:
+            instrumentation.remove_hook(hook)
+        with HotelStore(self.backend):
+            Customer.display_customer_info("C1")
+        self.assertIn("Customer.create", seen)
+        self.assertIn("storage.save", seen)
+        self.assertNotIn("Customer.display_customer_info", seen)
+
+
+if __name__ == "__main__":
+    unittest.main()
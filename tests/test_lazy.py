@@ -0,0 +1,196 @@
+"""Unit tests for lazy.py."""
+
+import json
+import os
+import threading
+import unittest
+from src import instrumentation
+from src.hotel_management import Customer, HotelStore
+from src.lazy import LazySection, dump_json, open_snapshot
+from src.references import ReferenceIndex
+from src.rooms import RoomSet
+from src.storage import JsonBackend, with_room_sets
+
+TEST_FILE = "hotel_lazy_test.json"
+
+
+def _sample() -> dict:
+    """Return data with a few records in every section."""
+    return {
+        "hotels": {
+            "H1": {"name": "Grand", "total_rooms": 5, "reserved_rooms": [2]},
+        },
+        "customers": {
+            f"C{i}": {"name": f"Name {i}", "email": f"c{i}@example.com"}
+            for i in range(50)
+        },
+        "reservations": {
+            "R1": {"customer_id": "C1", "hotel_id": "H1", "rooms": [1],
+                   "check_in": "2026-03-01", "check_out": "2026-03-05"},
+        },
+    }
+
+
+class TestLazy(unittest.TestCase):
+    """Tests for lazy snapshot loading and splicing writes."""
+
+    def setUp(self) -> None:
+        """Write the sample data through the backend."""
+        self.backend = JsonBackend(TEST_FILE)
+        self.backend.clear()
+        self.backend.save(with_room_sets(_sample()))
+
+    def tearDown(self) -> None:
+        """Remove the data files."""
+        instrumentation.enable(False)
+        instrumentation.reset()
+        self.backend.clear()
+
+    def test_lookup_parses_one_record(self) -> None:
+        """Reading one customer decodes only that record."""
+        instrumentation.reset()
+        instrumentation.enable()
+        data = self.backend.load()
+        self.assertIsInstance(data["customers"], LazySection)
+        self.assertEqual(data["customers"]["C7"]["name"], "Name 7")
+        self.assertNotIn("C50", data["customers"])
+        read = instrumentation.stats()["counters"]["bytes_read"]
+        self.assertLess(read, 100)
+        self.assertEqual(list(data["customers"].loaded), ["C7"])
+
+    def test_hotels_come_with_room_sets(self) -> None:
+        """Hotel records are decoded with RoomSets."""
+        hotel = self.backend.load()["hotels"]["H1"]
+        self.assertIsInstance(hotel["reserved_rooms"], RoomSet)
+        self.assertEqual(hotel["reserved_rooms"], [2])
+
+    def test_changes_keep_dict_order(self) -> None:
+        """Deleted, re-added and new keys iterate like in a dict."""
+        data = self.backend.load()
+        customers = data["customers"]
+        expected = dict(_sample()["customers"])
+        for mapping in (customers, expected):
+            del mapping["C3"]
+            mapping["C3"] = {"name": "Back", "email": ""}
+            mapping["C99"] = {"name": "New", "email": ""}
+            mapping["C4"] = {"name": "Changed", "email": ""}
+        self.assertEqual(list(customers), list(expected))
+        self.assertEqual(len(customers), len(expected))
+        self.assertEqual(customers, expected)
+
+    def test_write_matches_json_dumps(self) -> None:
+        """Spliced writes are byte for byte what json.dumps gives."""
+        data = self.backend.load()
+        customer = data["customers"]["C2"]
+        customer["name"] = "Renamed"
+        data["customers"]["C2"] = customer
+        del data["customers"]["C9"]
+        hotel = data["hotels"]["H1"]
+        hotel["reserved_rooms"].add(4)
+        data["hotels"]["H1"] = hotel
+        self.backend.save(data)
+        expected = _sample()
+        expected["customers"]["C2"]["name"] = "Renamed"
+        del expected["customers"]["C9"]
+        expected["hotels"]["H1"]["reserved_rooms"] = [2, 4]
+        with open(TEST_FILE, "rb") as f:
+            self.assertEqual(f.read(), json.dumps(expected, indent=4).encode())
+        self.assertEqual(dump_json(expected, compact=True)[0],
+                         json.dumps(expected, separators=(",", ":")).encode())
+
+    def test_write_during_reads(self) -> None:
+        """Records decoded by another thread do not break a write."""
+        def sample() -> dict:
+            data = _sample()
+            data["customers"] = {f"C{i}": {"name": "N", "email": ""}
+                                 for i in range(5000)}
+            return data
+
+        self.backend.save(with_room_sets(sample()))
+        data = self.backend.load()
+        customers = data["customers"]
+        customers["C0"] = {"name": "Renamed", "email": ""}
+        stop = threading.Event()
+
+        def read() -> None:
+            i = 1
+            while not stop.is_set():
+                customers.get(f"C{i % 5000}")
+                i += 2
+
+        reader = threading.Thread(target=read)
+        reader.start()
+        try:
+            for _ in range(3):
+                written = dump_json(data)[0]
+        finally:
+            stop.set()
+            reader.join()
+        expected = sample()
+        expected["customers"]["C0"]["name"] = "Renamed"
+        self.assertEqual(written, json.dumps(expected, indent=4).encode())
+
+    def test_scan_leaves_records_unloaded(self) -> None:
+        """Index builds decode in bulk and only assigned records change."""
+        data = self.backend.load()
+        customers = data["customers"]
+        customers["C4"] = {"name": "Changed", "email": ""}
+        index = ReferenceIndex.build(data)
+        self.assertEqual(index.customer_with_email("c7@example.com"), "C7")
+        self.assertEqual(dict(customers.items())["C4"]["name"], "Changed")
+        self.assertEqual(list(customers.loaded), ["C4"])
+        self.assertEqual(customers["C5"]["name"], "Name 5")
+        self.assertEqual(customers.changed, {"C4"})
+
+    def test_write_rebases_sections(self) -> None:
+        """Written sections read from the new snapshot, nothing pending."""
+        data = with_room_sets(_sample())
+        data["customers"]["C99"] = {"name": "New", "email": ""}
+        self.backend.save(data)
+        customers = data["customers"]
+        self.assertIsInstance(data["hotels"], LazySection)
+        self.assertIsInstance(customers, LazySection)
+        self.assertEqual((customers.added, customers.changed, customers.dead),
+                         ({}, set(), set()))
+        self.assertEqual(customers["C99"]["name"], "New")
+
+    def test_foreign_file_is_indexed(self) -> None:
+        """A file written elsewhere gets an index on first load."""
+        self.backend.clear()
+        payload = {"customers": {"C1": {"name": "Zoë", "email": ""},
+                                 "C2": {"name": "Al", "email": ""}}}
+        with open(TEST_FILE, "w", encoding="utf-8") as f:
+            f.write(json.dumps(payload, ensure_ascii=False))
+        data = self.backend.load()
+        self.assertEqual(data["customers"]["C2"]["name"], "Al")
+        self.assertTrue(os.path.exists(self.backend.index_path))
+        self.assertEqual(data, payload)
+
+    def test_stale_index_is_rebuilt(self) -> None:
+        """An index that does not match the file is not trusted."""
+        with open(TEST_FILE, "w", encoding="utf-8") as f:
+            json.dump({"customers": {"X": {"name": "Only", "email": ""}}}, f)
+        data = open_snapshot(TEST_FILE, self.backend.index_path)
+        self.assertEqual(list(data["customers"]), ["X"])
+        self.assertEqual(data["customers"]["X"]["name"], "Only")
+
+    def test_unexpected_layout_loads_eagerly(self) -> None:
+        """Files that are not plain snapshots are parsed whole."""
+        with open(TEST_FILE, "w", encoding="utf-8") as f:
+            json.dump({"hotels": {}, "version": 2}, f)
+        self.assertIsNone(open_snapshot(TEST_FILE, self.backend.index_path))
+        self.assertEqual(self.backend.load()["version"], 2)
+
+    def test_store_operations(self) -> None:
+        """Operations run against lazily loaded data."""
+        with HotelStore(self.backend):
+            Customer.modify("C1", name="Modified")
+            Customer.delete("C2")
+        data = JsonBackend(TEST_FILE).load()
+        self.assertEqual(data["customers"]["C1"]["name"], "Modified")
+        self.assertNotIn("C2", data["customers"])
+        self.assertEqual(len(data["customers"]), 49)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,361 @@
+"""Unit tests for main.py."""
+
+import asyncio
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+from typing import Optional
+import main
+from main import (
+    ScenarioOptions, expand_inputs, parse_address, read_ops, run_input,
+    run_scenarios, run_stream, start_server
+)
+from src import instrumentation
+from src.hotel_management import HotelStore, use_backend
+from src.results import ResultLog
+from src.storage import JsonBackend
+
+TEST_FILE = "hotel_main_test.json"
+
+
+class BrokenBackend(JsonBackend):
+    """JSON backend whose writes fail."""
+
+    def save(
+        self,
+        data: dict,
+        changes: Optional[list] = None,
+        expected: Optional[int] = None
+    ) -> int:
+        """Fail like a database that cannot be written."""
+        raise sqlite3.OperationalError("disk I/O error")
+
+
+class TestStream(unittest.TestCase):
+    """Tests for the NDJSON operation stream."""
+
+    def setUp(self) -> None:
+        """Run each test in a fresh in-memory store."""
+        self.store = HotelStore(JsonBackend(TEST_FILE))
+        self.store.__enter__()
+
+    def tearDown(self) -> None:
+        """Drop the store and what transactions wrote."""
+        self.store.discard()
+        self.store.__exit__(None, None, None)
+        self.store.backend.clear()
+
+    def _run(self, lines: list[str]) -> list[str]:
+        """Run a stream and return the lines of its text results."""
+        out = io.StringIO()
+        log = ResultLog(out)
+        list(run_stream(lines, log))
+        log.close()
+        return out.getvalue().splitlines()
+
+    def test_read_ops_skips_blank_lines(self) -> None:
+        """Blank lines produce no operation."""
+        ops = list(read_ops(['{"op": "x"}\n', "\n", '{"op": "y"}\n']))
+        self.assertEqual([op["op"] for op in ops], ["x", "y"])
+
+    def test_read_ops_reports_bad_lines(self) -> None:
+        """Malformed lines carry their line number and error."""
+        ops = list(read_ops(["{\n", "[1]\n"]))
+        self.assertEqual([op["line"] for op in ops], [1, 2])
+        self.assertTrue(all("error" in op for op in ops))
+
+    def test_run_stream(self) -> None:
+        """Each operation reports the runners' [OK]/[FAIL] line."""
+        lines = [
+            '{"op": "create_hotel", "hotel_id": "H1", "name": "A", '
+            '"total_rooms": 2}',
+            '{"op": "reserve_room", "hotel_id": "H1", "room": 3}',
+            '{"op": "display_hotel", "hotel_id": "H1"}',
+        ]
+        self.assertEqual(self._run(lines), [
+            "  [OK] Created hotel H1",
+            "  [FAIL] Reserve room 3 in hotel H1: Room 3 does not exist.",
+            "{'name': 'A', 'total_rooms': 2, 'reserved_rooms': []}",
+            "  [OK] Displayed hotel H1",
+        ])
+
+    def test_run_stream_room_search(self) -> None:
+        """Room searches print what they find and auto_assign books it."""
+        lines = [
+            '{"op": "create_hotel", "hotel_id": "H1", "name": "A", '
+            '"total_rooms": 3}',
+            '{"op": "create_customer", "customer_id": "C1"}',
+            '{"op": "create_reservation", "reservation_id": "R1", '
+            '"customer_id": "C1", "hotel_id": "H1", "auto_assign": 2}',
+            '{"op": "find_rooms", "hotel_id": "H1", "count": 1}',
+            '{"op": "find_hotels", "count": 2}',
+            '{"op": "find_rooms", "hotel_id": "H1"}',
+        ]
+        self.assertEqual(self._run(lines)[2:], [
+            "  [OK] Created reservation R1",
+            "[3]",
+            "  [OK] Found 1 rooms in hotel H1",
+            "{}",
+            "  [OK] Found hotels with 2 rooms",
+            "  [FAIL] Find  rooms in hotel H1: Missing field 'count'.",
+        ])
+
+    def test_run_stream_cascade(self) -> None:
+        """Deletes refuse referenced records unless cascade is set."""
+        lines = [
+            '{"op": "create_hotel", "hotel_id": "H1", "name": "A", '
+            '"total_rooms": 2}',
+            '{"op": "create_customer", "customer_id": "C1"}',
+            '{"op": "create_reservation", "reservation_id": "R1", '
+            '"customer_id": "C1", "hotel_id": "H1", "rooms": [1]}',
+            '{"op": "delete_hotel", "hotel_id": "H1"}',
+            '{"op": "delete_hotel", "hotel_id": "H1", "cascade": true}',
+        ]
+        self.assertEqual(self._run(lines)[3:], [
+            "  [FAIL] Delete hotel H1: Hotel H1 has 1 reservations.",
+            "  [OK] Deleted hotel H1",
+        ])
+        self.assertEqual(self.store.data["reservations"], {})
+
+    def test_run_stream_waitlist(self) -> None:
+        """Requested reservations wait and are booked on cancellation."""
+        lines = [
+            '{"op": "create_hotel", "hotel_id": "H1", "name": "A", '
+            '"total_rooms": 1}',
+            '{"op": "create_customer", "customer_id": "C1"}',
+            '{"op": "request_reservation", "reservation_id": "R1", '
+            '"customer_id": "C1", "hotel_id": "H1", "rooms": [1]}',
+            '{"op": "request_reservation", "reservation_id": "R2", '
+            '"customer_id": "C1", "hotel_id": "H1", "auto_assign": 1}',
+            '{"op": "cancel_reservation", "reservation_id": "R1"}',
+            '{"op": "withdraw_request", "reservation_id": "R2"}',
+        ]
+        self.assertEqual(self._run(lines)[2:], [
+            "  [OK] Requested reservation R1",
+            "{'waiting': 'R2', 'depth': 1}",
+            "  [OK] Requested reservation R2",
+            "  [OK] Cancelled reservation R1",
+            "  [FAIL] Withdraw request R2: Reservation R2 is not waiting.",
+        ])
+        self.assertEqual(list(self.store.data["reservations"]["R2"]["rooms"]),
+                         [1])
+
+    def test_run_stream_export_needs_feed(self) -> None:
+        """Exports fail without a change feed."""
+        self.assertEqual(self._run(['{"op": "export", "path": "x.json"}']),
+                         ["  [FAIL] Export x.json: No change feed is in use."])
+        self.assertFalse(os.path.exists("x.json"))
+
+    def test_run_stream_transaction(self) -> None:
+        """Transactions commit all their operations or none of them."""
+        lines = [
+            '{"op": "transaction", "ops": ['
+            '{"op": "create_hotel", "hotel_id": "H1", "name": "A", '
+            '"total_rooms": 2}, '
+            '{"op": "display_hotel", "hotel_id": "H1"}]}',
+            '{"op": "transaction", "ops": ['
+            '{"op": "create_customer", "customer_id": "C1"}, '
+            '{"op": "reserve_room", "hotel_id": "H1", "room": 3}]}',
+            '{"op": "transaction", "ops": [1]}',
+        ]
+        self.assertEqual(self._run(lines), [
+            "[{'name': 'A', 'total_rooms': 2, 'reserved_rooms': []}]",
+            "  [OK] Committed transaction",
+            "  [FAIL] Run transaction: Operation 2 (reserve_room): "
+            "Room 3 does not exist.",
+            "  [FAIL] Run transaction: Operation 1: unknown operation None.",
+        ])
+        self.assertNotIn("C1", self.store.data["customers"])
+
+    def test_run_stream_is_lazy(self) -> None:
+        """Operations run only as results are consumed."""
+        results = run_stream([
+            '{"op": "create_customer", "customer_id": "C1"}'
+        ], ResultLog())
+        self.assertNotIn("C1", self.store.data["customers"])
+        self.assertTrue(next(results))
+        self.assertIn("C1", self.store.data["customers"])
+
+    def test_unknown_operation(self) -> None:
+        """Unknown operations and bad lines fail without stopping."""
+        self.assertEqual(self._run(['{"op": "x"}', "{"])[0],
+                         "  [FAIL] Unknown operation x")
+
+
+class TestScenarios(unittest.TestCase):
+    """Tests for the parallel scenario runner."""
+
+    def test_expand_inputs(self) -> None:
+        """Directories expand to their inputs in name order."""
+        inputs = expand_inputs(["files/tests", "x.ndjson"])
+        self.assertEqual(inputs[0], os.path.join("files/tests",
+                                                 "test_edge_cases.json"))
+        self.assertEqual(len(inputs), 5)
+        self.assertEqual(inputs[-1], "x.ndjson")
+
+    def test_run_scenarios(self) -> None:
+        """Parallel scenarios give the expected results files."""
+        inputs = expand_inputs(["files/tests"])
+        with tempfile.TemporaryDirectory() as tmp:
+            summaries = run_scenarios(inputs, tmp, jobs=2)
+            for path, summary in zip(inputs, summaries):
+                name = summary["scenario"]
+                self.assertEqual(summary["input"], path)
+                with open(os.path.join(tmp, f"{name}_results.txt"),
+                          encoding="utf-8") as f:
+                    produced = f.read()
+                with open(os.path.join("files/results",
+                                       f"{name}_results.txt"),
+                          encoding="utf-8") as f:
+                    self.assertEqual(produced, f.read())
+                self.assertEqual(produced.count("[FAIL]"), summary["failed"])
+            self.assertTrue(os.path.exists(os.path.join(tmp,
+                                                        "summary.json")))
+        self.assertFalse(os.path.exists("hotel.json"))
+
+    def test_run_scenarios_compared(self) -> None:
+        """Scenarios are compared with expected results while they run."""
+        inputs = expand_inputs(["files/tests"])
+        with tempfile.TemporaryDirectory() as tmp:
+            summaries = run_scenarios(inputs, tmp, options=ScenarioOptions(
+                results="quiet", expect_dir="files/results"
+            ))
+            self.assertTrue(all(s["matches"] for s in summaries))
+            self.assertFalse([name for name in os.listdir(tmp)
+                              if name.endswith("_results.txt")])
+            with tempfile.TemporaryDirectory() as expected:
+                with open(os.path.join(expected, "test_valid_results.txt"),
+                          "w", encoding="utf-8") as f:
+                    f.write("--- Customers ---\n  [OK] Created customer X\n")
+                summary, = run_scenarios(
+                    inputs[-1:], tmp,
+                    options=ScenarioOptions(results="jsonl",
+                                            expect_dir=expected)
+                )
+        self.assertFalse(summary["matches"])
+        self.assertEqual(summary["mismatches"][0],
+                         "line 2: expected '  [OK] Created customer X', "
+                         "got '  [OK] Created customer C1'")
+
+    def test_streams_flush_as_they_run(self) -> None:
+        """Streams are written every STREAM_FLUSH_EVERY mutations."""
+        backend = JsonBackend(TEST_FILE)
+        use_backend(backend)
+        flush_every = main.STREAM_FLUSH_EVERY
+        main.STREAM_FLUSH_EVERY = 2
+        instrumentation.reset()
+        instrumentation.enable()
+        try:
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, "ops.ndjson")
+                with open(path, "w", encoding="utf-8") as f:
+                    for i in range(5):
+                        f.write(json.dumps({
+                            "op": "create_customer", "customer_id": f"C{i}",
+                            "name": "A", "email": f"{i}@example.com"
+                        }) + "\n")
+                run_input(path, ResultLog(io.StringIO()))
+            saves = instrumentation.stats()["timings"]["storage.save"]
+            self.assertEqual(saves["count"], 3)
+            self.assertEqual(len(backend.load()["customers"]), 5)
+        finally:
+            main.STREAM_FLUSH_EVERY = flush_every
+            instrumentation.enable(False)
+            instrumentation.reset()
+            use_backend(None)
+            backend.clear()
+
+    def test_duplicate_names_rejected(self) -> None:
+        """Two inputs with the same file name cannot share outputs."""
+        with self.assertRaises(ValueError):
+            run_scenarios(["a/x.json", "b/x.json"], "unused")
+
+
+class TestServer(unittest.IsolatedAsyncioTestCase):
+    """Tests for the --serve daemon."""
+
+    async def asyncSetUp(self) -> None:
+        """Serve an in-memory store on a socket in a temporary directory."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = HotelStore(JsonBackend(TEST_FILE))
+        self.store.__enter__()
+        self.address = os.path.join(self.tmp.name, "hotel.sock")
+        self.server = await start_server(self.address)
+
+    async def asyncTearDown(self) -> None:
+        """Stop the server and drop the store without writing it."""
+        self.server.close()
+        await self.server.wait_closed()
+        self.store.discard()
+        self.store.__exit__(None, None, None)
+        self.tmp.cleanup()
+
+    async def _send(self, payload: bytes) -> list[dict]:
+        """Send requests on a new connection and return the events."""
+        reader, writer = await asyncio.open_unix_connection(self.address)
+        writer.write(payload)
+        writer.write_eof()
+        events = [json.loads(line)
+                  for line in (await reader.read()).splitlines()]
+        writer.close()
+        await writer.wait_closed()
+        return events
+
+    async def test_pipelined_requests(self) -> None:
+        """Requests sent at once are answered in order."""
+        events = await self._send(
+            b'{"op": "create_customer", "customer_id": "C1", "name": "A",'
+            b' "email": "a@example.com"}\n'
+            b'{"op": "display_customer", "customer_id": "C1"}\n'
+            b"{\n"
+            b'{"op": "delete_customer", "customer_id": "C1"}'
+        )
+        self.assertEqual([event["event"] for event in events],
+                         ["result", "display", "result", "result", "result"])
+        self.assertEqual(events[1]["value"],
+                         {"name": "A", "email": "a@example.com"})
+        self.assertEqual(events[3]["label"], "Line 3")
+        self.assertTrue(events[4]["ok"])
+        self.assertEqual(self.store.data["customers"], {})
+
+    async def test_connections_share_the_store(self) -> None:
+        """A change made on one connection is seen on the next."""
+        await self._send(b'{"op": "create_hotel", "hotel_id": "H1", '
+                         b'"name": "Grand", "total_rooms": 2}\n')
+        events = await self._send(b'{"op": "create_hotel", '
+                                  b'"hotel_id": "H1"}\n')
+        self.assertFalse(events[0]["ok"])
+
+    async def test_failed_write_reaches_its_clients(self) -> None:
+        """A write that fails is reported to the connection it came from."""
+        self.store.backend = BrokenBackend(TEST_FILE)
+        unflushed = main.Unflushed(self.store, None)
+        address = os.path.join(self.tmp.name, "unflushed.sock")
+        server = await start_server(address, unflushed=unflushed)
+        reader, writer = await asyncio.open_unix_connection(address)
+        writer.write(b'{"op": "create_hotel", "hotel_id": "H1", '
+                     b'"name": "Grand", "total_rooms": 2}\n')
+        created = json.loads(await reader.readline())
+        unflushed.flush()
+        failed = json.loads(await reader.readline())
+        writer.close()
+        await writer.wait_closed()
+        server.close()
+        await server.wait_closed()
+        self.assertTrue(created["ok"])
+        self.assertEqual((failed["label"], failed["ok"], failed["error"]),
+                         ("Write changes", False, "disk I/O error"))
+        self.assertTrue(self.store.dirty)
+
+    def test_parse_address(self) -> None:
+        """HOST:PORT is TCP; anything else is a socket path."""
+        self.assertEqual(parse_address(":8000"), ("127.0.0.1", 8000))
+        self.assertEqual(parse_address("0.0.0.0:80"), ("0.0.0.0", 80))
+        self.assertEqual(parse_address("/tmp/h.sock"), ("/tmp/h.sock", None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+"""Unit tests for occupancy.py."""
+
+import unittest
+from src.occupancy import Occupancy, np
+
+
+def _reservation(hotel_id: str, rooms: list[int], check_in: str,
+                 check_out: str) -> dict:
+    """Return a reservation record."""
+    return {"customer_id": "C1", "hotel_id": hotel_id, "rooms": rooms,
+            "check_in": check_in, "check_out": check_out}
+
+
+def _sample() -> dict:
+    """Return two hotels with a few stays around the first of March."""
+    return {
+        "hotels": {
+            "H1": {"name": "Grand", "total_rooms": 4, "reserved_rooms": []},
+            "H2": {"name": "Inn", "total_rooms": 2, "reserved_rooms": []},
+        },
+        "reservations": {
+            "R1": _reservation("H1", [1, 2], "2026-03-01", "2026-03-03"),
+            "R2": _reservation("H1", [3], "2026-03-02", "2026-03-05"),
+            "R3": _reservation("H2", [1], "2026-02-20", "2026-03-02"),
+            "R4": _reservation("H2", [2], "", ""),
+            "R5": _reservation("H9", [1], "2026-03-01", "2026-03-02"),
+            "R6": _reservation("H1", [4], "2026-03-03", "2026-03-03"),
+        },
+    }
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestOccupancy(unittest.TestCase):
+    """Tests for the hotel x night occupancy matrix."""
+
+    def setUp(self) -> None:
+        """Build the occupancy of the four nights from March 1st."""
+        self.occupancy = Occupancy.build(_sample(), "2026-03-01",
+                                         "2026-03-05", chunk=2)
+
+    def test_booked(self) -> None:
+        """Stays are clipped to the window; other hotels are ignored."""
+        self.assertEqual(self.occupancy.booked.tolist(),
+                         [[2, 3, 1, 1], [2, 1, 1, 1]])
+        self.assertEqual(self.occupancy.free().tolist(),
+                         [[2, 1, 3, 3], [0, 1, 1, 1]])
+
+    def test_chunks_give_the_same_matrix(self) -> None:
+        """The chunk size does not change the result."""
+        whole = Occupancy.build(_sample(), "2026-03-01", "2026-03-05")
+        self.assertTrue(np.array_equal(whole.booked, self.occupancy.booked))
+
+    def test_rates(self) -> None:
+        """Rates are booked shares of the rooms."""
+        self.assertEqual(self.occupancy.occupancy_rates(),
+                         {"H1": 7 / 16, "H2": 5 / 8})
+        self.assertEqual(self.occupancy.rates()[0].tolist(),
+                         [0.5, 0.75, 0.25, 0.25])
+
+    def test_peak_nights(self) -> None:
+        """Peak nights come busiest first, earlier nights on ties."""
+        self.assertEqual(self.occupancy.peak_nights(2),
+                         [("2026-03-01", 4), ("2026-03-02", 4)])
+        self.assertEqual(self.occupancy.peak_nights(1, "H1"),
+                         [("2026-03-02", 3)])
+        with self.assertRaises(ValueError):
+            self.occupancy.peak_nights(1, "UNKNOWN")
+
+    def test_free_capacity(self) -> None:
+        """Free rooms of all hotels are summed per night."""
+        self.assertEqual(self.occupancy.free_capacity(), {
+            "2026-03-01": 2, "2026-03-02": 2, "2026-03-03": 4,
+            "2026-03-04": 4,
+        })
+        self.assertEqual(
+            self.occupancy.hotels_with_free(1, "2026-03-02", "2026-03-04"),
+            ["H1", "H2"]
+        )
+        self.assertEqual(
+            self.occupancy.hotels_with_free(1, "2026-02-01", "2026-03-02"),
+            ["H1"]
+        )
+        with self.assertRaises(ValueError):
+            self.occupancy.hotels_with_free(1, "2026-03-04", "2026-03-04")
+
+    def test_invalid_window(self) -> None:
+        """Windows must be non-empty and closed."""
+        for start, end in (("2026-03-05", "2026-03-01"), ("", "2026-03-01")):
+            with self.assertRaises(ValueError):
+                Occupancy(_sample()["hotels"], start, end)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+"""Unit tests for references.py."""
+
+import unittest
+from src.references import ReferenceIndex
+
+
+def _sample() -> dict:
+    """Return two customers with reservations in two hotels."""
+    return {
+        "hotels": {"H1": {}, "H2": {}},
+        "customers": {
+            "C1": {"name": "Alice", "email": "a@example.com"},
+            "C2": {"name": "Bob", "email": ""},
+        },
+        "reservations": {
+            "R1": {"customer_id": "C1", "hotel_id": "H1"},
+            "R2": {"customer_id": "C2", "hotel_id": "H1"},
+            "R3": {"customer_id": "C1", "hotel_id": "H2"},
+        },
+    }
+
+
+class TestReferenceIndex(unittest.TestCase):
+    """Tests for the reservation and email index."""
+
+    def setUp(self) -> None:
+        """Index the sample data."""
+        self.data = _sample()
+        self.index = ReferenceIndex.build(self.data)
+
+    def test_build(self) -> None:
+        """Reservations are listed per owner and emails map to IDs."""
+        self.assertEqual(self.index.customer_reservations("C1"),
+                         ["R1", "R3"])
+        self.assertEqual(self.index.hotel_reservations("H1"), ["R1", "R2"])
+        self.assertEqual(self.index.hotel_reservations("H9"), [])
+        self.assertEqual(self.index.customer_with_email("a@example.com"),
+                         "C1")
+        self.assertIsNone(self.index.customer_with_email(""))
+
+    def test_remove(self) -> None:
+        """Removed records leave no empty entries behind."""
+        reservation = self.data["reservations"]["R3"]
+        self.index.remove("reservations", "R3", reservation)
+        self.index.remove("customers", "C1", self.data["customers"]["C1"])
+        self.assertNotIn("H2", self.index.by_hotel)
+        self.assertEqual(self.index.customer_reservations("C1"), ["R1"])
+        self.assertEqual(self.index.by_email, {})
+
+    def test_verify(self) -> None:
+        """verify() reports stale entries and broken references."""
+        self.assertEqual(self.index.verify(self.data), [])
+        del self.data["reservations"]["R2"]
+        self.data["customers"]["C2"]["email"] = "a@example.com"
+        self.data["reservations"]["R4"] = {"customer_id": "C9",
+                                           "hotel_id": "H2"}
+        self.assertEqual(self.index.verify(self.data), [
+            "Index by_customer is stale for C2.",
+            "Index by_customer is stale for C9.",
+            "Index by_hotel is stale for H1.",
+            "Index by_hotel is stale for H2.",
+            "Email a@example.com is used by customers C1 and C2.",
+            "Reservation R4 refers to missing customers C9.",
+        ])
+
+
+if __name__ == "__main__":
+    unittest.main()
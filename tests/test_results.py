@@ -0,0 +1,119 @@
+"""Unit tests for results.py."""
+
+import io
+import json
+import unittest
+from src.results import ResultLog, compare
+
+
+def _fail() -> None:
+    """Raise like a failing operation."""
+    raise ValueError("Room 3 does not exist.")
+
+
+class CountingWriter(io.StringIO):
+    """StringIO counting its write calls."""
+
+    writes = 0
+
+    def write(self, text: str) -> int:
+        """Count the call and write."""
+        self.writes += 1
+        return super().write(text)
+
+
+class TestResultLog(unittest.TestCase):
+    """Tests for the buffered result writers."""
+
+    def _run(self, log: ResultLog) -> None:
+        """Report a small run to the log."""
+        log.section("Hotels")
+        log.attempt("Created hotel H1", "Create hotel H1", lambda: None)
+        log.attempt("Displayed hotel H1", "Display hotel H1",
+                    dict, name="A")
+        log.section("Deletes")
+        log.attempt("Reserved room 3", "Reserve room 3", _fail)
+
+    def test_text(self) -> None:
+        """Text results are the lines main.py used to print."""
+        out = io.StringIO()
+        log = ResultLog(out)
+        self._run(log)
+        self.assertTrue(log.close())
+        self.assertEqual(out.getvalue().splitlines(), [
+            "--- Hotels ---",
+            "  [OK] Created hotel H1",
+            "{'name': 'A'}",
+            "  [OK] Displayed hotel H1",
+            "",
+            "--- Deletes ---",
+            "  [FAIL] Reserve room 3: Room 3 does not exist.",
+        ])
+        self.assertEqual((log.ok, log.failed), (2, 1))
+
+    def test_jsonl(self) -> None:
+        """JSONL results are events with the operation durations."""
+        out = io.StringIO()
+        log = ResultLog(out, "jsonl")
+        self._run(log)
+        log.close()
+        events = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([event["event"] for event in events],
+                         ["section", "result", "display", "result",
+                          "section", "result"])
+        self.assertEqual(events[2]["value"], {"name": "A"})
+        self.assertFalse(events[5]["ok"])
+        self.assertEqual(events[5]["error"], "Room 3 does not exist.")
+        self.assertGreaterEqual(events[1]["seconds"], 0)
+
+    def test_quiet(self) -> None:
+        """Quiet logs only write the counts."""
+        out = io.StringIO()
+        log = ResultLog(out, "quiet")
+        self._run(log)
+        log.close()
+        self.assertEqual(out.getvalue(), "OK: 2, FAIL: 1\n")
+
+    def test_buffered(self) -> None:
+        """Output is written in chunks, not per line."""
+        out = CountingWriter()
+        log = ResultLog(out, buffer_size=100)
+        for i in range(100):
+            log.result(f"Created customer C{i}")
+        log.close()
+        self.assertEqual(len(out.getvalue().splitlines()), 100)
+        self.assertLess(out.writes, 30)
+
+    def test_expected(self) -> None:
+        """The log compares its text lines with the expected ones."""
+        log = ResultLog(None, "quiet", ["  [OK] A\n", "  [OK] B\n"])
+        log.result("A")
+        self.assertFalse(log.close())
+        self.assertEqual(list(log.comparator.report()),
+                         ["line 2: expected '  [OK] B', got None"])
+
+    def test_unknown_format(self) -> None:
+        """Unknown formats are rejected."""
+        with self.assertRaises(ValueError):
+            ResultLog(io.StringIO(), "xml")
+
+
+class TestCompare(unittest.TestCase):
+    """Tests for the streaming comparator."""
+
+    def test_compare(self) -> None:
+        """Mismatches are numbered, and only the first few are kept."""
+        actual = [f"line {i}\n" for i in range(20)]
+        expected = [f"line {i}\n" for i in range(5)] + ["other\n"] * 16
+        comparator = compare(iter(actual), iter(expected), limit=2)
+        self.assertEqual(comparator.count, 16)
+        self.assertEqual(list(comparator.report()), [
+            "line 6: expected 'other', got 'line 5'",
+            "line 7: expected 'other', got 'line 6'",
+            "... 14 more",
+        ])
+        self.assertEqual(compare(actual, actual).count, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+"""Unit tests for rooms.py."""
+
+import unittest
+from src.rooms import RoomSet
+
+
+class TestRoomSet(unittest.TestCase):
+    """Tests for the RoomSet bitset."""
+
+    def setUp(self) -> None:
+        """Create a ten-room set with rooms 1, 2 and 5 reserved."""
+        self.rooms = RoomSet.from_rooms([5, 1, 2], 10)
+
+    def test_contains(self) -> None:
+        """Membership reflects the reserved rooms."""
+        self.assertIn(5, self.rooms)
+        self.assertNotIn(3, self.rooms)
+        self.assertNotIn(0, self.rooms)
+
+    def test_add_discard(self) -> None:
+        """add() and discard() toggle a single room."""
+        self.rooms.add(3)
+        self.assertIn(3, self.rooms)
+        self.rooms.discard(3)
+        self.assertNotIn(3, self.rooms)
+
+    def test_counts(self) -> None:
+        """len() counts reserved rooms and free_count() the rest."""
+        self.assertEqual(len(self.rooms), 3)
+        self.assertEqual(self.rooms.free_count(), 7)
+
+    def test_iter_sorted(self) -> None:
+        """Iteration yields rooms in ascending order."""
+        self.assertEqual(list(self.rooms), [1, 2, 5])
+
+    def test_next_free(self) -> None:
+        """next_free() returns the lowest free room from a start."""
+        self.assertEqual(self.rooms.next_free(), 3)
+        self.assertEqual(self.rooms.next_free(5), 6)
+
+    def test_next_free_full(self) -> None:
+        """next_free() returns None when every room is reserved."""
+        self.assertIsNone(RoomSet.from_rooms([1, 2], 2).next_free())
+
+    def test_bytes_round_trip(self) -> None:
+        """to_bytes()/from_bytes() preserve the reserved rooms."""
+        raw = self.rooms.to_bytes()
+        self.assertEqual(len(raw), 1)
+        self.assertEqual(RoomSet.from_bytes(raw, 10), self.rooms)
+
+    def test_rooms_below_one_rejected(self) -> None:
+        """from_rooms() refuses room 0 and below with a clear error."""
+        for room in (0, -3):
+            with self.assertRaisesRegex(ValueError, "numbered from 1"):
+                RoomSet.from_rooms([2, room], 10)
+
+    def test_resize(self) -> None:
+        """resize() changes the number of free rooms."""
+        self.rooms.resize(20)
+        self.assertEqual(self.rooms.free_count(), 17)
+        self.assertEqual(self.rooms.next_free(6), 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
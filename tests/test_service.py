@@ -0,0 +1,143 @@
+"""Unit tests for service.py."""
+
+import asyncio
+import unittest
+from typing import Optional
+from src.hotel_management import Reservation
+from src.service import AsyncHotelService
+from src.storage import JsonBackend
+
+TEST_FILE = "hotel_service_test.json"
+
+
+class CountingBackend(JsonBackend):
+    """JSON backend that counts its saves and can fail them."""
+
+    def __init__(self, path: str) -> None:
+        """Create the backend with a zero save count."""
+        super().__init__(path)
+        self.saves = 0
+        self.fail = False
+        self.broken = False
+
+    def load(self) -> dict:
+        """Read the data unless the backend is broken."""
+        if self.broken:
+            raise OSError("Disk gone.")
+        return super().load()
+
+    def save(
+        self,
+        data: dict,
+        changes: Optional[list] = None,
+        expected: Optional[int] = None
+    ) -> int:
+        """Count the save and write it."""
+        self.saves += 1
+        if self.broken:
+            raise RuntimeError("Disk on fire.")
+        if self.fail:
+            self.fail = False
+            raise RuntimeError("Disk on fire.")
+        return super().save(data, changes, expected)
+
+
+class TestAsyncHotelService(unittest.IsolatedAsyncioTestCase):
+    """Tests for AsyncHotelService."""
+
+    async def asyncSetUp(self) -> None:
+        """Start a service over an empty file."""
+        self.backend = CountingBackend(TEST_FILE)
+        self.backend.clear()
+        self.service = AsyncHotelService(self.backend)
+        await self.service.start()
+
+    async def asyncTearDown(self) -> None:
+        """Stop the service and remove its files."""
+        await self.service.close()
+        self.backend.clear()
+
+    async def test_mutations_are_durable_when_awaited(self) -> None:
+        """An awaited mutation is already in the file."""
+        await self.service.create_customer("C1", "Alice", "a@example.com")
+        self.assertIn("C1", JsonBackend(TEST_FILE).load()["customers"])
+
+    async def test_concurrent_mutations_share_a_write(self) -> None:
+        """Many concurrent mutations are persisted in few writes."""
+        await self.service.create_hotel("H1", "Grand Palace", 100)
+        saves = self.backend.saves
+        await asyncio.gather(*(
+            self.service.reserve_room("H1", room) for room in range(1, 51)
+        ))
+        self.assertLess(self.backend.saves - saves, 5)
+        rooms = JsonBackend(TEST_FILE).load()["hotels"]["H1"]
+        self.assertEqual(len(rooms["reserved_rooms"]), 50)
+
+    async def test_failed_mutation_raises(self) -> None:
+        """Only the failing caller sees its error."""
+        await self.service.create_hotel("H1", "Grand Palace", 2)
+        results = await asyncio.gather(
+            self.service.reserve_room("H1", 1),
+            self.service.reserve_room("H1", 1),
+            return_exceptions=True
+        )
+        self.assertIsNone(results[0])
+        self.assertIsInstance(results[1], ValueError)
+
+    async def test_writer_survives_failed_flush(self) -> None:
+        """Any flush error fails its batch and the writer carries on."""
+        await self.service.create_hotel("H1", "Grand Palace", 2)
+        self.backend.fail = True
+        with self.assertRaises(RuntimeError):
+            await self.service.reserve_room("H1", 1)
+        await asyncio.wait_for(self.service.reserve_room("H1", 2), 5)
+        rooms = JsonBackend(TEST_FILE).load()["hotels"]["H1"]
+        self.assertEqual(list(rooms["reserved_rooms"]), [2])
+
+    async def test_failed_reload_stops_service(self) -> None:
+        """A batch neither written nor reloaded is dropped, then it stops."""
+        await self.service.create_hotel("H1", "Grand Palace", 2)
+        self.backend.broken = True
+        with self.assertRaisesRegex(RuntimeError, "on fire"):
+            await self.service.reserve_room("H1", 1)
+        self.backend.broken = False
+        with self.assertRaisesRegex(RuntimeError, "stopped"):
+            await self.service.reserve_room("H1", 2)
+        await self.service.close()
+        rooms = JsonBackend(TEST_FILE).load()["hotels"]["H1"]
+        self.assertEqual(list(rooms["reserved_rooms"]), [])
+
+    async def test_reads_from_memory(self) -> None:
+        """Reads return copies of the in-memory records."""
+        await self.service.create_customer("C1", "Alice", "a@example.com")
+        await self.service.create_hotel("H1", "Grand Palace", 3)
+        await self.service.create_reservation(
+            Reservation("R1", "C1", "H1", [1], "2026-03-01", "2026-03-05")
+        )
+        self.assertEqual(self.service.get_customer("C1")["name"], "Alice")
+        self.assertEqual(self.service.get_hotel("H1")["reserved_rooms"], [])
+        self.assertEqual(
+            self.service.free_rooms("H1", "2026-03-02", "2026-03-03"), [2, 3]
+        )
+        with self.assertRaises(ValueError):
+            self.service.get_reservation("UNKNOWN")
+
+    async def test_room_search(self) -> None:
+        """Searches see the rooms booked through the service."""
+        await self.service.create_customer("C1", "Alice", "a@example.com")
+        await self.service.create_hotel("H1", "Grand Palace", 3)
+        await self.service.create_reservation(
+            Reservation("R1", "C1", "H1", [], "2026-03-01", "2026-03-05"),
+            auto_assign=2
+        )
+        self.assertEqual(self.service.get_reservation("R1")["rooms"], [1, 2])
+        self.assertEqual(self.service.find_available_rooms("H1", 1), [3])
+        self.assertEqual(
+            self.service.find_hotels(2, "2026-03-02", "2026-03-03"), {}
+        )
+        self.assertEqual(self.service.find_hotels(1, "2026-03-02",
+                                                  "2026-03-03"), {"H1": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
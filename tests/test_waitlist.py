@@ -0,0 +1,216 @@
+"""Unit tests for waitlist.py."""
+
+import time
+import unittest
+from typing import Optional
+from src.hotel_management import (
+    Customer, Hotel, HotelStore, Reservation, transaction, use_backend,
+    waitlist
+)
+from src.storage import JsonBackend
+from src.waitlist import Request, Waitlist
+
+TEST_FILE = "hotel_waitlist_test.json"
+STAY = ("2026-05-01", "2026-05-04")
+
+
+def _request(reservation_id: str, priority: int = 0) -> Request:
+    """Return a request for one room of hotel H1."""
+    return Request(reservation_id, "C1", "H1", count=1, priority=priority)
+
+
+class TestWaitlist(unittest.TestCase):
+    """Tests for the Waitlist heaps and counters."""
+
+    def setUp(self) -> None:
+        """Create a waitlist examining two requests at a time."""
+        self.waitlist = Waitlist(scan=2)
+
+    def test_order(self) -> None:
+        """Higher priority is served first, then queue order."""
+        for reservation_id, priority in (("R1", 0), ("R2", 1), ("R3", 0),
+                                         ("R4", 1)):
+            self.waitlist.add(_request(reservation_id, priority))
+        taken = self.waitlist.take("H1")
+        self.assertEqual([r.reservation_id for r in taken], ["R2", "R4"])
+        self.waitlist.requeue(taken[1:])
+        self.waitlist.done(taken[0])
+        taken = self.waitlist.take("H1")
+        self.assertEqual([r.reservation_id for r in taken], ["R4", "R1"])
+        self.assertEqual(self.waitlist.take("H2"), [])
+
+    def test_add_and_withdraw(self) -> None:
+        """Withdrawn requests are skipped and their heap is rebuilt."""
+        for i in range(6):
+            self.waitlist.add(_request(f"R{i}"))
+        with self.assertRaises(ValueError):
+            self.waitlist.add(_request("R0"))
+        for i in range(4):
+            self.waitlist.withdraw(f"R{i}")
+        with self.assertRaises(ValueError):
+            self.waitlist.withdraw("R0")
+        self.assertEqual(len(self.waitlist.heaps["H1"]), 2)
+        self.assertEqual(self.waitlist.depth("H1"), 2)
+        self.waitlist.withdraw("R4")
+        taken = self.waitlist.take("H1")
+        self.assertEqual([r.reservation_id for r in taken], ["R5"])
+
+    def test_stats(self) -> None:
+        """Depths, counters and wait times are reported."""
+        self.waitlist.add(_request("R1"))
+        self.waitlist.add(Request("R2", "C1", "H2", [3],
+                                  queued=time.monotonic() - 2))
+        self.waitlist.done(self.waitlist.take("H2")[0])
+        self.waitlist.add(_request("R3"))
+        self.waitlist.discard_hotel("H1")
+        stats = self.waitlist.stats()
+        self.assertEqual(stats["depth"], 0)
+        self.assertEqual(stats["hotels"], {})
+        self.assertEqual((stats["queued"], stats["booked"],
+                          stats["dropped"], stats["withdrawn"]),
+                         (3, 1, 2, 0))
+        self.assertGreaterEqual(stats["wait_max"], 2)
+        self.assertEqual(stats["oldest_wait"], 0.0)
+
+
+class TestWaitingReservations(unittest.TestCase):
+    """Tests for Reservation.request and booking on cancellation."""
+
+    def setUp(self) -> None:
+        """Store data in a test file with one hotel and two customers."""
+        self.backend = JsonBackend(TEST_FILE)
+        self.backend.clear()
+        use_backend(self.backend)
+        Hotel("H1", "Grand", 2).create()
+        Customer("C1", "Alice", "a@example.com").create()
+        Customer("C2", "Bob", "b@example.com").create()
+
+    def tearDown(self) -> None:
+        """Remove the test file and go back to the default backend."""
+        use_backend(None)
+        self.backend.clear()
+
+    def _reserve(self, reservation_id: str, rooms: list[int],
+                 customer_id: str = "C1") -> Reservation:
+        """Return a reservation of rooms in H1 for the test stay."""
+        return Reservation(reservation_id, customer_id, "H1", rooms, *STAY)
+
+    def _rooms(self, reservation_id: str) -> Optional[list[int]]:
+        """Return the stored rooms of a reservation, None if missing."""
+        record = self.backend.load()["reservations"].get(reservation_id)
+        return None if record is None else list(record["rooms"])
+
+    def test_booked_on_cancel(self) -> None:
+        """A waiting request is booked by the cancellation freeing it."""
+        self.assertTrue(self._reserve("R1", [1, 2]).request())
+        self.assertFalse(self._reserve("R2", [2], "C2").request())
+        self.assertIsNone(self._rooms("R2"))
+        self.assertEqual(waitlist().depth("H1"), 1)
+        Reservation.cancel("R1")
+        self.assertEqual(self._rooms("R2"), [2])
+        stats = waitlist().stats()
+        self.assertEqual((stats["depth"], stats["booked"]), (0, 1))
+
+    def test_invalid_requests(self) -> None:
+        """Requests that could never be booked are refused, not queued."""
+        self._reserve("R1", [1, 2]).create()
+        for rooms, auto_assign in (([3], 0), ([1, 1], 0), ([], 3),
+                                   ([], -1)):
+            with self.assertRaises(ValueError):
+                self._reserve("R2", rooms).request(auto_assign)
+        with self.assertRaises(ValueError):
+            self._reserve("R1", [1]).request()
+        for check_in, check_out in (("bad-date", STAY[1]),
+                                    (STAY[0], "2026-13-01")):
+            with self.assertRaises(ValueError):
+                Reservation("R2", "C1", "H1", [1], check_in,
+                            check_out).request()
+        self.assertEqual(waitlist().depth(), 0)
+        self.assertFalse(self._reserve("R2", [1]).request())
+        with self.assertRaises(ValueError):
+            self._reserve("R2", [2]).request()
+        Reservation.withdraw("R2")
+        self.assertEqual(waitlist().depth(), 0)
+
+    def test_order_and_fit(self) -> None:
+        """Requests are booked by priority then in order, when they fit."""
+        self._reserve("R1", [1]).create()
+        self._reserve("R2", [2]).create()
+        self.assertFalse(self._reserve("R3", [], "C2").request(2))
+        self.assertFalse(self._reserve("R4", [1]).request())
+        self.assertFalse(self._reserve("R5", [], "C2").request(1))
+        self.assertFalse(self._reserve("R6", [], "C2").request(1, 1))
+        Hotel.modify("H1", total_rooms=3)
+        self.assertEqual(self._rooms("R6"), [3])
+        # R3 needs two rooms and R4 room 1: R5 gets room 2
+        Reservation.cancel("R2")
+        self.assertEqual(self._rooms("R5"), [2])
+        Reservation.cancel("R1")
+        self.assertEqual(self._rooms("R4"), [1])
+        self.assertIsNone(self._rooms("R3"))
+        self.assertEqual(waitlist().depth("H1"), 1)
+        Reservation.bulk_cancel(["R4", "R5"])
+        self.assertEqual(self._rooms("R3"), [1, 2])
+
+    def test_cancel_room_and_deletes(self) -> None:
+        """Released rooms book requests; deletions drop stale ones."""
+        Hotel.reserve_room("H1", 1)
+        Hotel.reserve_room("H1", 2)
+        self.assertFalse(self._reserve("R1", [], "C2").request(1))
+        self.assertFalse(self._reserve("R2", [2]).request())
+        Hotel.cancel_room("H1", 2)
+        self.assertEqual(self._rooms("R1"), [2])
+        Customer.delete("C1")
+        self.assertEqual(waitlist().depth(), 1)
+        Hotel.cancel_room("H1", 1)
+        self.assertEqual(waitlist().depth(), 0)
+        self.assertEqual(waitlist().stats()["dropped"], 1)
+        self.assertFalse(self._reserve("R3", [1, 2], "C2").request())
+        Hotel.delete("H1", cascade=True)
+        self.assertEqual(waitlist().depth(), 0)
+
+    def test_removed_room_dropped(self) -> None:
+        """A request for a room no longer in the hotel is dropped."""
+        self._reserve("R1", [1]).create()
+        self.assertFalse(self._reserve("R2", [1, 2], "C2").request())
+        Hotel.modify("H1", total_rooms=1)
+        self.assertEqual(waitlist().depth(), 0)
+        self.assertEqual(waitlist().stats()["dropped"], 1)
+
+    def test_rollback(self) -> None:
+        """A rolled-back transaction puts the waitlist back as it was."""
+        self._reserve("R1", [1, 2]).create()
+        self.assertFalse(self._reserve("R2", [1], "C2").request())
+        with self.assertRaises(ValueError):
+            with transaction():
+                self.assertFalse(self._reserve("R3", [1]).request())
+                Reservation.cancel("R1")
+                self.assertEqual(waitlist().depth(), 1)
+                raise ValueError("Stop.")
+        stats = waitlist().stats()
+        self.assertEqual((stats["depth"], stats["queued"], stats["booked"]),
+                         (1, 1, 0))
+        self.assertEqual(self._rooms("R1"), [1, 2])
+        Reservation.cancel("R1")
+        self.assertEqual(self._rooms("R2"), [1])
+
+    def test_many_waiting(self) -> None:
+        """Tens of thousands of waiting requests are served in order."""
+        with HotelStore(self.backend, flush_every=0) as store:
+            self._reserve("R0", [1, 2]).create()
+            for i in range(20000):
+                self.assertFalse(
+                    self._reserve(f"W{i}", [], "C2").request(1, i % 2)
+                )
+            for i in range(50):
+                Hotel.modify("H1", total_rooms=3 + i)
+            self.assertEqual(waitlist().depth("H1"), 19950)
+            self.assertEqual(store.data["reservations"]["W1"]["rooms"], [3])
+            self.assertEqual(store.data["reservations"]["W99"]["rooms"],
+                             [52])
+            self.assertNotIn("W0", store.data["reservations"])
+            self.assertEqual(store.verify(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()